@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# cache.py
+"""Persistent, content-addressed cache of PDF extraction results"""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution
+
+from os.path import join, isdir, getsize, getmtime
+from os import makedirs, listdir, replace, unlink, utime, close
+import gzip
+import hashlib
+import json
+import tempfile
+from IQDMPDF._version import __version__
+
+# Default maximum size of the cache directory in MB
+DEFAULT_CACHE_SIZE = 1024
+# Evict down to this fraction of max_size, so eviction doesn't run every save
+EVICTION_TARGET = 0.9
+CACHE_FILE_EXTENSION = ".json.gz"
+
+
+class ExtractionCache:
+    """Size-bounded, least-recently-used cache of PDFExtraction data
+
+    Entries are keyed by the PDF's content hash, the kind of data stored
+    (e.g., 'text' or 'pages'), the LAParams keyword arguments and the IQDM-PDF
+    version, so a cache is never re-used across changes to extraction code.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_CACHE_SIZE):
+        """Initialize an ExtractionCache
+
+        Parameters
+        ----------
+        directory : str
+            Cache directory, created if it does not exist
+        max_size : int, float, optional
+            Maximum size of all cache entries in MB. Least recently used
+            entries are removed when this is exceeded.
+        """
+        self.directory = directory
+        self.max_size = int(float(max_size) * 1024 ** 2)
+        self._size = None  # estimated size in bytes, scanned on first save
+
+    @staticmethod
+    def get_key(content_hash, kind, laparams_key=""):
+        """Get the cache key for a PDF extraction result
+
+        Parameters
+        ----------
+        content_hash : str
+            Hash of the PDF file contents (see utilities.get_file_hash)
+        kind : str
+            Type of data stored, e.g., 'text' or 'pages'
+        laparams_key : str, optional
+            Output from pdf_reader.get_laparams_key
+
+        Returns
+        ----------
+        str
+            A hex digest unique to the inputs and the IQDM-PDF version
+        """
+        key = "|".join([content_hash, kind, laparams_key, __version__])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get_path(self, key):
+        """Get the file path of a cache entry
+
+        Parameters
+        ----------
+        key : str
+            Output from get_key
+
+        Returns
+        ----------
+        str
+            Entries are sharded into sub-directories by the first two
+            characters of key
+        """
+        return join(self.directory, key[:2], key + CACHE_FILE_EXTENSION)
+
+    def load(self, key):
+        """Load a cache entry, marking it as recently used
+
+        Parameters
+        ----------
+        key : str
+            Output from get_key
+
+        Returns
+        ----------
+        any
+            The JSON-compatible object stored with save, or None if the entry
+            does not exist or cannot be read
+        """
+        path = self.get_path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            utime(path)
+        except (OSError, EOFError, ValueError):
+            return None
+        return data
+
+    def save(self, key, data):
+        """Store a JSON-compatible object, evicting old entries if needed
+
+        Parameters
+        ----------
+        key : str
+            Output from get_key
+        data : any
+            JSON-compatible object
+        """
+        path = self.get_path(key)
+        sub_dir = join(self.directory, key[:2])
+        makedirs(sub_dir, exist_ok=True)
+
+        # write to a temporary file first so parallel processes never read
+        # a partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=sub_dir, suffix=".tmp")
+        close(fd)
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f)
+            replace(tmp_path, path)
+        except Exception:
+            unlink_quietly(tmp_path)
+            raise
+
+        if self._size is None:
+            self._size = self.size
+        else:
+            self._size += getsize(path)
+        if self._size > self.max_size:
+            self.evict()
+
+    def get_entries(self):
+        """Get all cache entries
+
+        Returns
+        ----------
+        list of tuple
+            (last used time stamp, size in bytes, path) for each entry
+        """
+        entries = []
+        if not isdir(self.directory):
+            return entries
+        for sub_dir in listdir(self.directory):
+            sub_dir = join(self.directory, sub_dir)
+            if not isdir(sub_dir):
+                continue
+            for file_name in listdir(sub_dir):
+                if file_name.endswith(CACHE_FILE_EXTENSION):
+                    path = join(sub_dir, file_name)
+                    try:
+                        entries.append((getmtime(path), getsize(path), path))
+                    except OSError:  # removed by another process
+                        pass
+        return entries
+
+    @property
+    def size(self):
+        """Get the total size of all cache entries
+
+        Returns
+        ----------
+        int
+            Size in bytes
+        """
+        return sum(entry[1] for entry in self.get_entries())
+
+    def evict(self):
+        """Remove least recently used entries until below max_size"""
+        entries = sorted(self.get_entries())
+        size = sum(entry[1] for entry in entries)
+        target = self.max_size * EVICTION_TARGET
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            unlink_quietly(path)
+            size -= entry_size
+        self._size = size
+
+    def clear(self):
+        """Remove all cache entries"""
+        for _, _, path in self.get_entries():
+            unlink_quietly(path)
+        self._size = 0
+
+
+def unlink_quietly(path):
+    """Remove a file, ignoring errors (e.g., removed by another process)
+
+    Parameters
+    ----------
+    path : str
+        Path to a file
+    """
+    try:
+        unlink(path)
+    except OSError:
+        pass
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# database.py
+"""SQLite output of IMRT QA report data"""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution
+
+import sqlite3
+import time
+from IQDMPDF.utilities import get_file_hash
+
+# Rows are committed in a single transaction once this many are pending
+BATCH_SIZE = 500
+# Each row is keyed on these columns
+KEY_COLUMNS = ["report_file_path", "content_hash"]
+
+
+class SQLiteWriter:
+    """Write results to an SQLite database, with one table per report type
+
+    Tables have the columns of the report type plus content_hash, and rows
+    are unique on KEY_COLUMNS. Re-processing a file replaces its row, also
+    if its contents changed. Same interface as file_processor.ResultsWriter.
+    """
+
+    def __init__(
+        self,
+        database,
+        analysis_columns=None,
+        flush_interval=None,
+        batch_size=BATCH_SIZE,
+    ):
+        """Initialize an SQLiteWriter
+
+        Parameters
+        ----------
+        database : str
+            Path to the SQLite database file, created if it does not exist
+        analysis_columns : dict, optional
+            The analysis_columns of report classes by report type. Tables are
+            indexed on the "uid" and "date" columns.
+        flush_interval : int, float, optional
+            Commit pending rows if this many seconds have passed since the
+            last commit
+        batch_size : int, optional
+            Commit pending rows once this many are pending
+        """
+        self.database = database
+        self.analysis_columns = analysis_columns or {}
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.file_paths = {}  # report_type: database, for ResultsWriter API
+        self.connection = sqlite3.connect(database)
+        self._tables = {}  # report_type: INSERT statement
+        self._path_indices = {}  # report_type: index of report_file_path
+        self._pending = {}  # report_type: rows not yet inserted
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def create_table(self, report_type, columns):
+        """Create the table of a report type if needed, get its INSERT
+
+        Columns missing from an existing table (e.g., added in a newer
+        version of a report class) are added.
+
+        Parameters
+        ----------
+        report_type : str
+            ReportParser.report_type, used as the table name
+        columns : list
+            ReportParser.columns
+
+        Returns
+        ----------
+        str
+            An INSERT OR REPLACE statement for columns + ["content_hash"]
+        """
+        table = quote(report_type)
+        columns = list(columns) + ["content_hash"]
+        existing = [
+            row[1]
+            for row in self.connection.execute("PRAGMA table_info(%s)" % table)
+        ]
+        with self.connection:
+            if not existing:
+                self.connection.execute(
+                    "CREATE TABLE %s (%s, UNIQUE (%s))"
+                    % (
+                        table,
+                        ", ".join(quote(c) for c in columns),
+                        ", ".join(quote(c) for c in KEY_COLUMNS),
+                    )
+                )
+            else:
+                for column in columns:
+                    if column not in existing:
+                        self.connection.execute(
+                            "ALTER TABLE %s ADD COLUMN %s"
+                            % (table, quote(column))
+                        )
+            self.create_indices(report_type, columns)
+
+        return "INSERT OR REPLACE INTO %s (%s) VALUES (%s)" % (
+            table,
+            ", ".join(quote(c) for c in columns),
+            ", ".join("?" * len(columns)),
+        )
+
+    def create_indices(self, report_type, columns):
+        """Index the uid and date analysis columns of a report type
+
+        Parameters
+        ----------
+        report_type : str
+            ReportParser.report_type
+        columns : list
+            Columns of the report type's table
+        """
+        analysis_columns = self.analysis_columns.get(report_type)
+        if not analysis_columns:
+            return
+        indices = {
+            "uid": analysis_columns.get("uid", []),
+            "date": [analysis_columns["date"]]
+            if "date" in analysis_columns
+            else [],
+        }
+        for name, column_indices in indices.items():
+            if column_indices:
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS %s ON %s (%s)"
+                    % (
+                        quote("%s_%s" % (report_type, name)),
+                        quote(report_type),
+                        ", ".join(quote(columns[i]) for i in column_indices),
+                    )
+                )
+
+    def write(self, result):
+        """Add the result of a single file to its report type's table
+
+        Parameters
+        ----------
+        result : dict
+            Output from parse_file or process_file_worker
+
+        Returns
+        ----------
+        bool
+            False if result has no report_type (i.e., parsing failed)
+        """
+        report_type = result["report_type"]
+        if report_type is None:
+            return False
+        if report_type not in self._tables:
+            self._tables[report_type] = self.create_table(
+                report_type, result["columns"]
+            )
+            self.file_paths[report_type] = self.database
+            columns = result["columns"]
+            self._path_indices[report_type] = (
+                columns.index(KEY_COLUMNS[0])
+                if KEY_COLUMNS[0] in columns
+                else None
+            )
+
+        content_hash = result.get("content_hash")
+        if content_hash is None:
+            try:
+                content_hash = get_file_hash(result["file_path"])
+            except OSError:
+                content_hash = ""
+        # pad or trim, e.g., csv_data of a report with no data is [""]
+        row = list(result["data"])[: len(result["columns"])]
+        row += [None] * (len(result["columns"]) - len(row))
+        row.append(content_hash)
+        self._pending.setdefault(report_type, []).append(row)
+        self._pending_count += 1
+
+        if self._pending_count >= self.batch_size or (
+            self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+        return True
+
+    def flush(self):
+        """Insert all pending rows in a single transaction
+
+        Rows of the same files with other contents are deleted first.
+        """
+        with self.connection:
+            for report_type, rows in self._pending.items():
+                index = self._path_indices[report_type]
+                if index is not None:
+                    self.connection.executemany(
+                        "DELETE FROM %s WHERE %s = ? AND %s != ?"
+                        % (
+                            quote(report_type),
+                            quote(KEY_COLUMNS[0]),
+                            quote(KEY_COLUMNS[1]),
+                        ),
+                        [(row[index], row[-1]) for row in rows],
+                    )
+                self.connection.executemany(self._tables[report_type], rows)
+        self._pending = {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Insert pending rows and close the database connection"""
+        if self.connection is not None:
+            self.flush()
+            self.connection.close()
+            self.connection = None
+
+
+def quote(identifier):
+    """Quote an SQL identifier, e.g., a table or column name
+
+    Parameters
+    ----------
+    identifier : str
+        Any table or column name
+
+    Returns
+    ----------
+    str
+        identifier in double quotes, with double quotes escaped
+    """
+    return '"%s"' % str(identifier).replace('"', '""')
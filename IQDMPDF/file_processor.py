@@ -8,13 +8,48 @@
 # This file is part of IQDM-PDF, released under a MIT license.
 #    See the file LICENSE included with this distribution
 
+from collections import deque
 from datetime import datetime
-from os.path import isfile, join
+from itertools import chain
+from os import listdir
+from os.path import isfile, join, splitext
 import csv
-from IQDMPDF.parsers.parser import ReportParser
-from IQDMPDF.utilities import get_files, run_multiprocessing
+import re
+import time
+from functools import partial
+from threading import Lock
+from IQDMPDF.cache import ExtractionCache, DEFAULT_CACHE_SIZE
+from IQDMPDF.database import SQLiteWriter
+from IQDMPDF.manifest import ScanManifest, MANIFEST_FILE_NAME
+from IQDMPDF.metrics import (
+    FileMetrics,
+    MetricsWriter,
+    StageTimer,
+    METRICS_FILE_PREFIX,
+)
+from IQDMPDF.utilities import (
+    FILE_INFO_COLUMNS,
+    iter_files,
+    iter_pdf_files,
+    iter_shard_files,
+    iter_multiprocessing,
+    BackgroundIterator,
+    creation_date,
+    get_file_hash,
+)
 from IQDMPDF._version import __version__
 
+# IQDMPDF.parsers (and pdfminer) are imported by the functions parsing
+# files, so --version and argument errors return without loading them
+
+# Default maximum number of seconds between flushes of csv output
+DEFAULT_FLUSH_INTERVAL = 10
+# Files exceeding the timeout of process_files are written as this type
+TIMED_OUT_REPORT_TYPE = "TimedOut"
+# Duplicate files skipped by process_files(duplicates="first") are written
+# as this type
+DUPLICATE_REPORT_TYPE = "Duplicates"
+
 
 def process_files(
     init_directory,
@@ -25,6 +60,19 @@ def process_files(
     callback=None,
     raise_errors=False,
     processes=1,
+    cache_dir=None,
+    cache_size=None,
+    incremental=False,
+    manifest_file=None,
+    flush_interval=None,
+    timeout=None,
+    max_tasks=None,
+    duplicates=None,
+    shard_index=None,
+    shard_count=None,
+    database=None,
+    metrics=False,
+    plugin_dirs=None,
 ):
     """Process all pdf files into parser classes, write data to csv
 
@@ -33,7 +81,8 @@ def process_files(
     init_directory : str
         initial scanning directory
     ignore_extension : bool, optional
-        Set to True to catch pdf files that are missing .pdf extension
+        Set to True to catch pdf files that are missing .pdf extension. Files
+        are checked for a PDF header before parsing
     output_file : str, optional
        Report type in file name will be prepended to this value
     output_dir : str, optional
@@ -47,90 +96,884 @@ def process_files(
         Set to True to allow errors to be raised (useful for debugging)
     processes : int
         Number of parallel processes allowed
+    cache_dir : str, optional
+        Store extracted PDF data in this directory, so subsequent runs over
+        the same files can skip PDF parsing
+    cache_size : int, float, optional
+        Maximum size of cache_dir in MB. Default is
+        cache.DEFAULT_CACHE_SIZE
+    incremental : bool, optional
+        Set to True to only parse new or changed files, re-using results
+        stored in a manifest for files processed by a previous run. Output
+        files are replaced, as they include the rows of unchanged files.
+    manifest_file : str, optional
+        Path of the manifest used when incremental is True. Default is
+        manifest.MANIFEST_FILE_NAME in output_dir
+    flush_interval : int, float, optional
+        Maximum number of seconds between flushes of the csv files, which are
+        kept open while processing. Default is DEFAULT_FLUSH_INTERVAL
+    timeout : int, float, optional
+        Maximum number of seconds allowed per file when processes > 1. The
+        worker process is killed and replaced if exceeded, and the file path
+        is written to the csv of TIMED_OUT_REPORT_TYPE
+    max_tasks : int, optional
+        Replace each worker process after this many files when processes > 1,
+        releasing memory accumulated by pdfminer
+    duplicates : str, optional
+        Set to 'all' or 'first' to parse files with identical contents only
+        once. 'all' writes a row for every copy, 'first' writes a row for the
+        first copy found and lists the others in the csv of
+        DUPLICATE_REPORT_TYPE. Duplicates are only found within a shard.
+    shard_index : int, optional
+        Only process files assigned to this shard (0 to shard_count - 1),
+        see utilities.get_shard_index. Requires shard_count
+    shard_count : int, optional
+        Total number of shards. Shard outputs are named with
+        get_shard_file_name, and can be combined with merge_shards.
+        Requires shard_index
+    database : str, optional
+        Write results to this SQLite database instead of csv files, see
+        database.SQLiteWriter. Rows of re-processed files are replaced.
+    metrics : bool, optional
+        Set to True to write the stage durations, page count and size of each
+        parsed file, and the duration of the directory scan, to a JSON Lines
+        file in output_dir (see get_metrics_file_path)
+    plugin_dirs : list of str, optional
+        Directories of report class plugin JSON files, see
+        parsers.registry.get_plugin_dir_specs
     """
 
+    if shard_index is not None or shard_count is not None:
+        if shard_index is None or shard_count is None:
+            raise ValueError("shard_index and shard_count must both be set")
+        if not 0 <= shard_index < shard_count:
+            raise ValueError("shard_index must be from 0 to shard_count - 1")
+
     time_stamp = str(datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
     if output_file is None:
         output_file = "results_%s.csv" % time_stamp
+    if shard_count is not None:
+        output_file = get_shard_file_name(
+            output_file, shard_index, shard_count
+        )
 
     extension = None if ignore_extension else ".pdf"
     search_sub_dir = not no_recursive_search
-    files = get_files(init_directory, search_sub_dir, extension)
-
-    if processes == 1:
-        for i, file in enumerate(files):
-            if callback is not None:
-                label = "Processing (%s of %s): %s" % (i + 1, len(files), file)
-                gauge = float(i) / float(len(files))
-                callback({"label": label, "gauge": gauge})
+    files = iter_files(init_directory, search_sub_dir, extension)
+    if shard_count is not None:
+        files = iter_shard_files(
+            files, init_directory, shard_index, shard_count
+        )
+    if ignore_extension:
+        files = iter_pdf_files(files)  # skip non-PDFs before pdfminer
+    run_timer, metrics_writer = None, None
+    if metrics:
+        run_timer = StageTimer()
+        files = run_timer.iter_stage(files, "discovery")
+        metrics_writer = MetricsWriter(
+            get_metrics_file_path(output_file, output_dir)
+        )
+    start_time = time.perf_counter()
+    files = unique_files = DuplicateFiles(files, duplicates)
+    # files are processed while the directory scan continues
+    files = BackgroundIterator(files)
+
+    cache = None
+    if cache_dir is not None:
+        if cache_size is None:
+            cache_size = DEFAULT_CACHE_SIZE
+        cache = ExtractionCache(cache_dir, max_size=cache_size)
+
+    manifest = None
+    if incremental:
+        if manifest_file is None:
+            manifest_file = MANIFEST_FILE_NAME
+            if shard_count is not None:
+                manifest_file = get_shard_file_name(
+                    manifest_file, shard_index, shard_count
+                )
+            if output_dir is not None:
+                manifest_file = join(output_dir, manifest_file)
+        manifest = ScanManifest(manifest_file)
+
+    if flush_interval is None:
+        flush_interval = DEFAULT_FLUSH_INTERVAL
+
+    if plugin_dirs:
+        init_worker(plugin_dirs)  # registry of this process, e.g. for writers
+
+    try:
+        if processes == 1:
+            # incremental scans write the rows of unchanged files again
+            writer = get_results_writer(
+                output_file,
+                output_dir,
+                mode="w" if incremental else "a",
+                flush_interval=flush_interval,
+                database=database,
+            )
+            with writer:
+                for i, file in enumerate(files):
+                    if callback is not None:
+                        found = files.count
+                        label = "Processing (%s of %s%s): %s" % (
+                            i + 1,
+                            found,
+                            "" if files.done else "+",  # scan in progress
+                            file,
+                        )
+                        gauge = float(i) / float(found)
+                        callback({"label": label, "gauge": gauge})
+                    try:
+                        # hashed once, by DuplicateFiles if enabled
+                        content_hash = unique_files.pop_hash(file)
+                        result = None
+                        if manifest is not None:
+                            result = manifest.get_result(file, content_hash)
+                        if result is None:
+                            try:
+                                result = parse_file(
+                                    file,
+                                    cache=cache,
+                                    metrics=metrics,
+                                    content_hash=content_hash,
+                                )
+                            except Exception:
+                                # as in process_file_worker, failures are
+                                # recorded so they are not parsed again
+                                if manifest is not None:
+                                    manifest.add(
+                                        file,
+                                        get_failed_result(file, content_hash),
+                                    )
+                                raise
+                            if manifest is not None:
+                                manifest.add(file, result)
+                        unique_files.add_result(result)
+                        for output in chain(
+                            [result], unique_files.pop_results()
+                        ):
+                            if not write_with_metrics(
+                                writer, output, metrics_writer
+                            ):
+                                print("Skipping: %s" % output["file_path"])
+                    except Exception as e:
+                        if raise_errors:
+                            raise e
+                        else:
+                            print(str(e))
+                for output in unique_files.pop_results():
+                    if not writer.write(output):
+                        print("Skipping: %s" % output["file_path"])
+                for file in unique_files.get_unresolved():
+                    print("Skipping: %s" % file)
+        else:
+            # Multiprocessing, results are written as they are completed
+            queue = ChangedFiles(files, manifest, unique_files.pop_hash)
+            writer = get_results_writer(
+                output_file,
+                output_dir,
+                mode="w",
+                flush_interval=flush_interval,
+                database=database,
+            )
+            with writer:
+                print("Processing files ...")
+                timed_out = 0
+                worker = partial(
+                    process_task_worker, cache=cache, metrics=metrics
+                )
+                for result in iter_multiprocessing(
+                    worker,
+                    queue,
+                    processes,
+                    callback=callback,
+                    initializer=partial(init_worker, plugin_dirs),
+                    timeout=timeout,
+                    max_tasks=max_tasks,
+                    timeout_result=get_task_timeout_result,
+                    total=lambda: files.count - queue.unchanged_count,
+                ):
+                    for unchanged in queue.pop_unchanged():
+                        unique_files.add_result(unchanged)
+                        writer.write(unchanged)
+                    if result["report_type"] == TIMED_OUT_REPORT_TYPE:
+                        timed_out += 1
+                    elif manifest is not None:
+                        manifest.add(result["file_path"], result)
+                    unique_files.add_result(result)
+                    write_with_metrics(writer, result, metrics_writer)
+                    for duplicate in unique_files.pop_results():
+                        writer.write(duplicate)
+                for unchanged in queue.pop_unchanged():
+                    unique_files.add_result(unchanged)
+                    writer.write(unchanged)
+                for duplicate in unique_files.pop_results():
+                    writer.write(duplicate)
+
+            if manifest is not None:
+                print("Re-used %s unchanged file(s)" % queue.unchanged_count)
+            if duplicates is not None:
+                print(
+                    "Found %s duplicate file(s)" % unique_files.duplicate_count
+                )
+            if timed_out:
+                print("%s file(s) exceeded the timeout" % timed_out)
+            for report_type, file_path in writer.file_paths.items():
+                print("%s data written to %s" % (report_type, file_path))
+        if metrics_writer is not None:
+            metrics_writer.write(
+                {
+                    "type": "run",
+                    "file_count": files.count,
+                    "stages": dict(run_timer.stages),
+                    "total": time.perf_counter() - start_time,
+                }
+            )
+            print("Metrics written to %s" % metrics_writer.file_path)
+    finally:
+        if manifest is not None:
+            manifest.save()
+        if metrics_writer is not None:
+            metrics_writer.close()
+
+
+class DuplicateFiles:
+    """Iterate through files with unique contents
+
+    Files are hashed as they are iterated (e.g., in a BackgroundIterator
+    thread). Results for duplicate files are made from the result of the
+    first file found with the same contents, see add_result and pop_results.
+    """
+
+    def __init__(self, files, mode=None):
+        """Initialize a DuplicateFiles iterator
+
+        Parameters
+        ----------
+        files : iterable
+            File paths
+        mode : str, optional
+            'all' to get a result for every duplicate file, 'first' to get a
+            result of DUPLICATE_REPORT_TYPE instead. Files are not hashed,
+            and all files are iterated if None. In mode 'all', the result of
+            each first file is kept until the end of the scan (without
+            metrics), so every file with the same contents is parsed once,
+            however late its duplicates are found.
+        """
+        if mode not in {None, "all", "first"}:
+            raise ValueError("mode must be None, 'all', or 'first'")
+        self.files = files
+        self.mode = mode
+        self.duplicate_count = 0
+        self._lock = Lock()  # state below is shared with the iterating thread
+        self._first_files = {}  # content hash: first file path found
+        self._found = deque()  # (duplicate path, first path), mode 'first'
+        self._pending = {}  # first path: duplicate paths not yet popped
+        self._results = {}  # first path: result, mode 'all'
+        self._hashes = {}  # file path: content hash, see pop_hash
+
+    def __iter__(self):
+        if self.mode is None:
+            yield from self.files
+            return
+        for file in self.files:
             try:
-                process_file(file, output_file, output_dir)
-            except Exception as e:
-                if raise_errors:
-                    raise e
+                content_hash = get_file_hash(file)
+            except OSError:
+                yield file
+                continue
+            with self._lock:
+                first_file = self._first_files.setdefault(content_hash, file)
+                duplicate = first_file != file
+                if not duplicate:
+                    self._hashes[file] = content_hash
+                elif self.mode == "first":
+                    self._found.append((file, first_file))
+                    self.duplicate_count += 1
                 else:
-                    print(str(e))
-    else:
-        # Multiprocessing
-        print("Processing %s file(s) ..." % len(files))
-        all_data = run_multiprocessing(
-            process_file_worker, files, processes, callback=callback
+                    self._pending.setdefault(first_file, []).append(file)
+                    self.duplicate_count += 1
+            if not duplicate:
+                yield file
+
+    def pop_hash(self, file_path):
+        """Get the content hash computed for an iterated file
+
+        Parameters
+        ----------
+        file_path : str
+            A file path yielded by this iterator
+
+        Returns
+        ----------
+        str, None
+            Output from utilities.get_file_hash, None if the file was not
+            hashed or the hash was already popped
+        """
+        with self._lock:
+            return self._hashes.pop(file_path, None)
+
+    def add_result(self, result):
+        """Store the result of a file for its duplicates, in mode 'all'
+
+        Parameters
+        ----------
+        result : dict
+            Output from parse_file or process_file_worker
+        """
+        if self.mode == "all":
+            # metrics are of the original file, see copy_result
+            result = {k: v for k, v in result.items() if k != "metrics"}
+            with self._lock:
+                self._results[result["file_path"]] = result
+
+    def pop_results(self):
+        """Get results for duplicate files found since the last call
+
+        Yields
+        -------
+        dict
+            A result in the format of parse_file for each duplicate file. In
+            mode 'all', results of duplicates are yielded once the result of
+            their first file is added.
+        """
+        while self._found:
+            yield get_duplicate_result(*self._found.popleft())
+
+        with self._lock:
+            resolved = [
+                (self._pending.pop(first_file), self._results[first_file])
+                for first_file in list(self._pending)
+                if first_file in self._results
+            ]
+        for files, result in resolved:
+            for file in files:
+                yield copy_result(result, file)
+
+    def get_unresolved(self):
+        """Get duplicate files whose first file has no result, call after
+        pop_results
+
+        Returns
+        ----------
+        list
+            File paths of duplicates of files that failed to parse
+        """
+        return [file for files in self._pending.values() for file in files]
+
+
+class ChangedFiles:
+    """Iterate through files, skipping those unchanged since a previous scan
+
+    Results of unchanged files are stored until collected with pop_unchanged,
+    since files may be iterated in another thread (e.g., by
+    multiprocessing.Pool). Changed files are yielded as tasks of
+    process_task_worker, i.e., (file path, content hash or None).
+    """
+
+    def __init__(self, files, manifest=None, get_hash=None):
+        """Initialize a ChangedFiles iterator
+
+        Parameters
+        ----------
+        files : iterable
+            File paths
+        manifest : ScanManifest, optional
+            Results of a previous scan. All files are changed if None
+        get_hash : callable, optional
+            Called with each file path, returns its content hash if already
+            computed (e.g., DuplicateFiles.pop_hash) or None
+        """
+        self.files = files
+        self.manifest = manifest
+        self.get_hash = get_hash
+        self.unchanged = deque()
+        self.unchanged_count = 0
+
+    def __iter__(self):
+        for file in self.files:
+            content_hash = None
+            if self.get_hash is not None:
+                content_hash = self.get_hash(file)
+            result = None
+            if self.manifest is not None:
+                result = self.manifest.get_result(file, content_hash)
+            if result is None:
+                yield file, content_hash
+            else:
+                self.unchanged.append(result)
+                self.unchanged_count += 1
+
+    def pop_unchanged(self):
+        """Remove the results of unchanged files found so far
+
+        Yields
+        -------
+        dict
+            Output from ScanManifest.get_result
+        """
+        while self.unchanged:
+            yield self.unchanged.popleft()
+
+
+def write_results(all_data, output_file, output_dir=None):
+    """Group results by report type and write each group to a new csv
+
+    Parameters
+    ----------
+    all_data : list of dict
+        Outputs from process_file_worker
+    output_file : str
+       Report type in file name will be prepended to this value
+    output_dir : str, optional
+        Save results to this directory, default is local directory
+    """
+    with ResultsWriter(output_file, output_dir, mode="w") as writer:
+        for result in all_data:
+            writer.write(result)
+
+    for report_type, file_path in writer.file_paths.items():
+        print("%s data written to %s" % (report_type, file_path))
+
+
+class ResultsWriter:
+    """Write results to csv files, keeping one open file per report type"""
+
+    def __init__(
+        self, output_file, output_dir=None, mode="a", flush_interval=None
+    ):
+        """Initialize a ResultsWriter
+
+        Parameters
+        ----------
+        output_file : str
+           Report type in file name will be prepended to this value
+        output_dir : str, optional
+            Save results to this directory, default is local directory
+        mode : str, optional
+            'w' to overwrite existing csv files, 'a' to append to them. The
+            columns are written when a csv file is created or overwritten.
+        flush_interval : int, float, optional
+            Flush all open files if this many seconds have passed since the
+            last flush. Files are only flushed by close if None.
+        """
+        self.output_file = output_file
+        self.output_dir = output_dir
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self.file_paths = {}  # report_type: csv file path
+        self._files = {}  # report_type: (file object, csv.writer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_file_path(self, report_type):
+        """Get the csv file path of a report type
+
+        Parameters
+        ----------
+        report_type : str
+            ReportParser.report_type
+
+        Returns
+        ----------
+        str
+            output_file with report_type prepended, in output_dir
+        """
+        file_path = "%s_%s" % (report_type, self.output_file)
+        if self.output_dir is not None:
+            file_path = join(self.output_dir, file_path)
+        return file_path
+
+    def get_writer(self, report_type, columns):
+        """Get the csv.writer of a report type, opening its file if needed
+
+        Parameters
+        ----------
+        report_type : str
+            ReportParser.report_type
+        columns : list
+            ReportParser.columns, written if the file is new or overwritten
+
+        Returns
+        ----------
+        csv.writer
+            Writer of the open csv file for report_type
+        """
+        if report_type not in self._files:
+            file_path = self.get_file_path(report_type)
+            write_columns = self.mode == "w" or not isfile(file_path)
+            f = open(file_path, self.mode, encoding="utf-8", newline="")
+            writer = csv.writer(
+                f, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
+            )
+            if write_columns:
+                writer.writerow(columns)
+            self._files[report_type] = (f, writer)
+            self.file_paths[report_type] = file_path
+        return self._files[report_type][1]
+
+    def write(self, result):
+        """Write the result of a single file to its report type's csv
+
+        Parameters
+        ----------
+        result : dict
+            Output from parse_file or process_file_worker
+
+        Returns
+        ----------
+        bool
+            False if result has no report_type (i.e., parsing failed)
+        """
+        if result["report_type"] is None:
+            return False
+        writer = self.get_writer(result["report_type"], result["columns"])
+        writer.writerow(result["data"])
+        if self.flush_interval is not None:
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+        return True
+
+    def flush(self):
+        """Flush all open csv files"""
+        for f, _ in self._files.values():
+            f.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Close all open csv files"""
+        for f, _ in self._files.values():
+            f.close()
+        self._files = {}
+
+
+def get_results_writer(
+    output_file, output_dir=None, mode="a", flush_interval=None, database=None
+):
+    """Get the writer of process_files
+
+    Parameters
+    ----------
+    output_file : str
+       Report type in file name will be prepended to this value
+    output_dir : str, optional
+        Save results to this directory, default is local directory
+    mode : str, optional
+        File mode of ResultsWriter
+    flush_interval : int, float, optional
+        Maximum number of seconds between flushes
+    database : str, optional
+        Path to an SQLite database, used instead of csv files if provided
+
+    Returns
+    ----------
+    ResultsWriter, SQLiteWriter
+        SQLiteWriter if database is provided, otherwise ResultsWriter
+    """
+    if database is None:
+        return ResultsWriter(
+            output_file, output_dir, mode=mode, flush_interval=flush_interval
         )
+    from IQDMPDF.parsers.parser import get_registry
 
-        print("Writing results to file(s) ...")
+    return SQLiteWriter(
+        database,
+        analysis_columns=get_registry().get_analysis_columns(),
+        flush_interval=flush_interval,
+    )
 
-        # remove failed parsing
-        all_data = [row for row in all_data if row["report_type"] is not None]
 
-        report_types = list(set([row["report_type"] for row in all_data]))
+def write_with_metrics(writer, result, metrics_writer=None):
+    """Write a result, then its metrics with the duration of the write
 
-        sorted_data = {key: [] for key in report_types}
-        columns = {}
-        for row in all_data:
-            report_type = row["report_type"]
-            sorted_data[report_type].append(row["data"])
-            if report_type not in columns.keys():
-                columns[report_type] = row["columns"]
+    Parameters
+    ----------
+    writer : ResultsWriter, SQLiteWriter
+        Writer of process_files
+    result : dict
+        Output from parse_file or process_file_worker. The "metrics" key, if
+        any, is removed so copies of result (e.g., for duplicate files) do
+        not repeat it.
+    metrics_writer : MetricsWriter, optional
+        Writer of the metrics records
 
-        for report_type, data in sorted_data.items():
-            current_file = "%s_%s" % (report_type, output_file)
-            if output_dir is not None:
-                current_file = join(output_dir, current_file)
+    Returns
+    ----------
+    bool
+        Return of writer.write
+    """
+    record = result.pop("metrics", None)
+    start = time.perf_counter()
+    written = writer.write(result)
+    if metrics_writer is not None and record is not None:
+        duration = time.perf_counter() - start
+        record["stages"]["write"] = duration
+        record["total"] += duration
+        metrics_writer.write(record)
+    return written
 
-            output = [columns[report_type]]
-            output.extend(data)
-            write_csv(current_file, output)
 
-            print("%s data written to %s" % (report_type, current_file))
+def get_metrics_file_path(output_file, output_dir=None):
+    """Get the JSON Lines file path of process_files(metrics=True)
 
+    Parameters
+    ----------
+    output_file : str
+        The output_file of process_files
+    output_dir : str, optional
+        The output_dir of process_files
 
-def process_file_worker(file_path):
+    Returns
+    ----------
+    str
+        <METRICS_FILE_PREFIX>_<output_file without extension>.jsonl, in
+        output_dir
+    """
+    file_path = "%s_%s.jsonl" % (METRICS_FILE_PREFIX, splitext(output_file)[0])
+    if output_dir is not None:
+        file_path = join(output_dir, file_path)
+    return file_path
+
+
+def init_worker(plugin_dirs=None):
+    """Build the ParserRegistry of a worker process
+
+    This is the multiprocessing initializer of process_files, importing
+    IQDMPDF.parsers in the worker rather than in the main process.
+
+    Parameters
+    ----------
+    plugin_dirs : list of str, optional
+        Directories of report class plugin JSON files
+    """
+    from IQDMPDF.parsers.parser import init_registry
+
+    init_registry(plugin_dirs)
+
+
+def process_file_worker(
+    file_path, cache=None, metrics=False, content_hash=None
+):
     """Mutliprocessing worker function
 
     Parameters
     ----------
     file_path : str
         PDF file to be passed to ReportParser
+    cache : ExtractionCache, optional
+        Persistent cache of extracted PDF data
+    metrics : bool, optional
+        Include a metrics.FileMetrics record in the result
+    content_hash : str, optional
+        Output from utilities.get_file_hash for file_path, if known
 
     Returns
     -------
     dict
-        {"data": ReportParser.csv_data, "report_type": ReportParser.report_type,
-        "columns": ReportParser.columns}
+        Output from parse_file, with values of None if parsing failed
     """
-    data, report_type, columns = None, None, None
     try:
-        parser = ReportParser(file_path)
-        if parser.report is not None:
-            data = parser.csv_data
-            report_type = parser.report_type
-            columns = parser.columns
+        return parse_file(
+            file_path, cache=cache, metrics=metrics, content_hash=content_hash
+        )
     except Exception:
-        pass
-    return {"data": data, "report_type": report_type, "columns": columns}
+        return get_failed_result(file_path, content_hash)
+
+
+def process_task_worker(task, cache=None, metrics=False):
+    """Mutliprocessing worker function for the tasks of ChangedFiles
+
+    Parameters
+    ----------
+    task : tuple
+        PDF file path and its content hash (or None)
+    cache : ExtractionCache, optional
+        Persistent cache of extracted PDF data
+    metrics : bool, optional
+        Include a metrics.FileMetrics record in the result
+
+    Returns
+    -------
+    dict
+        Output from process_file_worker
+    """
+    file_path, content_hash = task
+    return process_file_worker(file_path, cache, metrics, content_hash)
+
+
+def get_failed_result(file_path, content_hash=None):
+    """Get the result of a file that raised an error while parsing
+
+    Parameters
+    ----------
+    file_path : str
+        PDF file passed to parse_file
+    content_hash : str, optional
+        Output from utilities.get_file_hash for file_path, if known
+
+    Returns
+    -------
+    dict
+        Result in the format of parse_file with values of None, other than
+        file_path and content_hash
+    """
+    return {
+        "data": None,
+        "report_type": None,
+        "columns": None,
+        "file_path": file_path,
+        "content_hash": content_hash,
+    }
+
+
+def get_timeout_result(file_path):
+    """Get the result of a file that exceeded the timeout of process_files
+
+    Parameters
+    ----------
+    file_path : str
+        PDF file passed to process_file_worker
+
+    Returns
+    -------
+    dict
+        Result in the format of parse_file with a report_type of
+        TIMED_OUT_REPORT_TYPE, so the file path is written to its own csv
+    """
+    return {
+        "data": [file_path],
+        "report_type": TIMED_OUT_REPORT_TYPE,
+        "columns": ["report_file_path"],
+        "file_path": file_path,
+    }
+
+
+def get_task_timeout_result(task):
+    """Get the result of a task of ChangedFiles that exceeded the timeout
+
+    Parameters
+    ----------
+    task : tuple
+        PDF file path and its content hash (or None)
+
+    Returns
+    -------
+    dict
+        Output from get_timeout_result
+    """
+    return get_timeout_result(task[0])
+
+
+def get_duplicate_result(file_path, first_file_path):
+    """Get the result of a file skipped by process_files(duplicates='first')
+
+    Parameters
+    ----------
+    file_path : str
+        Path of a duplicate file
+    first_file_path : str
+        Path of the first file found with the same contents
+
+    Returns
+    -------
+    dict
+        Result in the format of parse_file with a report_type of
+        DUPLICATE_REPORT_TYPE
+    """
+    return {
+        "data": [file_path, first_file_path],
+        "report_type": DUPLICATE_REPORT_TYPE,
+        "columns": ["report_file_path", "duplicate_of"],
+        "file_path": file_path,
+    }
+
+
+def copy_result(result, file_path):
+    """Copy the result of a file for another file with the same contents
+
+    Parameters
+    ----------
+    result : dict
+        Output from parse_file or process_file_worker
+    file_path : str
+        Path of a file with the same contents as result["file_path"]
+
+    Returns
+    -------
+    dict
+        result with the file path (and creation date) of file_path
+    """
+    if result["report_type"] == TIMED_OUT_REPORT_TYPE:
+        return get_timeout_result(file_path)
+    data = result["data"]
+    columns = result["columns"] or []
+    if data and columns[-2:] == FILE_INFO_COLUMNS:
+        data = data[:-2] + [creation_date(file_path), file_path]
+    result = dict(result, data=data, file_path=file_path)
+    result.pop("metrics", None)  # metrics are of the original file
+    return result
 
 
-def process_file(file_path, output_file, output_dir=None):
+def parse_file(file_path, cache=None, metrics=False, content_hash=None):
+    """Process a pdf file into a parser class
+
+    Parameters
+    ----------
+    file_path : str
+        PDF file to be passed to ReportParser
+    cache : ExtractionCache, optional
+        Persistent cache of extracted PDF data
+    metrics : bool, optional
+        Set to True to time each stage of parsing
+    content_hash : str, optional
+        Output from utilities.get_file_hash for file_path, if known, so the
+        file is not hashed again
+
+    Returns
+    -------
+    dict
+        {"data": ReportParser.csv_data,
+        "report_type": ReportParser.report_type,
+        "columns": ReportParser.columns, "file_path": file_path,
+        "content_hash": sha256 of the file}. Values other than file_path
+        (and a provided content_hash) are None if no report class was
+        identified. If metrics is True,
+        "metrics" has the output of metrics.FileMetrics.to_dict.
+    """
+    from IQDMPDF.parsers.parser import ReportParser
+
+    data, report_type, columns = None, None, None
+    file_metrics = FileMetrics(file_path) if metrics else None
+    parser = ReportParser(
+        file_path,
+        cache=cache,
+        metrics=file_metrics,
+        content_hash=content_hash,
+    )
+    if parser.report is not None:
+        data = parser.csv_data
+        report_type = parser.report_type
+        columns = parser.columns
+        content_hash = parser.extraction.content_hash
+    result = {
+        "data": data,
+        "report_type": report_type,
+        "columns": columns,
+        "file_path": file_path,
+        "content_hash": content_hash,
+    }
+    if file_metrics is not None:
+        result["metrics"] = file_metrics.to_dict()
+    return result
+
+
+def process_file(file_path, output_file, output_dir=None, cache=None):
     """Process a pdf file into a parser class, write data to csv
 
     Parameters
@@ -141,12 +984,28 @@ def process_file(file_path, output_file, output_dir=None):
        Report type in file name will be prepended to this value
     output_dir : str, optional
         Save results to this directory, default is local directory
+    cache : ExtractionCache, optional
+        Persistent cache of extracted PDF data
     """
-    parser = ReportParser(file_path)
-    if parser.report is not None:
-        row = parser.csv_data
+    write_result(parse_file(file_path, cache=cache), output_file, output_dir)
+
+
+def write_result(result, output_file, output_dir=None):
+    """Append the result of a single file to its report type's csv
+
+    Parameters
+    ----------
+    result : dict
+        Output from parse_file
+    output_file : str
+       Report type in file name will be prepended to this value
+    output_dir : str, optional
+        Save results to this directory, default is local directory
+    """
+    if result["report_type"] is not None:
+        row = result["data"]
         current_file = "%s_%s" % (
-            parser.report_type,
+            result["report_type"],
             output_file,
         )  # prepend report type to file name
         if output_dir is not None:
@@ -154,11 +1013,101 @@ def process_file(file_path, output_file, output_dir=None):
         if row:
             # if file doesn't exist, need to write columns
             if not isfile(current_file):
-                write_csv(current_file, [parser.columns])
+                write_csv(current_file, [result["columns"]])
             # write the processed data
             write_csv(current_file, [row], mode="a")
     else:
-        print("Skipping: %s" % file_path)
+        print("Skipping: %s" % result["file_path"])
+
+
+def get_shard_file_name(file_name, shard_index, shard_count):
+    """Add the shard to a file name, e.g., results.shard-0-of-4.csv
+
+    Parameters
+    ----------
+    file_name : str
+        Any file name
+    shard_index : int
+        Index of the shard (0 to shard_count - 1)
+    shard_count : int
+        Total number of shards
+
+    Returns
+    ----------
+    str
+        file_name with the shard inserted before the extension
+    """
+    root, ext = splitext(file_name)
+    return "%s.shard-%s-of-%s%s" % (root, shard_index, shard_count, ext)
+
+
+def merge_shards(init_directory, output_file, output_dir=None):
+    """Combine the csv files of process_files shards
+
+    Parameters
+    ----------
+    init_directory : str
+        Directory containing <report_type>_<output_file> csv files of each
+        shard, named with get_shard_file_name
+    output_file : str
+        The output_file used by process_files for each shard
+    output_dir : str, optional
+        Save results to this directory, default is local directory
+
+    Returns
+    ----------
+    dict
+        File paths of the merged csv files, by report type
+    """
+    root, ext = splitext(output_file)
+    pattern = re.compile(
+        r"^(?P<report_type>.+)_%s\.shard-(?P<index>\d+)-of-(?P<count>\d+)%s$"
+        % (re.escape(root), re.escape(ext))
+    )
+    shard_files, shard_counts, indices = {}, set(), set()
+    for file_name in sorted(listdir(init_directory)):
+        match = pattern.match(file_name)
+        if match:
+            index = int(match.group("index"))
+            shard_files.setdefault(match.group("report_type"), []).append(
+                (index, join(init_directory, file_name))
+            )
+            shard_counts.add(int(match.group("count")))
+            indices.add(index)
+
+    if len(shard_counts) > 1:
+        raise ValueError("Shard files have different shard counts")
+    for shard_count in shard_counts:
+        missing = sorted(set(range(shard_count)) - indices)
+        if missing:
+            print("No files found for shard(s): %s" % missing)
+
+    file_paths = {}
+    for report_type, files in shard_files.items():
+        file_path = "%s_%s" % (report_type, output_file)
+        if output_dir is not None:
+            file_path = join(output_dir, file_path)
+        with open(file_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(
+                f, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
+            )
+            columns = None
+            for _, shard_file in sorted(files):
+                with open(shard_file, "r", encoding="utf-8", newline="") as g:
+                    reader = csv.reader(g)
+                    shard_columns = next(reader, None)
+                    if columns is None:
+                        columns = shard_columns
+                        writer.writerow(columns)
+                    elif shard_columns != columns:
+                        raise ValueError(
+                            "Columns of %s do not match other shards"
+                            % shard_file
+                        )
+                    writer.writerows(reader)
+        file_paths[report_type] = file_path
+        print("%s data written to %s" % (report_type, file_path))
+    return file_paths
 
 
 def write_csv(file_path, rows, mode="w", newline=""):
@@ -218,6 +1167,47 @@ def validate_kwargs(kwargs, add_print_callback=True):
     except Exception:
         kwargs["processes"] = 1
 
+    if kwargs.get("cache_size") is not None:
+        try:
+            kwargs["cache_size"] = float(kwargs["cache_size"])
+        except ValueError:
+            kwargs["cache_size"] = None
+
+    if kwargs.get("flush_interval") is not None:
+        try:
+            kwargs["flush_interval"] = float(kwargs["flush_interval"])
+        except ValueError:
+            kwargs["flush_interval"] = None
+
+    if kwargs.get("timeout") is not None:
+        try:
+            kwargs["timeout"] = float(kwargs["timeout"])
+        except ValueError:
+            kwargs["timeout"] = None
+
+    if kwargs.get("max_tasks") is not None:
+        try:
+            kwargs["max_tasks"] = int(float(kwargs["max_tasks"]))
+        except ValueError:
+            kwargs["max_tasks"] = None
+
+    if kwargs.get("shard_count") is not None:
+        try:
+            kwargs["shard_count"] = int(kwargs["shard_count"])
+            kwargs["shard_index"] = int(kwargs["shard_index"])
+        except (TypeError, ValueError):
+            print("Shard index and count must be integers")
+            return {}
+        if not 0 <= kwargs["shard_index"] < kwargs["shard_count"]:
+            print("Shard index must be from 0 to shard count - 1")
+            return {}
+        if not kwargs.get("output_file"):
+            print("Output file must be provided so shards can be merged")
+            return {}
+    elif kwargs.get("shard_index") is not None:
+        print("Shard count not provided!")
+        return {}
+
     keys = [
         "init_directory",
         "ignore_extension",
@@ -227,6 +1217,19 @@ def validate_kwargs(kwargs, add_print_callback=True):
         "raise_errors",
         "callback",
         "processes",
+        "cache_dir",
+        "cache_size",
+        "incremental",
+        "manifest_file",
+        "flush_interval",
+        "timeout",
+        "max_tasks",
+        "duplicates",
+        "shard_index",
+        "shard_count",
+        "database",
+        "metrics",
+        "plugin_dirs",
     ]
     return {key: kwargs[key] for key in keys if key in list(kwargs)}
 
@@ -10,14 +10,26 @@
 
 
 from IQDMPDF.utilities import create_arg_parser
-from IQDMPDF.file_processor import process_files, validate_kwargs
+from IQDMPDF.file_processor import (
+    process_files,
+    validate_kwargs,
+    merge_shards,
+)
 
 
 def main():
-    """Call process_files with validated kwargs"""
+    """Call process_files with validated kwargs, or merge_shards"""
 
     parser = create_arg_parser()
     args = parser.parse_args()
+    if args.merge_shards:
+        if not args.init_directory or not args.output_file:
+            print("Initial directory and output file are required to merge")
+        else:
+            merge_shards(
+                args.init_directory, args.output_file, args.output_dir
+            )
+        return
     validated_kwargs = validate_kwargs(vars(args))
     if validated_kwargs:
         process_files(**validated_kwargs)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# manifest.py
+"""Scan manifest for incremental re-processing of IMRT QA reports"""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution
+
+from os.path import abspath, normpath, isfile, dirname
+from os import stat, replace, close
+import json
+import tempfile
+from threading import Lock
+from IQDMPDF.utilities import get_file_hash
+from IQDMPDF._version import __version__
+
+MANIFEST_FILE_NAME = "iqdmpdf_manifest.json"
+
+
+class ScanManifest:
+    """Record of previously processed files and their results
+
+    Each entry stores the file's size, modification time, content hash and
+    the result of process_file_worker. A file is considered unchanged if its
+    size and modification time match, or if its content hash matches (e.g.,
+    after being touched or copied). Manifests written by other versions of
+    IQDM-PDF are ignored, since parser output may differ. Entries may be
+    looked up, added and saved from different threads.
+    """
+
+    def __init__(self, file_path):
+        """Initialize a ScanManifest, loading file_path if it exists
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the manifest JSON file
+        """
+        self.file_path = file_path
+        self.previous = self.load()
+        self.current = {}
+        self._lock = Lock()  # guards current
+
+    def load(self):
+        """Load entries from a previously saved manifest
+
+        Returns
+        ----------
+        dict
+            Entries keyed by absolute file path, empty if the manifest does
+            not exist, cannot be read, or is from another IQDM-PDF version
+        """
+        if not isfile(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != __version__:
+            return {}
+        return data.get("files", {})
+
+    def save(self):
+        """Write the entries of the current scan to file_path"""
+        with self._lock:
+            data = {"version": __version__, "files": dict(self.current)}
+        directory = dirname(abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        close(fd)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        replace(tmp_path, self.file_path)
+
+    @staticmethod
+    def get_key(file_path):
+        """Get the manifest key of a file
+
+        Parameters
+        ----------
+        file_path : str
+            Path to a scanned file
+
+        Returns
+        ----------
+        str
+            Normalized absolute path
+        """
+        return normpath(abspath(file_path))
+
+    def get_result(self, file_path, content_hash=None):
+        """Get the stored result of an unchanged file
+
+        Parameters
+        ----------
+        file_path : str
+            Path to a scanned file
+        content_hash : str, optional
+            Output from utilities.get_file_hash for file_path, if known
+
+        Returns
+        ----------
+        dict, None
+            Output from process_file_worker for the previous scan, or None if
+            the file is new or has changed. Unchanged entries are carried
+            over to the current scan.
+        """
+        key = self.get_key(file_path)
+        entry = self.previous.get(key)
+        if entry is None:
+            return None
+
+        try:
+            file_stat = stat(file_path)
+        except OSError:
+            return None
+        size, mtime = file_stat.st_size, file_stat.st_mtime
+        if entry["size"] != size:
+            return None
+        if entry["mtime"] != mtime:
+            if content_hash is None:
+                content_hash = get_file_hash(file_path)
+            if entry["content_hash"] != content_hash:
+                return None
+            entry["mtime"] = mtime
+
+        with self._lock:
+            self.current[key] = entry
+        return dict(
+            entry["result"],
+            file_path=file_path,
+            content_hash=entry["content_hash"],
+        )
+
+    def add(self, file_path, result):
+        """Record the result of a newly processed file
+
+        Parameters
+        ----------
+        file_path : str
+            Path to a scanned file
+        result : dict
+            Output from process_file_worker
+        """
+        try:
+            file_stat = stat(file_path)
+            content_hash = result.get("content_hash")
+            if content_hash is None:
+                content_hash = get_file_hash(file_path)
+        except OSError:  # e.g., file removed during the scan
+            return
+        entry = {
+            "size": file_stat.st_size,
+            "mtime": file_stat.st_mtime,
+            "content_hash": content_hash,
+            "result": {
+                key: result.get(key)
+                for key in ["data", "report_type", "columns"]
+            },
+        }
+        with self._lock:
+            self.current[self.get_key(file_path)] = entry
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# metrics.py
+"""Opt-in timing of each stage of file processing"""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution
+
+from contextlib import contextmanager
+from os.path import getsize
+import json
+import time
+
+# Metrics of process_files are written to <prefix>_<output_file stem>.jsonl
+METRICS_FILE_PREFIX = "Metrics"
+
+
+class StageTimer:
+    """Accumulate the durations of named stages"""
+
+    def __init__(self):
+        """Initialize a StageTimer with no stages"""
+        self.stages = {}  # stage: seconds
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with statement
+
+        Parameters
+        ----------
+        name : str
+            Stage name, durations of repeated stages are summed
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, duration):
+        """Add a duration to a stage
+
+        Parameters
+        ----------
+        name : str
+            Stage name
+        duration : float
+            Seconds
+        """
+        self.stages[name] = self.stages.get(name, 0.0) + duration
+
+    def iter_stage(self, iterable, name):
+        """Time the production of each item of an iterable
+
+        Parameters
+        ----------
+        iterable : iterable
+            Any iterable, e.g., a directory scan
+        name : str
+            Stage name for the time spent getting items. Time spent by the
+            consumer between items is not included.
+
+        Yields
+        -------
+        any
+            Items of iterable
+        """
+        items = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+            yield item
+
+
+class FileMetrics(StageTimer):
+    """Stage durations and size information of a single file"""
+
+    def __init__(self, file_path):
+        """Initialize a FileMetrics object
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the processed file
+        """
+        StageTimer.__init__(self)
+        self.file_path = file_path
+        self.page_count = None
+        self.report_type = None
+
+    def to_dict(self):
+        """Get a JSON serializable record of the metrics
+
+        Returns
+        ----------
+        dict
+            file_path, report_type, bytes, page_count, stages (seconds by
+            stage name), and total (seconds)
+        """
+        try:
+            size = getsize(self.file_path)
+        except OSError:
+            size = None
+        return {
+            "type": "file",
+            "file_path": self.file_path,
+            "report_type": self.report_type,
+            "bytes": size,
+            "page_count": self.page_count,
+            "stages": dict(self.stages),
+            "total": sum(self.stages.values()),
+        }
+
+
+class MetricsWriter:
+    """Write metrics records to a JSON Lines file"""
+
+    def __init__(self, file_path):
+        """Initialize a MetricsWriter, overwriting file_path
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the JSON Lines file
+        """
+        self.file_path = file_path
+        self._file = open(file_path, "w", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record):
+        """Write a record as a single line
+
+        Parameters
+        ----------
+        record : dict
+            e.g., the return of FileMetrics.to_dict
+        """
+        self._file.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        """Flush the JSON Lines file"""
+        self._file.flush()
+
+    def close(self):
+        """Close the JSON Lines file"""
+        self._file.close()
+
+
+@contextmanager
+def timed(timer, name):
+    """Time a stage if a timer is provided
+
+    Parameters
+    ----------
+    timer : StageTimer, None
+        Metrics of the current file, or None if metrics are not recorded
+    name : str
+        Stage name
+    """
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
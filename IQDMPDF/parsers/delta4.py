@@ -9,7 +9,6 @@
 #    See the file LICENSE included with this distribution
 
 from IQDMPDF.parsers.generic import ParserBase
-from IQDMPDF.pdf_reader import CustomPDFReader
 
 
 class Delta4Report(ParserBase):
@@ -48,6 +47,8 @@ class Delta4Report(ParserBase):
             "Selected Detectors",
             "Parameter Definitions & Acceptance Criteria, Detectors",
         ]
+        # Parameter Definitions may continue on the second page
+        self.layout_pages = 2
         self.analysis_columns = {
             "uid": [0, 1, 2, 3, 4],
             "date": 4,
@@ -62,29 +63,24 @@ class Delta4Report(ParserBase):
             ],
         }
 
-    def __call__(self, report_file_path):
+    def __call__(self, report_file_path, extraction=None):
         """Process an IMRT QA report PDF
 
         Parameters
         ----------
         report_file_path : str
             File path pointing to an IMRT QA report
+        extraction : PDFExtraction, optional
+            Re-use this interpretation of report_file_path
         """
-        super().__call__(report_file_path)
+        super().__call__(report_file_path, extraction)
         laparams_kwargs = {"line_margin": 2, "char_margin": 100}
-        self.data = CustomPDFReader(report_file_path, laparams_kwargs)
-
         keys = [
             "Plan:",
             "Treatment Summary",
             "Parameter Definitions",
         ]
-        self.anchors = {
-            key: self.data.get_bbox_of_data(
-                key, return_all=True, include_text=True
-            )[0]
-            for key in keys
-        }
+        self.data, self.anchors = self.read_anchors(keys, laparams_kwargs)
 
         raw = self.anchors["Plan:"]["text"].split("\n")
         start = 0
@@ -374,9 +370,8 @@ class Delta4Report(ParserBase):
         """
         return self.gamma_index_row[4]
 
-    @property
-    def summary_data(self):
-        """A summary of data from the QA report
+    def get_summary_data(self):
+        """Calculate a summary of data from the QA report, see summary_data
 
         Returns
         ----------
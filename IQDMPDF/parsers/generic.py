@@ -8,9 +8,13 @@
 # This file is part of IQDM-PDF, released under a MIT license.
 #    See the file LICENSE included with this distribution
 
+from copy import deepcopy
+from functools import lru_cache
+import re
+from IQDMPDF.metrics import timed
 from IQDMPDF.utilities import are_all_strings_in_text
-from IQDMPDF.pdf_reader import CustomPDFReader, convert_pdf_to_txt
-import json
+from IQDMPDF.pdf_reader import CustomPDFReader, PDFExtraction, TOLERANCE
+from IQDMPDF.parsers.registry import load_template
 
 
 class ParserBase:
@@ -20,27 +24,162 @@ class ParserBase:
         """Initialize columns and identifiers"""
         self.columns = []
         self.identifiers = []
+        # Document info values (e.g., {"Producer": "..."}) of PDFs usually
+        # of this report type, see ReportParser.preclassify
+        self.info_identifiers = {}
+        # Pages used by get_summary_data, as page indices or the number of
+        # first pages. Other pages are not interpreted. None for all pages.
+        self.layout_pages = None
+        self._summary_data = None
+        self._csv_data = None
+        # FileMetrics of the current file, set by ReportParser if recorded
+        self.metrics = None
+
+    def __call__(self, file_path, extraction=None):
+        """Save file path and text
 
-    def __call__(self, file_path):
-        """"Save file path and text"""
+        Parameters
+        ----------
+        file_path : str
+            File path pointing to an IMRT QA report
+        extraction : PDFExtraction, optional
+            Re-use this interpretation of file_path rather than reading the
+            PDF again
+        """
         self.file_path = file_path
-        self.text = convert_pdf_to_txt(file_path).split("\n")
+        self.extraction = (
+            PDFExtraction(file_path) if extraction is None else extraction
+        )
+        # summary data of the previous file is no longer valid
+        self._summary_data = None
+        self._csv_data = None
+
+    @property
+    def text(self):
+        """Get the lines of the text content of all pages
+
+        Returns
+        ----------
+        list of str
+            Output from PDFExtraction.text split by line
+        """
+        return self.extraction.text.split("\n")
 
     def is_text_data_valid(self, text):
         """Check that all identifiers are in text
 
         Parameters
         ----------
-        text : str
-            Output from pdf_reader.convert_pdf_to_txt
+        text : str, PDFExtraction
+            Output from pdf_reader.convert_pdf_to_txt, or a PDFExtraction
 
         Returns
         ----------
         bool
             True if and only if all identifiers are found in text
         """
+        if isinstance(text, PDFExtraction):
+            text = text.text
         return are_all_strings_in_text(text, self.identifiers)
 
+    def read_anchors(
+        self, keys, laparams_kwargs=None, required=None, return_all=False
+    ):
+        """Read layout_pages and find the bounding boxes of anchor text
+
+        If a required anchor is not on layout_pages (e.g., after a cover
+        page), all pages are read instead.
+
+        Parameters
+        ----------
+        keys : list of str
+            Anchor text for CustomPDFReader.get_bbox_of_data_batch
+        laparams_kwargs : dict, optional
+            Keyword arguments for pdfminer.layout.LAParams
+        required : list of str, optional
+            Keys needed to parse the report, default is all keys
+        return_all : bool, optional
+            Get all matches of each key
+
+        Returns
+        ----------
+        tuple
+            CustomPDFReader of the pages read, and the output of its
+            get_bbox_of_data_batch (including text)
+        """
+        required = keys if required is None else required
+        for pages in [self.layout_pages, None]:
+            data = CustomPDFReader(
+                self.file_path,
+                laparams_kwargs,
+                extraction=self.extraction,
+                pages=pages,
+            )
+            anchors = data.get_bbox_of_data_batch(
+                keys, return_all=return_all, include_text=True
+            )
+            if pages is None or all(anchors[key] for key in required):
+                break
+        return data, anchors
+
+    def get_summary_data(self):
+        """Calculate a summary of data from the QA report, see summary_data
+
+        By default, the value of each column is the attribute named by
+        get_attribute_name (e.g., patient_name for 'Patient Name'), or an
+        empty string if it is None or undefined. Report classes with other
+        columns override this method.
+
+        Returns
+        ----------
+        dict
+            Keys will match columns
+        """
+        values = {
+            column: getattr(self, get_attribute_name(column), None)
+            for column in self.columns
+        }
+        return {k: "" if v is None else v for k, v in values.items()}
+
+    @property
+    def summary_data(self):
+        """A summary of data from the QA report, calculated once per file
+
+        Returns
+        ----------
+        dict
+            Output from get_summary_data for the current file
+        """
+        if self._summary_data is None:
+            with timed(self.metrics, "parse"):
+                self._summary_data = self.get_summary_data()
+        return self._summary_data
+
+    def get_summary_value(self, column, data_type=str, default=None):
+        """Get a value of summary_data converted to data_type
+
+        Parameters
+        ----------
+        column : str
+            A key of summary_data
+        data_type : callable, optional
+            Type of the returned value (e.g., float)
+        default : any, optional
+            Returned if the value is empty or cannot be converted
+
+        Returns
+        ----------
+        any
+            data_type(summary_data[column]), or default
+        """
+        value = self.summary_data[column]
+        if value is None or value == "":
+            return default
+        try:
+            return data_type(value)
+        except (TypeError, ValueError):
+            return default
+
     @property
     def csv_data(self):
         """Get a CSV data of summary_data for all columns for csv.writer
@@ -51,9 +190,12 @@ class ParserBase:
             summary data as a list in order of columns. File path automatically
             appended to data
         """
-        return [
-            str(self.summary_data[c]).replace("\n", "<>") for c in self.columns
-        ]
+        if self._csv_data is None:
+            self._csv_data = [
+                str(self.summary_data[c]).replace("\n", "<>")
+                for c in self.columns
+            ]
+        return list(self._csv_data)
 
 
 class GenericReport(ParserBase):
@@ -85,21 +227,20 @@ class GenericReport(ParserBase):
 
         ParserBase.__init__(self)
 
-        with open(json_file_path, "r") as f:
-            self.json_data = json.load(f)
+        self.json_data = load_template(json_file_path)
 
         self.report_type = self.json_data["report_type"]
         self.identifiers = self.json_data["identifiers"]
         self.columns = [el["column"] for el in self.json_data["data"]]
 
-        self.LUT = {
-            el["column"]: {
-                key: value for key, value in el.items() if key != "column"
-            }
-            for el in self.json_data["data"]
-        }
+        self.LUT = get_lut(self.json_data)
         self._process_ignored_from_json(self.LUT)
 
+        # compiled once per template, see get_plan if LUT is edited
+        self.plan = get_query_plan(json_file_path)
+        self.layout_pages = list(self.plan.pages)
+        self._plan_source = deepcopy(self._get_plan_source())
+
         self.text_cleaner = text_cleaner
 
         self.missing_columns = []
@@ -126,20 +267,50 @@ class GenericReport(ParserBase):
         else:
             data["ignored"] = [column]
 
-    def __call__(self, report_file_path):
+    def _get_plan_source(self):
+        """Get the LUT and alternates that plan is compiled from"""
+        return self.LUT, self.json_data.get("alternates", [])
+
+    def get_plan(self):
+        """Get the QueryPlan of LUT and json_data["alternates"]
+
+        The plan of the template is re-used unless LUT or the alternates
+        were edited (e.g., by a subclass), then it is compiled again and
+        layout_pages is updated.
+
+        Returns
+        ----------
+        QueryPlan
+            Compiled queries of the current LUT and alternates
+        """
+        source = self._get_plan_source()
+        if source != self._plan_source:
+            self.plan = QueryPlan(*source)
+            self.layout_pages = list(self.plan.pages)
+            self._plan_source = deepcopy(source)
+        return self.plan
+
+    def __call__(self, report_file_path, extraction=None):
         """Process an IMRT QA report PDF
 
         Parameters
         ----------
         report_file_path : str
             File path pointing to an IMRT QA report
+        extraction : PDFExtraction, optional
+            Re-use this interpretation of report_file_path
         """
-        super().__call__(report_file_path)
-        self.data = CustomPDFReader(report_file_path)
+        super().__call__(report_file_path, extraction)
+        self.missing_columns = []
+        self.get_plan()  # layout_pages of an edited LUT
+        self.data = CustomPDFReader(
+            report_file_path,
+            extraction=self.extraction,
+            pages=self.layout_pages,
+        )
 
-    @property
-    def summary_data(self):
-        """A summary of data from the QA report
+    def get_summary_data(self):
+        """Calculate a summary of data from the QA report, see summary_data
 
         Returns
         ----------
@@ -147,78 +318,193 @@ class GenericReport(ParserBase):
             Keys will match "column" elements from the JSON file. Values are
             of type str
         """
-        data = {
-            c: self.data.get_block_data(
-                **self.LUT[c], text_cleaner=self.text_cleaner
-            )
-            for c in self.columns
-        }
+        data, missing_columns = self.get_plan().run(
+            self.data, text_cleaner=self.text_cleaner
+        )
+        self.missing_columns.extend(missing_columns)
+        return data
 
-        self._process_block_data(data)
-        self._apply_alternates(data)
 
-        return data
+class QueryPlan:
+    """Block data queries of a GenericReport template, compiled once
+
+    Queries are grouped by page and mode so each page's PositionIndex is
+    looked up once, ignored values are stored as sets, and alternates are
+    kept in template order with their ignored values resolved.
+    """
 
-    def _process_block_data(self, data):
-        """Get the first item in data blocks, update missing_columns
+    def __init__(self, lut, alternates=None):
+        """Initialization of a QueryPlan
 
         Parameters
         ----------
-        data : dict
-            Has values of the return from CustomPDFReader.get_block_data
-
+        lut : dict
+            Template data elements by column, see get_lut
+        alternates : list, optional
+            The "alternates" of a report template, see GenericReport
         """
-        for key in list(data):
-            data[key] = self._process_data_element(data[key])
-            if not data[key]:
-                self.missing_columns.append(key)
+        alternates = [] if alternates is None else alternates
+        self.columns = tuple(lut)
+        # column names are not valid values
+        self.column_set = frozenset(self.columns)
+
+        # (page, mode): [(column index, pos, tol, numeric, ignored)]
+        self.groups = {}
+        # indices of the pages with data or alternates
+        self.pages = sorted(
+            {el["page"] for el in lut.values()}
+            | {el["page"] for el in alternates}
+        )
+        for c, (column, el) in enumerate(lut.items()):
+            key = (el["page"], get_mode(el))
+            query = self._compile_query(column, el, el.get("ignored", []))
+            self.groups.setdefault(key, []).append((c,) + query)
+
+        # [(column, page, mode, pos, tol, numeric, ignored)], in the order
+        # they are checked
+        self.alternates = []
+        for el in alternates:
+            # as in previous versions, LUT keys of the column are ignored too
+            column = el["column"]
+            ignored = set(el.get("ignored", [])) | set(lut[column])
+            query = self._compile_query(column, el, ignored | {"ignored"})
+            self.alternates.append((column, el["page"], get_mode(el)) + query)
 
-    def _process_data_element(self, data_block):
-        """Process data element from a data block
+    @staticmethod
+    def _compile_query(column, el, ignored):
+        """Get the (pos, tol, numeric, ignored) of a template data element
 
         Parameters
         ----------
-        data_block : a return from ``get_block_data``
+        column : str
+            The column of el
+        el : dict
+            An item of a template's "data" or "alternates", or LUT
+        ignored : list
+            Values ignored in addition to column
 
         Returns
-        -------
-        str
-            Returns the first element of a data block, unless it is equal to
-            a column name. Returns an empty string when nothing found.
-
+        ----------
+        tuple
+            Arguments of PDFPageParser.get_first_block_data
         """
-        if len(data_block) and data_block[0] not in self.columns:
-            return data_block[0]
-        return ""
-
-    def _apply_alternates(self, data):
-        """Check json_data["alternates"] for alternate instructions. Unlike
-        json_data["data"], multiple instances of a column can exist in
-        alternates. The code will check each item in alternate until a value
-        is found for that column (if a value isn't already found).
+        tol = el.get("tol", TOLERANCE)
+        tol = tuple(tol) if isinstance(tol, (tuple, list)) else (tol, tol)
+        return (
+            tuple(el["pos"]),
+            tol,
+            el.get("numeric"),
+            frozenset(ignored) | {column},
+        )
+
+    def run(self, reader, text_cleaner=None):
+        """Get the value of each column from a parsed PDF
 
         Parameters
         ----------
-        data : dict
-            Data from CustomPDFReader.get_block_data
+        reader : CustomPDFReader
+            The parsed PDF of a report
+        text_cleaner : callable, optional
+            A function called on each text element (e.g., remove leading ':')
 
         Returns
-        -------
-        dict
-            data edited by alternates if value is an empty string
-        """
-        if "alternates" in self.json_data:
-            for alternate in self.json_data["alternates"]:
-                key = alternate["column"]
-                alt = {k: v for k, v in alternate.items() if k != "column"}
-                self._assign_ignored(key, alt)
-                alt["ignored"].extend(self.LUT[key])
-                if key in self.missing_columns:
-                    data[key] = self.data.get_block_data(
-                        **alt, text_cleaner=self.text_cleaner
-                    )
-                    data[key] = self._process_data_element(data[key])
-                    if data[key] != "":
-                        self.missing_columns.pop(
-                            self.missing_columns.index(key)
-                        )
+        ----------
+        tuple
+            dict of values by column (empty strings for columns not found),
+            and a list of the columns not found
+        """
+        values = [""] * len(self.columns)
+        for (page, mode), queries in self.groups.items():
+            page_parser = reader.page[page]
+            for c, pos, tol, numeric, ignored in queries:
+                value = page_parser.get_first_block_data(
+                    pos, tol, text_cleaner, numeric, ignored, mode
+                )
+                if value not in self.column_set:
+                    values[c] = value
+        data = dict(zip(self.columns, values))
+
+        missing = [column for column, value in data.items() if not value]
+        for column, page, mode, pos, tol, numeric, ignored in self.alternates:
+            if column in missing:
+                value = reader.page[page].get_first_block_data(
+                    pos, tol, text_cleaner, numeric, ignored, mode
+                )
+                if value and value not in self.column_set:
+                    data[column] = value
+                    missing.remove(column)
+
+        return data, missing
+
+
+def get_attribute_name(column):
+    """Get the attribute of a report class for a column, see get_summary_data
+
+    Parameters
+    ----------
+    column : str
+        An item of a report class's columns
+
+    Returns
+    ----------
+    str
+        column in lower case, with each run of other characters replaced by
+        an underscore (e.g., 'Pass (%)' is 'pass')
+    """
+    return re.sub(r"[^a-z0-9]+", "_", column.lower()).strip("_")
+
+
+def get_lut(json_data):
+    """Get the data elements of a report template by column
+
+    Parameters
+    ----------
+    json_data : dict
+        A report template, see GenericReport
+
+    Returns
+    ----------
+    dict
+        Items of json_data["data"] without "column", keyed by "column"
+    """
+    return {
+        el["column"]: {
+            key: value for key, value in el.items() if key != "column"
+        }
+        for el in json_data["data"]
+    }
+
+
+def get_mode(el):
+    """Get the block data mode of a template data element
+
+    Parameters
+    ----------
+    el : dict
+        An item of a template's "data" or "alternates"
+
+    Returns
+    ----------
+    str
+        el["mode"] with 'center' as 'center-center', default 'bottom-left'
+    """
+    mode = el.get("mode", "bottom-left")
+    return "center-center" if mode == "center" else mode
+
+
+@lru_cache(maxsize=None)
+def get_query_plan(json_file_path):
+    """Compile a report template into a QueryPlan once per process
+
+    Parameters
+    ----------
+    json_file_path : str
+        File path to a JSON file describing a PDF report
+
+    Returns
+    ----------
+    QueryPlan
+        The compiled queries of the template
+    """
+    json_data = load_template(json_file_path)
+    return QueryPlan(get_lut(json_data), json_data.get("alternates"))
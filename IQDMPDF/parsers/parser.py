@@ -8,13 +8,21 @@
 # This file is part of IQDM-PDF, released under a MIT license.
 #    See the file LICENSE included with this distribution
 
-from IQDMPDF.pdf_reader import convert_pdf_to_txt
+from itertools import islice
+from IQDMPDF.metrics import timed
+from IQDMPDF.pdf_reader import PDFExtraction, render_raw_text
 from IQDMPDF.parsers.delta4 import Delta4Report
 from IQDMPDF.parsers.sncpatient import SNCPatientCustom, SNCPatientReport2020
 from IQDMPDF.parsers.verisoft import VeriSoftReport
-from IQDMPDF.utilities import creation_date
+from IQDMPDF.parsers.registry import ParserRegistry, get_plugin_specs
+from IQDMPDF.utilities import (
+    creation_date,
+    remove_whitespace,
+    FILE_INFO_COLUMNS,
+)
 
-# These classes will be checked in ReportParser.get_report()
+# These classes will be checked in ReportParser.get_report(), followed by
+# plugins (see registry.get_plugin_specs)
 REPORT_CLASSES = [
     Delta4Report,
     SNCPatientCustom,
@@ -22,22 +30,197 @@ REPORT_CLASSES = [
     VeriSoftReport,
 ]
 
+# Maximum number of pages interpreted by ReportParser.identify
+IDENTIFICATION_PAGES = 3
+
+# ParserRegistry of REPORT_CLASSES and plugins for this process
+_registry = None
+
 
 class ReportParser:
     """Determines which Report class to use, then processes the data."""
 
-    def __init__(self, file_path):
+    def __init__(
+        self,
+        file_path,
+        cache=None,
+        identification_pages=IDENTIFICATION_PAGES,
+        registry=None,
+        metrics=None,
+        content_hash=None,
+    ):
         """Initialization class for ReportParser
 
         Parameters
         ----------
         file_path : str
             File path pointing to an IMRT QA report
+        cache : IQDMPDF.cache.ExtractionCache, optional
+            Persistent cache of extracted PDF data
+        identification_pages : int, None, optional
+            Maximum number of pages searched for identifiers before the file
+            is rejected. Set to None to search all pages.
+        registry : ParserRegistry, optional
+            Report classes to check. Default is get_registry()
+        metrics : IQDMPDF.metrics.FileMetrics, optional
+            Record the duration of each stage (identify, extract, layout,
+            parse) of this file
+        content_hash : str, optional
+            Output from utilities.get_file_hash for file_path, if known
         """
         self.file_path = file_path
-        self.text = convert_pdf_to_txt(file_path)
+        self.registry = get_registry() if registry is None else registry
+        self.extraction = PDFExtraction(
+            file_path, cache=cache, content_hash=content_hash
+        )
+        self.identification_pages = identification_pages
+        self.metrics = metrics
         self.report = self.get_report()
+        # no more pages are needed, pending pdfminer objects are released
+        self.extraction.release()
         self.creation_date = creation_date(file_path)
+        if metrics is not None:
+            metrics.page_count = self.extraction.interpreted_page_count
+            metrics.report_type = getattr(self.report, "report_type", None)
+
+    @property
+    def text(self):
+        """Get the text content of the PDF
+
+        Returns
+        ----------
+        str
+            Output from PDFExtraction.text
+        """
+        return self.extraction.text
+
+    @property
+    def cached_text(self):
+        """Get previously extracted text, without interpreting any pages
+
+        Returns
+        ----------
+        str, None
+            PDFExtraction.cached_text, or cached_selected_text if only
+            selected pages were extracted, otherwise None
+        """
+        text = self.extraction.cached_text
+        if text is None:
+            text = self.extraction.cached_selected_text
+        return text
+
+    def preclassify(self):
+        """Suggest report classes from the document information
+
+        Only the document information dictionary (e.g., Producer) and the
+        first page are read. A report class with matching info_identifiers
+        is only suggested if all of its identifiers are also found on the
+        first page, otherwise the result is inconclusive.
+
+        Returns
+        ----------
+        list of int
+            Indices of registry.report_classes suggested by the document
+            information, in order of priority. Empty if inconclusive, or if
+            the text is available from the extraction cache.
+        """
+        if self.cached_text is not None:
+            return []
+        suggested = self.registry.match_info(self.extraction.info)
+        if not suggested:
+            return []
+        page = next(self.extraction.iter_raw_pages(), None)
+        if page is None:
+            return []
+        text = remove_whitespace(render_raw_text(page))
+        return [
+            index
+            for index in suggested
+            if self.registry.has_all_identifiers(
+                index, text, ignore_whitespace=True
+            )
+        ]
+
+    def get_text_pages(self, candidates):
+        """Get the pages needed to validate and parse candidate classes
+
+        Parameters
+        ----------
+        candidates : list of int
+            Indices of registry.report_classes
+
+        Returns
+        ----------
+        list of int, None
+            Indices of the pages read by identify and the layout_pages of
+            each candidate, or None if a candidate needs all pages
+        """
+        pages = set(range(self.extraction.interpreted_page_count))
+        for index in candidates:
+            layout_pages = self.registry.get_layout_pages(index)
+            if layout_pages is None:
+                return None
+            if isinstance(layout_pages, int):
+                layout_pages = range(layout_pages)
+            pages.update(layout_pages)
+        return sorted(pages)
+
+    def validate(self, candidates):
+        """Find report classes with all identifiers in the text
+
+        Only the pages from get_text_pages are interpreted and analyzed,
+        unless the text is already available (e.g., from the extraction
+        cache) and contains all identifiers of a candidate.
+
+        Parameters
+        ----------
+        candidates : list of int
+            Indices of registry.report_classes, output from identify
+
+        Returns
+        ----------
+        list of int
+            Indices of registry.report_classes with all identifiers found in
+            the text, in order of priority
+        """
+        text = self.cached_text
+        if text is not None:
+            valid = self.registry.match(text)
+            if any(index in valid for index in candidates):
+                return valid
+        pages = self.get_text_pages(candidates)
+        return self.registry.match(self.extraction.get_text(pages))
+
+    def identify(self):
+        """Find candidate report classes without layout analysis
+
+        Pages are interpreted one at a time, stopping as soon as all
+        identifiers of at least one report class are found, or after
+        identification_pages. Layout analysis is skipped, so identifiers are
+        compared with whitespace removed. If the text is available from the
+        extraction cache, it is used instead.
+
+        Returns
+        ----------
+        list of int
+            Indices of registry.report_classes with all identifiers found, in
+            order of priority. All identifiers are searched for in a single
+            pass of the text.
+        """
+        text = self.cached_text
+        if text is not None:
+            return self.registry.match(text)
+
+        pages = islice(
+            self.extraction.iter_raw_pages(), self.identification_pages
+        )
+        text = ""
+        for page in pages:
+            text += remove_whitespace(render_raw_text(page))
+            candidates = self.registry.match(text, ignore_whitespace=True)
+            if candidates:
+                return candidates
+        return []
 
     def get_report(self):
         """Determine the report_class, then return class with data processed
@@ -46,13 +229,31 @@ class ReportParser:
         ----------
         ParserBase inherited class
             Searches for a Report Class with matching identifiers, processes
-            the file and returns the Report Class
+            the file and returns the Report Class. Report classes suggested
+            by preclassify skip the page by page search of identify, unless
+            none of them is validated.
         """
-        for report_class in REPORT_CLASSES:
-            parser = report_class()  # initialize class
-            if parser.is_text_data_valid(self.text):
-                parser(self.file_path)  # parse the data
-                return parser
+        with timed(self.metrics, "identify"):
+            suggested = self.preclassify()
+            candidates = suggested or self.identify()
+        if candidates:
+            with timed(self.metrics, "extract"):
+                valid = self.validate(candidates)
+            if suggested and not any(i in valid for i in suggested):
+                # document information is only a hint, search the pages for
+                # the identifiers of all report classes as usual
+                with timed(self.metrics, "identify"):
+                    candidates = self.identify()
+                with timed(self.metrics, "extract"):
+                    valid = self.validate(candidates) if candidates else []
+            for index in candidates:
+                if index in valid:
+                    # parse the data, re-using the pdfminer interpretation
+                    parser = self.registry.get_parser(index)
+                    parser.metrics = self.metrics
+                    with timed(self.metrics, "layout"):
+                        parser(self.file_path, self.extraction)
+                    return parser
 
     @property
     def columns(self):
@@ -64,8 +265,7 @@ class ReportParser:
             Report columns + "report_file_creation" + "report_file_path"
         """
         columns = getattr(self.report, "columns", None)
-        file_info = ["report_file_creation", "report_file_path"]
-        return columns + file_info if columns else []
+        return columns + FILE_INFO_COLUMNS if columns else []
 
     @property
     def csv_data(self):
@@ -90,3 +290,34 @@ class ReportParser:
             Get ReportParser.report_type
         """
         return getattr(self.report, "report_type", "")
+
+
+def init_registry(plugin_dirs=None):
+    """Build the ParserRegistry of REPORT_CLASSES for this process
+
+    This is used by the multiprocessing initializer, so each worker
+    process initializes report classes and reads templates only once.
+    Plugins are added after REPORT_CLASSES, but only imported when a file
+    matches their identifiers.
+
+    Parameters
+    ----------
+    plugin_dirs : list of str, optional
+        Directories of plugin JSON files, in addition to entry points and
+        the IQDMPDF_PLUGIN_PATH environment variable
+    """
+    global _registry
+    _registry = ParserRegistry(REPORT_CLASSES + get_plugin_specs(plugin_dirs))
+
+
+def get_registry():
+    """Get the ParserRegistry of this process, building it if needed
+
+    Returns
+    ----------
+    ParserRegistry
+        The registry of REPORT_CLASSES and plugins
+    """
+    if _registry is None:
+        init_registry()
+    return _registry
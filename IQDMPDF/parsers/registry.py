@@ -0,0 +1,522 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# registry.py
+"""Registry of report classes and plugins, built once per process"""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution
+
+from copy import deepcopy
+from functools import lru_cache
+from importlib import import_module
+from os import environ, listdir, pathsep
+from os.path import isdir, join, splitext
+import json
+import sys
+from IQDMPDF.utilities import IdentifierMatcher, remove_whitespace
+
+# Installed packages add report classes with an entry point in this group,
+# loading to a dict of plugin metadata (see ReportClassSpec.from_dict)
+ENTRY_POINT_GROUP = "iqdmpdf.report_classes"
+# Directories of plugin JSON files, separated by os.pathsep
+PLUGIN_PATH_ENV = "IQDMPDF_PLUGIN_PATH"
+
+
+class ReportClassSpec:
+    """Identifier metadata of a report class, imported when first needed"""
+
+    def __init__(
+        self,
+        report_type,
+        identifiers,
+        class_path=None,
+        report_class=None,
+        analysis_columns=None,
+        search_path=None,
+        info_identifiers=None,
+    ):
+        """Initialize a ReportClassSpec
+
+        Parameters
+        ----------
+        report_type : str
+            report_type of the report class
+        identifiers : list of str
+            A file is only parsed with the report class if all identifiers
+            are found in its text
+        class_path : str, optional
+            Location of the report class as "module:class", required if
+            report_class is not provided
+        report_class : ParserBase inherited class, optional
+            An imported report class
+        analysis_columns : dict, optional
+            analysis_columns of the report class, imported if needed and not
+            provided
+        search_path : str, optional
+            Directory added to sys.path before importing class_path
+        info_identifiers : dict, optional
+            Document info values (e.g., {"Producer": "..."}) of PDFs usually
+            of this report type, see ParserRegistry.match_info
+        """
+        if class_path is None and report_class is None:
+            raise ValueError(
+                "class_path or report_class is required for %s" % report_type
+            )
+        self.report_type = report_type
+        self.identifiers = list(identifiers)
+        self.class_path = class_path
+        self.search_path = search_path
+        self.info_identifiers = dict(info_identifiers or {})
+        self._report_class = report_class
+        self._analysis_columns = analysis_columns
+        self._parser = None
+
+    @classmethod
+    def from_class(cls, report_class):
+        """Get the ReportClassSpec of an imported report class
+
+        Parameters
+        ----------
+        report_class : ParserBase inherited class
+            An imported report class, initialized once for its metadata
+
+        Returns
+        ----------
+        ReportClassSpec
+            Metadata from an instance of report_class
+        """
+        parser = report_class()
+        spec = cls(
+            parser.report_type,
+            parser.identifiers,
+            report_class=report_class,
+            analysis_columns=getattr(parser, "analysis_columns", None),
+            info_identifiers=getattr(parser, "info_identifiers", None),
+        )
+        spec._parser = parser
+        return spec
+
+    @classmethod
+    def from_dict(cls, metadata, search_path=None, source=None):
+        """Get a ReportClassSpec from plugin metadata
+
+        Parameters
+        ----------
+        metadata : dict
+            It should contain these keys (type): report_type (str),
+            identifiers (list of str), and class (str, "module:class").
+            analysis_columns (dict) and info_identifiers (dict) are
+            optional.
+        search_path : str, optional
+            Directory added to sys.path before importing the class
+        source : str, optional
+            Origin of metadata, for error messages
+
+        Returns
+        ----------
+        ReportClassSpec
+            Metadata of a report class that has not been imported
+        """
+        source = source or "report class metadata"
+        if not isinstance(metadata, dict):
+            raise ValueError("%s is not a dict" % source)
+        missing = {"report_type", "identifiers", "class"} - set(metadata)
+        if missing:
+            raise ValueError(
+                "%s is missing %s" % (source, ", ".join(sorted(missing)))
+            )
+        identifiers = metadata["identifiers"]
+        if (
+            not isinstance(identifiers, list)
+            or not identifiers
+            or not all(isinstance(i, str) for i in identifiers)
+        ):
+            raise ValueError(
+                "%s identifiers must be a non-empty list of str" % source
+            )
+        if ":" not in metadata["class"]:
+            raise ValueError("%s class must be 'module:class'" % source)
+        return cls(
+            metadata["report_type"],
+            identifiers,
+            class_path=metadata["class"],
+            analysis_columns=metadata.get("analysis_columns"),
+            search_path=search_path,
+            info_identifiers=metadata.get("info_identifiers"),
+        )
+
+    def load(self):
+        """Import the report class
+
+        Returns
+        ----------
+        ParserBase inherited class
+            The report class, imported on the first call
+        """
+        if self._report_class is None:
+            if self.search_path and self.search_path not in sys.path:
+                sys.path.append(self.search_path)
+            module_name, class_name = self.class_path.split(":", 1)
+            report_class = getattr(import_module(module_name), class_name)
+            self._parser = report_class()
+            if self._parser.report_type != self.report_type:
+                raise ValueError(
+                    "%s has report_type %s, but its metadata has %s"
+                    % (
+                        self.class_path,
+                        self._parser.report_type,
+                        self.report_type,
+                    )
+                )
+            self._report_class = report_class
+        return self._report_class
+
+    @property
+    def parser(self):
+        """An instance of the report class, used for its metadata
+
+        Returns
+        ----------
+        ParserBase inherited class
+            An initialized report class, importing it if needed
+        """
+        if self._parser is None:
+            self.load()
+        return self._parser
+
+    @property
+    def analysis_columns(self):
+        """Get analysis_columns, importing the report class if needed
+
+        Returns
+        ----------
+        dict, None
+            analysis_columns of the report class, None if undefined
+        """
+        if self._analysis_columns is None:
+            self._analysis_columns = getattr(
+                self.parser, "analysis_columns", None
+            )
+        return self._analysis_columns
+
+
+class ParserRegistry:
+    """Report classes with their identifiers compiled for identification"""
+
+    def __init__(self, report_classes):
+        """Compile identifiers of report classes and plugins
+
+        Parameters
+        ----------
+        report_classes : list
+            ParserBase inherited classes, initialized once for their
+            metadata, or ReportClassSpec objects, imported only when a file
+            matches their identifiers. In order of priority.
+        """
+        self.specs = [
+            spec
+            if isinstance(spec, ReportClassSpec)
+            else ReportClassSpec.from_class(spec)
+            for spec in report_classes
+        ]
+        self.identifiers = [spec.identifiers for spec in self.specs]
+
+        self.matcher = IdentifierMatcher(dict(enumerate(self.identifiers)))
+        self.raw_matcher = IdentifierMatcher(
+            {
+                i: [remove_whitespace(string) for string in identifiers]
+                for i, identifiers in enumerate(self.identifiers)
+            }
+        )
+
+    def match(self, text, ignore_whitespace=False):
+        """Find report classes with all identifiers in text
+
+        Parameters
+        ----------
+        text : str
+            Output from pdf_reader.convert_pdf_to_txt
+        ignore_whitespace : bool, optional
+            Set to True if whitespace has been removed from text
+
+        Returns
+        ----------
+        list of int
+            Indices of report_classes, in order of priority
+        """
+        matcher = self.raw_matcher if ignore_whitespace else self.matcher
+        return matcher.match(text)
+
+    def match_info(self, info):
+        """Find report classes suggested by the document information
+
+        Parameters
+        ----------
+        info : dict
+            Output from PDFExtraction.info
+
+        Returns
+        ----------
+        list of int
+            Indices of report_classes with info_identifiers, where each value
+            is found in the info value of the same key. In order of priority.
+        """
+        return [
+            i
+            for i, spec in enumerate(self.specs)
+            if spec.info_identifiers
+            and all(
+                value in info.get(key, "")
+                for key, value in spec.info_identifiers.items()
+            )
+        ]
+
+    def has_all_identifiers(self, index, text, ignore_whitespace=False):
+        """Check if text contains all identifiers of a report class
+
+        Parameters
+        ----------
+        index : int
+            Index of report_classes
+        text : str
+            Output from pdf_reader.convert_pdf_to_txt
+        ignore_whitespace : bool, optional
+            Set to True if whitespace has been removed from text
+
+        Returns
+        ----------
+        bool
+            True if every identifier of the report class is in text
+        """
+        identifiers = self.identifiers[index]
+        if ignore_whitespace:
+            identifiers = [remove_whitespace(i) for i in identifiers]
+        return all(identifier in text for identifier in identifiers)
+
+    @property
+    def report_classes(self):
+        """Get all report classes, importing plugins if needed
+
+        Returns
+        ----------
+        list
+            ParserBase inherited classes, in order of priority
+        """
+        return [spec.load() for spec in self.specs]
+
+    @property
+    def parsers(self):
+        """Get an instance of each report class, importing plugins if needed
+
+        Instances are only used for their metadata, get_parser returns a new
+        instance for each report so no state is shared between files.
+
+        Returns
+        ----------
+        list
+            Initialized report classes, in order of priority
+        """
+        return [spec.parser for spec in self.specs]
+
+    def get_analysis_columns(self):
+        """Get analysis_columns by report type
+
+        Returns
+        ----------
+        dict
+            analysis_columns of each report class, from plugin metadata if
+            provided so the plugin is not imported
+        """
+        return {spec.report_type: spec.analysis_columns for spec in self.specs}
+
+    def get_layout_pages(self, index):
+        """Get the pages used by a report class
+
+        Parameters
+        ----------
+        index : int
+            Index of report_classes
+
+        Returns
+        ----------
+        int, list of int, None
+            layout_pages of the report class (the number of first pages, or
+            page indices), None for all pages
+        """
+        return getattr(self.specs[index].parser, "layout_pages", None)
+
+    def get_parser(self, index):
+        """Get a new instance of a report class
+
+        Parameters
+        ----------
+        index : int
+            Index of report_classes
+
+        Returns
+        ----------
+        ParserBase inherited class
+            An initialized report class, ready to process a file
+        """
+        return self.specs[index].load()()
+
+
+def get_entry_point_specs(path=None):
+    """Get the ReportClassSpec of each installed entry point plugin
+
+    Parameters
+    ----------
+    path : list of str, optional
+        Search these directories for installed packages instead of sys.path
+
+    Returns
+    ----------
+    list
+        ReportClassSpec of each entry point in ENTRY_POINT_GROUP, sorted by
+        name. An entry point may also load to a report class, which is
+        then initialized for its metadata.
+    """
+    found = get_entry_points(ENTRY_POINT_GROUP, path)
+    specs = []
+    for entry_point in sorted(found, key=lambda e: e.name):
+        metadata = entry_point.load()
+        if isinstance(metadata, type):
+            specs.append(ReportClassSpec.from_class(metadata))
+        else:
+            source = "Entry point %s" % entry_point.name
+            specs.append(ReportClassSpec.from_dict(metadata, source=source))
+    return specs
+
+
+def get_entry_points(group, path=None):
+    """Get the installed entry points of a group
+
+    Parameters
+    ----------
+    group : str
+        Entry point group, e.g., ENTRY_POINT_GROUP
+    path : list of str, optional
+        Search these directories for installed packages instead of sys.path
+
+    Returns
+    ----------
+    list
+        Entry points (with name and load) of importlib.metadata, or of
+        pkg_resources on python < 3.8. The first entry point of each name
+        is kept.
+    """
+    try:
+        from importlib.metadata import distributions
+    except ImportError:  # python < 3.8
+        return get_pkg_resources_entry_points(group, path)
+    kwargs = {} if path is None else {"path": path}
+    found = {}
+    for distribution in distributions(**kwargs):
+        for entry_point in distribution.entry_points:
+            if entry_point.group == group:
+                found.setdefault(entry_point.name, entry_point)
+    return list(found.values())
+
+
+def get_pkg_resources_entry_points(group, path=None):
+    """Get the installed entry points of a group with setuptools
+
+    Parameters
+    ----------
+    group : str
+        Entry point group, e.g., ENTRY_POINT_GROUP
+    path : list of str, optional
+        Search these directories for installed packages instead of sys.path
+
+    Returns
+    ----------
+    list
+        pkg_resources.EntryPoint objects, see get_entry_points
+    """
+    import pkg_resources
+
+    working_set = pkg_resources.working_set
+    if path is not None:
+        working_set = pkg_resources.WorkingSet(path)
+    found = {}
+    for entry_point in working_set.iter_entry_points(group):
+        found.setdefault(entry_point.name, entry_point)
+    return list(found.values())
+
+
+def get_plugin_dir_specs(plugin_dir):
+    """Get the ReportClassSpec of each plugin JSON file in a directory
+
+    Parameters
+    ----------
+    plugin_dir : str
+        Directory of plugin JSON files (see ReportClassSpec.from_dict). The
+        directory is added to sys.path when a plugin is imported, so its
+        modules may be stored alongside the JSON files.
+
+    Returns
+    ----------
+    list
+        ReportClassSpec of each JSON file, sorted by file name
+    """
+    specs = []
+    for file_name in sorted(listdir(plugin_dir)):
+        if splitext(file_name)[1].lower() == ".json":
+            file_path = join(plugin_dir, file_name)
+            with open(file_path, "r") as f:
+                metadata = json.load(f)
+            specs.append(
+                ReportClassSpec.from_dict(
+                    metadata, search_path=plugin_dir, source=file_path
+                )
+            )
+    return specs
+
+
+def get_plugin_specs(plugin_dirs=None):
+    """Get the ReportClassSpec of each entry point and plugin directory
+
+    Parameters
+    ----------
+    plugin_dirs : list of str, optional
+        Directories of plugin JSON files, searched after those in the
+        IQDMPDF_PLUGIN_PATH environment variable
+
+    Returns
+    ----------
+    list
+        ReportClassSpec of entry points, then of plugin directories
+    """
+    dirs = [d for d in environ.get(PLUGIN_PATH_ENV, "").split(pathsep) if d]
+    dirs.extend(plugin_dirs or [])
+    specs = get_entry_point_specs()
+    for plugin_dir in dirs:
+        if not isdir(plugin_dir):
+            raise ValueError("Plugin directory not found: %s" % plugin_dir)
+        specs.extend(get_plugin_dir_specs(plugin_dir))
+    return specs
+
+
+def load_template(json_file_path):
+    """Load a report template, reading each file only once per process
+
+    Parameters
+    ----------
+    json_file_path : str
+        File path to a JSON file describing a PDF report (see GenericReport)
+
+    Returns
+    ----------
+    dict
+        A copy of the JSON data, which may be edited by the caller
+    """
+    return deepcopy(_read_template(json_file_path))
+
+
+@lru_cache(maxsize=None)
+def _read_template(json_file_path):
+    """Read and parse a JSON report template, see load_template"""
+    with open(json_file_path, "r") as f:
+        return json.load(f)
@@ -9,7 +9,6 @@
 #    See the file LICENSE included with this distribution
 
 from IQDMPDF.parsers.generic import GenericReport, ParserBase
-from IQDMPDF.pdf_reader import CustomPDFReader
 from IQDMPDF.paths import DIRECTORIES
 from os.path import join
 
@@ -128,6 +127,9 @@ class SNCPatientCustom(ParserBase):
             "Depth",
             "Energy",
         ]
+        self.info_identifiers = {"Producer": "wPDF"}
+        # all data is on the first page
+        self.layout_pages = 1
         self.analysis_columns = {
             "uid": [0, 1, 2],
             "date": 2,
@@ -140,18 +142,18 @@ class SNCPatientCustom(ParserBase):
             ],
         }
 
-    def __call__(self, report_file_path):
+    def __call__(self, report_file_path, extraction=None):
         """Process an IMRT QA report PDF
 
         Parameters
         ----------
         report_file_path : str
             File path pointing to an IMRT QA report
+        extraction : PDFExtraction, optional
+            Re-use this interpretation of report_file_path
         """
-        super().__call__(report_file_path)
+        super().__call__(report_file_path, extraction)
         laparams_kwargs = {"line_margin": 1}
-        self.data = CustomPDFReader(report_file_path, laparams_kwargs)
-
         keys = [
             "Date:",
             "QA File Parameter",
@@ -159,12 +161,11 @@ class SNCPatientCustom(ParserBase):
             "Summary",
             "Notes",
         ]
-        self.anchors = {
-            key: self.data.get_bbox_of_data(
-                key, return_all=True, include_text=True
-            )[0]
-            for key in keys
-        }
+        self.data, self.anchors = self.read_anchors(
+            keys,
+            laparams_kwargs,
+            required=["QA File Parameter", "Dose Comparison", "Summary"],
+        )
 
         self.file_param_block = self._get_lateral_block("QA File Parameter")
         # long names may cause Set1 to get picked up
@@ -605,9 +606,8 @@ class SNCPatientCustom(ParserBase):
         if "Notes" in text:
             return text.split("Notes")[1].strip()
 
-    @property
-    def summary_data(self):
-        """A summary of data from the QA report
+    def get_summary_data(self):
+        """Calculate a summary of data from the QA report, see summary_data
 
         Returns
         ----------
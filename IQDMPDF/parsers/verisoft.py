@@ -9,7 +9,6 @@
 #    See the file LICENSE included with this distribution
 
 from IQDMPDF.parsers.generic import ParserBase
-from IQDMPDF.pdf_reader import CustomPDFReader
 
 
 class VeriSoftReport(ParserBase):
@@ -92,6 +91,9 @@ class VeriSoftReport(ParserBase):
             "Institution",
             "Physicist",
         ]
+        self.info_identifiers = {"Creator": "ECRION PDF Encoder"}
+        # all data is on the first page
+        self.layout_pages = 1
         self.analysis_columns = {
             "uid": [0, 1, 5],
             "date": 5,
@@ -117,17 +119,17 @@ class VeriSoftReport(ParserBase):
             ],
         }
 
-    def __call__(self, report_file_path):
+    def __call__(self, report_file_path, extraction=None):
         """Process an IMRT QA report PDF
 
         Parameters
         ----------
         report_file_path : str
             File path pointing to an IMRT QA report
+        extraction : PDFExtraction, optional
+            Re-use this interpretation of report_file_path
         """
-        super().__call__(report_file_path)
-        self.data = CustomPDFReader(report_file_path)
-
+        super().__call__(report_file_path, extraction)
         keys = [
             "Administrative Data",
             "Data Set A",
@@ -141,12 +143,9 @@ class VeriSoftReport(ParserBase):
             "PTW",
             "Absolute Difference",
         ]
-        self.anchors = {
-            key: self.data.get_bbox_of_data(
-                key, return_all=True, include_text=True
-            )
-            for key in keys
-        }
+        self.data, self.anchors = self.read_anchors(
+            keys, required=["Data Set A", "Gamma 2D"], return_all=True
+        )
 
         for key in keys:
             if key != "Gamma 2D" and self.anchors[key] is not None:
@@ -775,9 +774,8 @@ class VeriSoftReport(ParserBase):
         """
         return self.anchors["PTW"]["text"].split(" - ")[1].strip()
 
-    @property
-    def summary_data(self):
-        """A summary of data from the QA report
+    def get_summary_data(self):
+        """Calculate a summary of data from the QA report, see summary_data
 
         Returns
         ----------
@@ -14,20 +14,25 @@
 
 
 from pdfminer.pdfparser import PDFParser
-from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfdocument import PDFDocument, PDFTextExtractionNotAllowed
 from pdfminer.pdfpage import PDFPage
 from pdfminer.pdfinterp import PDFResourceManager
 from pdfminer.pdfinterp import PDFPageInterpreter
-from pdfminer.converter import TextConverter
 from pdfminer.layout import LAParams
 from pdfminer.converter import PDFPageAggregator
+from pdfminer.pdftypes import resolve1
+from pdfminer.utils import decode_text
 import pdfminer
-from io import StringIO
+from bisect import bisect_left, bisect_right
+from io import BytesIO
+import copy
+import json
 from IQDMPDF.utilities import (
     get_sorted_indices,
     is_in_tol,
     bbox_to_pos,
     is_numeric,
+    get_file_hash,
 )
 
 # Search tolerance for get_block_data
@@ -47,49 +52,557 @@ def convert_pdf_to_txt(path):
     str
         The text content of the PDF
     """
-    rsrcmgr = PDFResourceManager()
-    retstr = StringIO()
-    laparams = LAParams()
-    device = TextConverter(rsrcmgr, retstr, laparams=laparams)
-    fp = open(path, "rb")
-    interpreter = PDFPageInterpreter(rsrcmgr, device)
-    password = ""
-    maxpages = 0
-    caching = True
-    pagenos = set()
-
-    for page in PDFPage.get_pages(
-        fp,
-        pagenos,
-        maxpages=maxpages,
-        password=password,
-        caching=caching,
-        check_extractable=True,
-    ):
-        interpreter.process_page(page)
+    return PDFExtraction(path).text
+
+
+def get_laparams_key(laparams_kwargs=None):
+    """Get a hashable, order-independent key for LAParams keyword arguments
+
+    Parameters
+    ----------
+    laparams_kwargs : dict, optional
+        Keyword arguments for pdfminer.layout.LAParams
+
+    Returns
+    ----------
+    str
+        JSON representation of laparams_kwargs with sorted keys
+    """
+    kwargs = {} if laparams_kwargs is None else laparams_kwargs
+    return json.dumps(kwargs, sort_keys=True)
+
+
+def get_pages_key(pages=None):
+    """Get a string to identify a page selection, e.g., for cache keys
+
+    Parameters
+    ----------
+    pages : int, list of int, optional
+        Number of first pages, or page indices (see PDFExtraction.get_layout)
+
+    Returns
+    ----------
+    str
+        Empty for all pages
+    """
+    if pages is None:
+        return ""
+    if isinstance(pages, int):
+        return "|first %s pages" % pages
+    return "|pages %s" % ",".join(str(p) for p in sorted(set(pages)))
+
+
+class PDFExtraction:
+    """Single pdfminer interpretation of a PDF, shared by all consumers
+
+    Each page is interpreted once without layout analysis, and only when
+    first needed, so identification can stop after the first few pages.
+    Plain text (as returned by ``convert_pdf_to_txt``) and page layouts for
+    any set of LAParams keyword arguments are then derived from these raw
+    pages and cached, so identification and every parser reuse the same
+    interpretation. If an ExtractionCache is provided, text and page data are
+    stored on disk and pdfminer is skipped entirely for previously extracted
+    files.
+    """
+
+    def __init__(self, file_path, cache=None, content_hash=None):
+        """Initialize a PDFExtraction object
+
+        Parameters
+        ----------
+        file_path : str
+            Absolute file path to the PDF to be read
+        cache : IQDMPDF.cache.ExtractionCache, optional
+            Persistent cache for text and page data
+        content_hash : str, optional
+            Output from utilities.get_file_hash for file_path, if known
+        """
+        self.file_path = file_path
+        self.cache = cache
+        self.is_extractable = True
+        self._content_hash = content_hash
+        self._parser = None
+        self._document = None
+        self._info = None
+        self._raw_pages = []
+        self._page_generator = None
+        self._all_pages_interpreted = False
+        self._text = None
+        self._layouts = {}
+        self._pages = {}
+
+    @property
+    def content_hash(self):
+        """Get the hash of the PDF file contents
+
+        Returns
+        ----------
+        str
+            Output from utilities.get_file_hash
+        """
+        if self._content_hash is None:
+            self._content_hash = get_file_hash(self.file_path)
+        return self._content_hash
+
+    def _load_from_cache(self, kind, laparams_key=""):
+        """Load data from the persistent cache, if available"""
+        if self.cache is not None:
+            key = self.cache.get_key(self.content_hash, kind, laparams_key)
+            return self.cache.load(key)
+
+    def _save_to_cache(self, kind, data, laparams_key=""):
+        """Store data in the persistent cache, if available"""
+        if self.cache is not None:
+            key = self.cache.get_key(self.content_hash, kind, laparams_key)
+            self.cache.save(key, data)
+
+    @property
+    def raw_pages(self):
+        """Un-analyzed layout objects for all pages, interpreted on demand
+
+        Returns
+        ----------
+        list of pdfminer.layout.LTPage
+            Pages containing raw LTChar, LTFigure, LTImage, etc. objects
+        """
+        for _ in self.iter_raw_pages():
+            pass
+        return self._raw_pages
+
+    def iter_raw_pages(self):
+        """Iterate over un-analyzed pages, interpreting each only once
+
+        Returns
+        ----------
+        generator
+            Yields pdfminer.layout.LTPage objects. Pages are not interpreted
+            until requested, so breaking early skips the remaining pages.
+        """
+        p = 0
+        while p < len(self._raw_pages) or self._interpret_next_page():
+            yield self._raw_pages[p]
+            p += 1
+
+    @property
+    def interpreted_page_count(self):
+        """Get the number of pages interpreted by pdfminer so far
+
+        Returns
+        ----------
+        int
+            Number of pages in raw_pages without interpreting more pages
+        """
+        return len(self._raw_pages)
+
+    @property
+    def page_count(self):
+        """Get the number of pages in the PDF
+
+        Returns
+        ----------
+        int
+            Number of pages
+        """
+        return len(self.raw_pages)
+
+    def _interpret_next_page(self):
+        """Interpret the next page of the PDF, if any
+
+        Returns
+        ----------
+        bool
+            True if a page was appended to raw_pages
+        """
+        if self._all_pages_interpreted:
+            return False
+        if self._page_generator is None:
+            self._page_generator = self._interpret()
+        try:
+            self._raw_pages.append(next(self._page_generator))
+        except StopIteration:
+            self._all_pages_interpreted = True
+            self._page_generator = None
+            return False
+        return True
+
+    @property
+    def document(self):
+        """Get the pdfminer document, parsing the trailer on first access
+
+        Returns
+        ----------
+        pdfminer.pdfdocument.PDFDocument
+            Document of the PDF, no pages are interpreted
+        """
+        if self._document is None:
+            # read the file up front, so the file isn't held open while the
+            # remaining pages are pending
+            with open(self.file_path, "rb") as fp:
+                self._parser = PDFParser(BytesIO(fp.read()))
+            self._document = PDFDocument(self._parser)
+            self.is_extractable = self._document.is_extractable
+        return self._document
+
+    @property
+    def info(self):
+        """Get the document information dictionary (e.g., Producer, Title)
+
+        Returns
+        ----------
+        dict
+            Values of the Info dictionaries of the trailer, decoded to str.
+            Empty if the PDF has no document information.
+        """
+        if self._info is None:
+            self._info = {}
+            for info in self.document.info:
+                for key, value in info.items():
+                    value = resolve1(value)
+                    if isinstance(value, bytes):
+                        value = decode_text(value)
+                    self._info[key] = str(value)
+        return self._info
+
+    def _interpret(self):
+        """Interpret pages of the PDF without layout analysis
+
+        Returns
+        ----------
+        generator
+            Yields raw page layout objects, one page at a time
+        """
+        document = self.document
+
+        rsrcmgr = PDFResourceManager()
+        device = PDFPageAggregator(rsrcmgr, laparams=None)
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+
+        try:
+            for p, page in enumerate(PDFPage.create_pages(document)):
+                # pages interpreted before a release are not repeated
+                if p >= len(self._raw_pages):
+                    interpreter.process_page(page)
+                    yield device.get_result()
+        finally:
+            device.close()
+            # release the file contents, as pages are no longer pending
+            self._close_document()
+
+    def release(self):
+        """Release the pdfminer document and any pending interpretation
+
+        Interpreted pages, layouts, and text are kept. If more pages are
+        needed later, the PDF is read again and only the remaining pages are
+        interpreted.
+        """
+        if self._page_generator is not None:
+            self._page_generator.close()
+            self._page_generator = None
+        self._close_document()
+
+    def _close_document(self):
+        """Close the pdfminer parser and document
+
+        Objects cached by the document refer back to it, these reference
+        cycles are cleared so the file contents are freed without waiting for
+        garbage collection.
+        """
+        if self._document is not None:
+            self._document._cached_objs.clear()
+            self._document._parsed_objs.clear()
+            self._parser.close()
+            self._parser.doc = None
+        self._parser, self._document = None, None
+
+    def select_pages(self, pages=None):
+        """Interpret the pages of a selection, and no pages after it
+
+        Parameters
+        ----------
+        pages : int, list of int, optional
+            Number of first pages, or page indices. Default is all pages.
+
+        Returns
+        ----------
+        tuple of int, None
+            Sorted indices of the selected pages in the PDF, or None for all
+            pages
+        """
+        if pages is None:
+            return None
+        if isinstance(pages, int):
+            pages = range(pages)
+        pages = sorted(set(pages))
+        count = pages[-1] + 1 if pages else 0
+        while len(self._raw_pages) < count and self._interpret_next_page():
+            pass
+        return tuple(p for p in pages if p < len(self._raw_pages))
+
+    def get_layout(self, laparams_kwargs=None, pages=None):
+        """Get analyzed page layouts for the given LAParams
+
+        Parameters
+        ----------
+        laparams_kwargs : dict, optional
+            Keyword arguments for pdfminer.layout.LAParams
+        pages : int, list of int, optional
+            Only interpret and analyze these pages (see select_pages). Default
+            is all pages. Each page is analyzed once per LAParams.
+
+        Returns
+        ----------
+        list of pdfminer.layout.LTPage, None
+            Layout objects equivalent to PDFPageAggregator.get_result() with
+            the provided LAParams, up to the last selected page. Pages that
+            are not selected are None.
+        """
+        key = get_laparams_key(laparams_kwargs)
+        pages = self.select_pages(pages)
+        if pages is None:
+            pages = range(self.page_count)
+        analyzed = self._layouts.setdefault(key, {})
+        missing = [p for p in pages if p not in analyzed]
+        if missing:
+            kwargs = {} if laparams_kwargs is None else laparams_kwargs
+            laparams = LAParams(**kwargs)
+            for p in missing:
+                analyzed[p] = analyze_page(self._raw_pages[p], laparams)
+        count = pages[-1] + 1 if pages else 0
+        return [analyzed[p] if p in pages else None for p in range(count)]
+
+    def get_pages(self, laparams_kwargs=None, pages=None):
+        """Get parsed text blocks of each page for the given LAParams
+
+        Parameters
+        ----------
+        laparams_kwargs : dict, optional
+            Keyword arguments for pdfminer.layout.LAParams
+        pages : int, list of int, optional
+            Only parse these pages, see get_layout
+
+        Returns
+        ----------
+        list of PDFPageParser
+            Parsed and sorted page data, loaded from the persistent cache
+            when available
+        """
+        key = get_laparams_key(laparams_kwargs) + get_pages_key(pages)
+        if key not in self._pages:
+            pages_data = self._load_from_cache("pages", key)
+            if pages_data is None:
+                layouts = self.get_layout(laparams_kwargs, pages)
+                pages = []
+                for p, page in enumerate(layouts):
+                    keys = ["bbox", "x", "y", "text"]
+                    page_data = {k: [] for k in keys}
+                    lt_objs = [] if page is None else page._objs
+                    pages.append(
+                        PDFPageParser(lt_objs, page_data, page_index=p)
+                    )
+                self._save_to_cache("pages", [pg.data for pg in pages], key)
+            else:
+                pages = [
+                    PDFPageParser(None, page_data, page_index=p)
+                    for p, page_data in enumerate(pages_data)
+                ]
+            self._pages[key] = pages
+        return self._pages[key]
+
+    @property
+    def cached_text(self):
+        """Get the text content only if it is available without pdfminer
+
+        Returns
+        ----------
+        str, None
+            The text content of the PDF if previously computed or stored in
+            the persistent cache, otherwise None
+        """
+        if self._text is None:
+            self._text = self._load_from_cache("text")
+        return self._text
+
+    @property
+    def text(self):
+        """Get the text content of the PDF, using default LAParams
+
+        Returns
+        ----------
+        str
+            The text content of the PDF
+        """
+        if self.cached_text is None:
+            pages = self.get_layout()
+            if not self.is_extractable:
+                raise PDFTextExtractionNotAllowed(
+                    "Text extraction is not allowed: %s" % self.file_path
+                )
+            self._text = "".join(render_text(page) for page in pages)
+            self._save_to_cache("text", self._text)
+        return self._text
+
+    @property
+    def cached_selected_text(self):
+        """Get the text of the last get_text selection, if available
+
+        Returns
+        ----------
+        str, None
+            Output from get_text with pages, if stored in the persistent
+            cache (possibly for other pages), otherwise None
+        """
+        selected_text = self._load_from_cache("text", "selected")
+        return None if selected_text is None else selected_text[1]
+
+    def get_text(self, pages=None):
+        """Get the text content of selected pages, using default LAParams
+
+        Parameters
+        ----------
+        pages : int, list of int, optional
+            Only interpret and analyze these pages, see select_pages. Default
+            is all pages.
+
+        Returns
+        ----------
+        str
+            The text content of the pages, other pages up to the last
+            selected page are empty
+        """
+        if pages is None:
+            return self.text
+        layouts = self.get_layout(pages=pages)
+        if not self.is_extractable:
+            raise PDFTextExtractionNotAllowed(
+                "Text extraction is not allowed: %s" % self.file_path
+            )
+        # only the layouts are kept in memory, the text is rendered per call
+        text = "".join(
+            "\f" if page is None else render_text(page) for page in layouts
+        )
+        self._save_to_cache("text", [get_pages_key(pages), text], "selected")
+        return text
+
+
+def analyze_page(raw_page, laparams):
+    """Perform layout analysis on a copy of an un-analyzed page
+
+    Parameters
+    ----------
+    raw_page : pdfminer.layout.LTPage
+        A page interpreted with laparams=None, which is left unmodified
+    laparams : pdfminer.layout.LAParams
+        Layout analysis parameters
+
+    Returns
+    ----------
+    pdfminer.layout.LTPage
+        The analyzed page
+    """
+    page = pdfminer.layout.LTPage(
+        raw_page.pageid, raw_page.bbox, raw_page.rotate
+    )
+    for obj in raw_page:
+        page.add(_copy_for_analysis(obj, laparams))
+    page.analyze(laparams)
+    return page
+
+
+def _copy_for_analysis(obj, laparams):
+    """Copy figures that LTLayoutContainer.analyze would modify in place"""
+    if laparams.all_texts and isinstance(obj, pdfminer.layout.LTFigure):
+        figure = copy.copy(obj)
+        figure._objs = [_copy_for_analysis(o, laparams) for o in obj]
+        return figure
+    return obj
 
-    text = retstr.getvalue()
 
-    fp.close()
-    device.close()
-    retstr.close()
-    return text
+def render_raw_text(ltpage):
+    """Concatenate the characters of an un-analyzed page
+
+    Parameters
+    ----------
+    ltpage : pdfminer.layout.LTPage
+        A page interpreted with laparams=None
+
+    Returns
+    ----------
+    str
+        Text of all characters in content stream order. Without layout
+        analysis, spaces and line breaks between text blocks are not
+        reliable, so compare with whitespace removed.
+    """
+    text = []
+
+    def render(item):
+        if isinstance(item, pdfminer.layout.LTContainer):
+            for child in item:
+                render(child)
+        elif isinstance(item, pdfminer.layout.LTText):
+            text.append(item.get_text())
+
+    render(ltpage)
+    return "".join(text)
+
+
+def render_text(ltpage):
+    """Render an analyzed page to text, matching pdfminer's TextConverter
+
+    Parameters
+    ----------
+    ltpage : pdfminer.layout.LTPage
+        An analyzed page layout
+
+    Returns
+    ----------
+    str
+        Text of the page, terminated with a form feed
+    """
+    text = []
+
+    def render(item):
+        if isinstance(item, pdfminer.layout.LTContainer):
+            for child in item:
+                render(child)
+        elif isinstance(item, pdfminer.layout.LTText):
+            text.append(item.get_text())
+        if isinstance(item, pdfminer.layout.LTTextBox):
+            text.append("\n")
+
+    render(ltpage)
+    text.append("\f")
+    return "".join(text)
 
 
 class CustomPDFReader:
     """Custom PDF Parsing module"""
 
-    def __init__(self, file_path, laparams_kwargs=None):
+    def __init__(
+        self, file_path, laparams_kwargs=None, extraction=None, pages=None
+    ):
         """Initialize a CustomPDFReader object
 
         Parameters
         ----------
         file_path : str
             Absolute file path to the PDF to be read
+        laparams_kwargs : dict, optional
+            Keyword arguments for pdfminer.layout.LAParams
+        extraction : PDFExtraction, optional
+            Re-use the pdfminer interpretation of a previously created
+            PDFExtraction of file_path
+        pages : int, list of int, optional
+            Only interpret and analyze these pages (the number of first
+            pages, or page indices), other pages have no data. Default is
+            all pages.
         """
         self.page = []
         self.file_path = file_path
         self.laparams_kwargs = laparams_kwargs
+        self.pages = pages
+        self.extraction = (
+            PDFExtraction(file_path) if extraction is None else extraction
+        )
         self.convert_pdf_to_text()
         self.data = []
 
@@ -119,9 +632,9 @@ class CustomPDFReader:
             The index of the PDF page
         pos : tuple of int, float
             The (x,y) coordinates of the text block to be retrieved
-        tol : int, float, tuple
+        tol : int, float, tuple, list
             Maximum distance a block's x or y-coordinate may be from pos.
-            If a tuple is provided, first value is the x_tolerance,
+            If a tuple or list is provided, first value is the x_tolerance,
             2nd is y_tolerance
         text_cleaner : callable, optional
             A function called on each text element (e.g., remove leading ':')
@@ -154,51 +667,9 @@ class CustomPDFReader:
 
     def convert_pdf_to_text(self):
         """Extract text and coordinates from a PDF"""
-
-        # Open a PDF file.
-        fp = open(self.file_path, "rb")
-
-        # Create a PDF parser object associated with the file object.
-        parser = PDFParser(fp)
-
-        # Create a PDF document object that stores the document structure.
-        # Password for initialization as 2nd parameter
-        document = PDFDocument(parser)
-
-        # Check if the document allows text extraction. If not, abort.
-        # if not document.is_extractable:
-        #     raise PDFTextExtractionNotAllowed
-
-        # Create a PDF resource manager object that stores shared resources.
-        rsrcmgr = PDFResourceManager()
-
-        # BEGIN LAYOUT ANALYSIS
-        # Set parameters for analysis.
-        kwargs = {} if self.laparams_kwargs is None else self.laparams_kwargs
-        laparams = LAParams(**kwargs)
-
-        # Create a PDF page aggregator object.
-        device = PDFPageAggregator(rsrcmgr, laparams=laparams)
-
-        # Create a PDF interpreter object.
-        interpreter = PDFPageInterpreter(rsrcmgr, device)
-
-        # loop over all pages in the document
-        for p, page in enumerate(PDFPage.create_pages(document)):
-            # read the page into a layout object
-            interpreter.process_page(page)
-            layout = device.get_result()
-
-            # extract text from this object
-            keys = ["bbox", "x", "y", "text"]
-            page_data = {key: [] for key in keys}
-            self.page.append(
-                PDFPageParser(layout._objs, page_data, page_index=p)
-            )
-
-        device.close()
-        fp.close()
-        parser.close()
+        self.page.extend(
+            self.extraction.get_pages(self.laparams_kwargs, self.pages)
+        )
 
     def get_bbox_of_data(self, text, return_all=False, include_text=False):
         """Get the bounding box for a given string
@@ -234,6 +705,52 @@ class CustomPDFReader:
                     ans.append(this_ans)
         return ans if ans else None
 
+    def get_bbox_of_data_batch(
+        self, texts, return_all=False, include_text=False
+    ):
+        """Get the bounding boxes of many strings in one pass of the data
+
+        Parameters
+        ----------
+        texts : list of str
+            Check all parsed data for these strings
+        return_all : bool
+            If true, get all matches of each string, in the order
+            pdfminer.six found them. Otherwise, the search stops once each
+            string has been found.
+        include_text : bool
+            If true, also return the text data
+
+        Returns
+        ----------
+        dict
+            get_bbox_of_data(text, return_all, include_text) for each text
+        """
+        ans = {text: [] for text in texts}
+        remaining = list(ans)
+        for p, page in enumerate(self.page):
+            for stored_text, bbox in zip(page.data["text"], page.data["bbox"]):
+                found = [text for text in remaining if text in stored_text]
+                if not found:
+                    continue
+                for text in found:
+                    this_ans = {"page": p, "bbox": bbox}
+                    if include_text:
+                        this_ans["text"] = stored_text
+                    ans[text].append(this_ans)
+                if not return_all:
+                    remaining = [t for t in remaining if t not in found]
+                    if not remaining:
+                        break
+            if not remaining:
+                break
+
+        if return_all:
+            return {text: found or None for text, found in ans.items()}
+        return {
+            text: found[0] if found else None for text, found in ans.items()
+        }
+
 
 class PDFPageParser:
     """Custom PDF Page Parsing module"""
@@ -243,10 +760,12 @@ class PDFPageParser:
 
         Parameters
         ----------
-        lt_objs : list
-            A layout object from PDFPageAggregator.get_result()._objs
+        lt_objs : list, None
+            A layout object from PDFPageAggregator.get_result()._objs. If
+            None, page_data is assumed to be parsed and sorted already
+            (e.g., loaded from an ExtractionCache)
         page_data : dict
-            A dictionary of lists, with keys 'x', 'y', 'text'
+            A dictionary of lists, with keys 'bbox', 'x', 'y', 'text'
         page_index : int, optional
             The index of the page
         """
@@ -254,9 +773,13 @@ class PDFPageParser:
         self.data = page_data
         self.page_index = page_index
 
-        self.parse_obj(lt_objs)
-        self.sort_all_data_by_y()
-        self.sub_sort_all_data_by_x()
+        if lt_objs is not None:
+            self.parse_obj(lt_objs)
+            self.sort_all_data_by_y()
+            self.sub_sort_all_data_by_x()
+
+        # PositionIndex for each mode of get_block_data, built on first use
+        self.position_index = {}
 
     def __str__(self):
         """Get the coordinates and text value for all text blocks"""
@@ -342,9 +865,9 @@ class PDFPageParser:
         ----------
         pos : list of int, float
             The (x,y) coordinates of the text block to be retrieved
-        tol : int, float, tuple
+        tol : int, float, tuple, list
             Maximum distance a block's x or y-coordinate may be from pos.
-            If a tuple is provided, first value is the x_tolerance,
+            If a tuple or list is provided, first value is the x_tolerance,
             2nd is y_tolerance
         text_cleaner : callable, optional
             A function called on each text element (e.g., remove leading ':')
@@ -367,30 +890,148 @@ class PDFPageParser:
             All text data that meet the input constraints
         """
 
-        tol = tol if isinstance(tol, tuple) else (tol, tol)
+        tol = tuple(tol) if isinstance(tol, (tuple, list)) else (tol, tol)
 
         block_data = []
-        for i, data in enumerate(self.data["text"]):
-            data_pos = bbox_to_pos(self.data["bbox"][i], mode)
-            valid_x = is_in_tol(data_pos[0], pos[0], tol[0])
-            valid_y = is_in_tol(data_pos[1], pos[1], tol[1])
-            if valid_x and valid_y:
-                data_clean = (
-                    data.strip()
-                    if text_cleaner is None
-                    else text_cleaner(data)
-                )
+        for i in self.get_position_index(mode).query(pos, tol):
+            data_clean = self._clean_block_text(
+                self.data["text"][i], text_cleaner, numeric, ignored
+            )
+            if data_clean:
+                block_data.append(data_clean)
+        return block_data
+
+    def get_first_block_data(
+        self,
+        pos,
+        tol,
+        text_cleaner=None,
+        numeric=None,
+        ignored=None,
+        mode="bottom-left",
+    ):
+        """Get the first item of get_block_data, without cleaning the rest
 
-                if ignored is not None and data_clean in ignored:
-                    data_clean = ""
+        Parameters
+        ----------
+        pos : list of int, float
+            The (x,y) coordinates of the text block to be retrieved
+        tol : tuple
+            Maximum distance (x_tolerance, y_tolerance) from pos
+        text_cleaner : callable, optional
+            A function called on each text element (e.g., remove leading ':')
+        numeric : bool, optional
+            See get_block_data
+        ignored : set, list, optional
+            Strings that should be ignored, see get_block_data
+        mode : str, optional
+            See get_block_data
+
+        Returns
+        ----------
+        str
+            get_block_data(...)[0], or an empty string if nothing is found
+        """
+        for i in self.get_position_index(mode).query(pos, tol):
+            data_clean = self._clean_block_text(
+                self.data["text"][i], text_cleaner, numeric, ignored
+            )
+            if data_clean:
+                return data_clean
+        return ""
 
-                if data_clean and numeric is not None:
-                    data_is_numeric = is_numeric(data_clean)
-                    if (numeric and not data_is_numeric) or (
-                        not numeric and data_is_numeric
-                    ):
-                        data_clean = ""
+    def get_position_index(self, mode):
+        """Get the PositionIndex of this page's text blocks for a mode
 
-                if data_clean:
-                    block_data.append(data_clean)
-        return block_data
+        Parameters
+        ----------
+        mode : str
+            Options are combinations of top/center/bottom and
+            right/center/left, e.g., 'top-right', 'center-right'.
+            'center' is assumed to be 'center-center'.
+
+        Returns
+        ----------
+        PositionIndex
+            Index of text block positions, built once per mode
+        """
+        mode = "center-center" if mode == "center" else mode
+        if mode not in self.position_index:
+            self.position_index[mode] = PositionIndex(self.data["bbox"], mode)
+        return self.position_index[mode]
+
+    @staticmethod
+    def _clean_block_text(data, text_cleaner, numeric, ignored):
+        """Apply get_block_data's text_cleaner, ignored, and numeric options
+
+        Returns
+        ----------
+        str
+            The cleaned text, or an empty string if it is ignored or does not
+            meet the numeric constraint
+        """
+        data_clean = (
+            data.strip() if text_cleaner is None else text_cleaner(data)
+        )
+
+        if ignored is not None and data_clean in ignored:
+            data_clean = ""
+
+        if data_clean and numeric is not None:
+            data_is_numeric = is_numeric(data_clean)
+            if (numeric and not data_is_numeric) or (
+                not numeric and data_is_numeric
+            ):
+                data_clean = ""
+
+        return data_clean
+
+
+class PositionIndex:
+    """Sorted coordinate arrays of text block positions for range queries"""
+
+    def __init__(self, bboxes, mode):
+        """Initialization of a PositionIndex
+
+        Parameters
+        ----------
+        bboxes : list
+            Bounding boxes of each text block, [x0, y0, x1, y1]
+        mode : str
+            Anchor mode passed to utilities.bbox_to_pos
+        """
+        self.positions = [bbox_to_pos(bbox, mode) for bbox in bboxes]
+        self.order, self.coords = [], []
+        for dim in range(2):
+            values = [pos[dim] for pos in self.positions]
+            order = get_sorted_indices(values)
+            self.order.append(order)
+            self.coords.append([values[i] for i in order])
+
+    def query(self, pos, tol):
+        """Get indices of text blocks within tol of pos
+
+        Parameters
+        ----------
+        pos : list of int, float
+            The (x,y) coordinates of the query
+        tol : tuple
+            Maximum (exclusive) distance in x and y from pos
+
+        Returns
+        ----------
+        list of int
+            Indices of bboxes (in ascending order) with positions satisfying
+            utilities.is_in_tol in both dimensions
+        """
+        # range query on the dimension with the tighter tolerance
+        dim = 0 if tol[0] <= tol[1] else 1
+        other = 1 - dim
+        coords = self.coords[dim]
+        start = bisect_right(coords, pos[dim] - tol[dim])
+        stop = bisect_left(coords, pos[dim] + tol[dim])
+        return sorted(
+            i
+            for i in self.order[dim][start:stop]
+            if is_in_tol(self.positions[i][other], pos[other], tol[other])
+        )
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# supervisor.py
+"""Worker processes with a time limit per task"""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution
+
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+from queue import Empty
+import time
+from IQDMPDF.utilities import BackgroundIterator
+
+# Seconds to wait for a worker process to exit before it is killed
+JOIN_TIMEOUT = 1
+# Maximum seconds between checks of the queue while a worker is idle
+FEED_POLL_INTERVAL = 0.05
+
+
+class WorkerSupervisor:
+    """Alternative to multiprocessing.Pool.imap_unordered that can kill and
+    replace a worker process stuck on a single task"""
+
+    def __init__(
+        self,
+        worker,
+        processes,
+        timeout=None,
+        max_tasks=None,
+        initializer=None,
+        timeout_result=None,
+    ):
+        """Initialize a WorkerSupervisor
+
+        Parameters
+        ----------
+        worker : callable
+            single parameter function to be called on each item in a queue
+        processes : int
+            Number of worker processes
+        timeout : int, float, optional
+            Maximum number of seconds allowed per item. The worker process is
+            killed and replaced if exceeded.
+        max_tasks : int, optional
+            Replace each worker process after it completes this many items,
+            releasing any memory it has accumulated
+        initializer : callable, optional
+            Called with no arguments when each worker process starts
+        timeout_result : callable, optional
+            Called with an item that timed out, or whose worker process
+            died. Its return is yielded in place of the worker's.
+        """
+        self.worker = worker
+        self.processes = processes
+        self.timeout = timeout
+        self.max_tasks = max_tasks
+        self.initializer = initializer
+        self.timeout_result = timeout_result
+
+    def imap_unordered(self, queue):
+        """Call worker on each item in queue
+
+        Parameters
+        ----------
+        queue : iterable
+            A list of arguments for worker
+
+        Yields
+        -------
+        any
+            Returns from worker (or timeout_result), in order of completion
+        """
+        # items are found in a thread, so deadlines are checked while
+        # waiting for a slow queue (e.g., a directory scan)
+        items = BackgroundIterator(queue)
+        exhausted = False
+        workers = []
+        try:
+            for _ in range(self.processes):
+                workers.append(self._start_worker())
+
+            while True:
+                for w in workers:
+                    if w.busy or exhausted:
+                        continue
+                    # only block on the queue if no deadline is pending
+                    idle = not any(x.busy for x in workers)
+                    try:
+                        item = items.get(FEED_POLL_INTERVAL if idle else 0)
+                    except Empty:
+                        break
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    w.assign(item, self.timeout)
+
+                busy = [w for w in workers if w.busy]
+                if not busy:
+                    if exhausted:
+                        break
+                    continue
+
+                wait_timeout = None
+                if self.timeout is not None:
+                    deadline = min(w.deadline for w in busy)
+                    wait_timeout = max(0, deadline - time.monotonic())
+                if not exhausted and len(busy) < len(workers):
+                    # check the queue again for idle workers
+                    if (
+                        wait_timeout is None
+                        or wait_timeout > FEED_POLL_INTERVAL
+                    ):
+                        wait_timeout = FEED_POLL_INTERVAL
+                wait(
+                    [w.conn for w in busy]
+                    + [w.process.sentinel for w in busy],
+                    wait_timeout,
+                )
+
+                for i, w in enumerate(workers):
+                    if not w.busy:
+                        continue
+                    if w.conn.poll():
+                        try:
+                            success, result = w.conn.recv()
+                        except EOFError:  # died while sending
+                            success, result = True, self._timed_out(w)
+                        else:
+                            w.tasks += 1
+                        w.busy = False
+                        if not success:
+                            raise result
+                        yield result
+                    elif not w.process.is_alive() or w.is_expired():
+                        result = self._timed_out(w)
+                        w.busy = False
+                        yield result
+                    else:
+                        continue
+
+                    if not w.process.is_alive() or (
+                        self.max_tasks is not None
+                        and w.tasks >= self.max_tasks
+                    ):
+                        w.stop()
+                        workers[i] = self._start_worker()
+        finally:
+            for w in workers:
+                w.stop()
+
+    def _start_worker(self):
+        """Start a new worker process
+
+        Returns
+        ----------
+        _SupervisedWorker
+            An idle worker
+        """
+        return _SupervisedWorker(self.worker, self.initializer, self.max_tasks)
+
+    def _timed_out(self, worker):
+        """Kill a worker process, get the result for its item
+
+        Parameters
+        ----------
+        worker : _SupervisedWorker
+            A worker that exceeded timeout or died
+
+        Returns
+        ----------
+        any
+            Return of timeout_result for the item, or None
+        """
+        worker.kill()
+        if self.timeout_result is None:
+            return None
+        return self.timeout_result(worker.item)
+
+
+class _SupervisedWorker:
+    """A worker process and the item it is working on"""
+
+    def __init__(self, worker, initializer, max_tasks):
+        self.conn, child_conn = Pipe()
+        self.process = Process(
+            target=run_worker,
+            args=(child_conn, worker, initializer, max_tasks),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.busy = False
+        self.item = None
+        self.deadline = None
+        self.tasks = 0
+
+    def assign(self, item, timeout):
+        """Send an item to the worker process"""
+        self.conn.send(item)
+        self.busy = True
+        self.item = item
+        if timeout is not None:
+            self.deadline = time.monotonic() + timeout
+
+    def is_expired(self):
+        """Check if the current item has exceeded its deadline"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def kill(self):
+        """Terminate the worker process immediately"""
+        if self.process.is_alive():
+            # Process.kill (SIGKILL) requires python >= 3.7
+            getattr(self.process, "kill", self.process.terminate)()
+        self.process.join()
+
+    def stop(self):
+        """Let the worker process exit, killing it if it doesn't"""
+        self.conn.close()
+        self.process.join(JOIN_TIMEOUT)
+        self.kill()
+
+
+def run_worker(conn, worker, initializer=None, max_tasks=None):
+    """Worker process loop of WorkerSupervisor
+
+    Parameters
+    ----------
+    conn : multiprocessing.connection.Connection
+        Receives items, sends (success, worker return or exception)
+    worker : callable
+        single parameter function to be called on each item received
+    initializer : callable, optional
+        Called with no arguments before any items are received
+    max_tasks : int, optional
+        Exit after this many items
+    """
+    if initializer is not None:
+        initializer()
+    tasks = 0
+    while max_tasks is None or tasks < max_tasks:
+        try:
+            item = conn.recv()
+        except EOFError:  # supervisor is done
+            break
+        try:
+            result = (True, worker(item))
+        except Exception as e:
+            result = (False, e)
+        conn.send(result)
+        tasks += 1
+    conn.close()
@@ -0,0 +1,575 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# synthetic.py
+"""Generate a synthetic corpus of IMRT QA reports for scale testing"""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution
+
+import argparse
+import random
+import re
+from datetime import datetime, timedelta
+from os import makedirs
+from os.path import join
+from pdfminer.fontmetrics import FONT_METRICS
+from pdfminer.glyphlist import glyphname2unicode
+from pdfminer.layout import LTTextLine
+from IQDMPDF.parsers.parser import ReportParser
+from IQDMPDF.paths import DIRECTORIES
+from IQDMPDF.utilities import get_files
+
+# Text is re-rendered in this standard font, which needs no embedding
+FONT = "Helvetica"
+FONT_DESCENT = -207  # per 1000 units of font size
+CHAR_WIDTHS = FONT_METRICS[FONT][1]
+DEFAULT_CHAR_WIDTH = 556
+# Glyph names of characters not in WinAnsiEncoding
+GLYPH_NAMES = {}
+for _name, _char in glyphname2unicode.items():
+    GLYPH_NAMES.setdefault(_char, _name)
+
+MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+DATE_PATTERNS = [
+    re.compile(r"(?P<m>\d{1,2})/(?P<d>\d{1,2})/(?P<y>\d{4})"),
+    re.compile(r"(?P<y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})"),
+    re.compile(r"(?P<d>\d{1,2}) (?P<b>%s) (?P<y>\d{4})" % "|".join(MONTHS)),
+]
+DECOY_WORDS = (
+    "agenda minutes invoice quarterly budget review meeting schedule "
+    "maintenance linac service report summary department policy patient "
+    "safety training update physics staff total amount due page draft"
+).split()
+
+
+class ReportSample:
+    """Text lines of an example report, re-rendered with varied values
+
+    The lines of the layout used by the report's parser are drawn at their
+    original positions, stretched to their original widths, so the
+    synthetic report parses like the original. Patient names and IDs,
+    dates, and the first pass rate of analysis_columns are varied.
+    """
+
+    def __init__(self, file_path):
+        """Initialize a ReportSample
+
+        Parameters
+        ----------
+        file_path : str
+            An IMRT QA report supported by ReportParser
+        """
+        parser = ReportParser(file_path)
+        report = parser.report
+        if report is None:
+            raise ValueError("No report class found for %s" % file_path)
+        self.file_path = file_path
+        self.report_type = report.report_type
+
+        layouts = parser.extraction.get_layout(report.data.laparams_kwargs)
+        self.pages = [
+            (ltpage.width, ltpage.height, list(iter_text_lines(ltpage)))
+            for ltpage in layouts
+        ]
+
+        summary = report.summary_data
+        self.names = [
+            summary[report.columns[i]]
+            for i in report.analysis_columns["uid"]
+            if "Patient" in report.columns[i]
+            and len(summary[report.columns[i]]) >= 3
+        ]
+        pass_rate = summary[
+            report.columns[report.analysis_columns["y"][0]["index"]]
+        ]
+        self.pass_rate = re.match(r"\d+(\.\d+)?", pass_rate)
+
+    def render(self, rng):
+        """Get the bytes of a synthetic copy of the report
+
+        Parameters
+        ----------
+        rng : random.Random
+            Source of the varied values
+
+        Returns
+        ----------
+        bytes
+            PDF file contents
+        """
+        replacements = {name: randomize_text(name, rng) for name in self.names}
+        days = rng.randint(-3650, 365)
+        pass_rate_pattern, new_pass_rate = None, None
+        if self.pass_rate is not None:
+            value = self.pass_rate.group(0)
+            decimals = len(self.pass_rate.group(1) or ".") - 1
+            pass_rate_pattern = re.compile(
+                r"(?<![\d.])%s(?![\d])" % re.escape(value)
+            )
+            new_pass_rate = "%.*f" % (decimals, rng.uniform(80, 100))
+
+        pages = []
+        for width, height, lines in self.pages:
+            new_lines = []
+            for bbox, text in lines:
+                for old, new in replacements.items():
+                    text = text.replace(old, new)
+                text = shift_dates(text, days)
+                if pass_rate_pattern is not None:
+                    text = pass_rate_pattern.sub(new_pass_rate, text)
+                new_lines.append((bbox, text))
+            pages.append((width, height, new_lines))
+        return build_pdf(pages)
+
+
+def iter_text_lines(ltpage):
+    """Iterate through the text lines of a page layout
+
+    Parameters
+    ----------
+    ltpage : pdfminer.layout.LTPage
+        Analyzed page layout
+
+    Yields
+    -------
+    tuple
+        bbox and text (without trailing newline) of each LTTextLine
+    """
+    for obj in ltpage:
+        if isinstance(obj, LTTextLine):
+            text = obj.get_text().rstrip("\n")
+            if text.strip():
+                yield obj.bbox, text
+        elif hasattr(obj, "_objs"):
+            yield from iter_text_lines(obj)
+
+
+def randomize_text(text, rng):
+    """Replace each letter and digit, keeping case and punctuation
+
+    Parameters
+    ----------
+    text : str
+        e.g., a patient name or ID
+    rng : random.Random
+        Source of the new characters
+
+    Returns
+    ----------
+    str
+        A string with the same shape as text
+    """
+    chars = []
+    for char in text:
+        if char.isdigit():
+            char = str(rng.randint(0, 9))
+        elif char.isupper():
+            char = chr(rng.randint(ord("A"), ord("Z")))
+        elif char.islower():
+            char = chr(rng.randint(ord("a"), ord("z")))
+        chars.append(char)
+    return "".join(chars)
+
+
+def shift_dates(text, days):
+    """Shift each date in text by a number of days, keeping its format
+
+    Parameters
+    ----------
+    text : str
+        Any text
+    days : int
+        Number of days added to each date
+
+    Returns
+    ----------
+    str
+        text with shifted dates
+    """
+
+    def shift(match):
+        parts = match.groupdict()
+        try:
+            month = (
+                MONTHS.index(parts["b"]) + 1
+                if "b" in parts
+                else int(parts["m"])
+            )
+            date = datetime(int(parts["y"]), month, int(parts["d"]))
+        except ValueError:  # not a valid date
+            return match.group(0)
+        date += timedelta(days=days)
+        # zero-padded if any month or day of the original is, e.g., 02/15
+        padded = any(
+            (parts.get(key) or "").startswith("0") for key in ("m", "d")
+        )
+        width = 2 if padded or "-" in match.group(0) else 1
+        values = {
+            "y": str(date.year),
+            "m": str(date.month).zfill(width),
+            "d": str(date.day).zfill(width),
+            "b": MONTHS[date.month - 1],
+        }
+        start = match.start()
+        result = match.group(0)
+        for key in sorted(parts, key=match.start, reverse=True):
+            i, j = match.start(key) - start, match.end(key) - start
+            result = result[:i] + values[key] + result[j:]
+        return result
+
+    for pattern in DATE_PATTERNS:
+        text = pattern.sub(shift, text)
+    return text
+
+
+def encode_text(text, codes):
+    """Encode text for a PDF string in WinAnsiEncoding plus custom codes
+
+    Parameters
+    ----------
+    text : str
+        Text to be drawn
+    codes : dict
+        Character to byte code of characters outside WinAnsiEncoding,
+        updated with new characters (up to 31 per document)
+
+    Returns
+    ----------
+    bytes
+        Escaped contents of a PDF literal string
+    """
+    encoded = bytearray()
+    for char in text:
+        try:
+            encoded += char.encode("cp1252")
+        except UnicodeEncodeError:
+            if char not in codes and char in GLYPH_NAMES and len(codes) < 31:
+                codes[char] = len(codes) + 1
+            encoded.append(codes.get(char, ord("?")))
+    return (
+        bytes(encoded)
+        .replace(b"\\", b"\\\\")
+        .replace(b"(", b"\\(")
+        .replace(b")", b"\\)")
+        .replace(b"\r", b"\\r")
+    )
+
+
+def get_text_width(text, size):
+    """Get the width of text drawn in FONT
+
+    Parameters
+    ----------
+    text : str
+        Text to be drawn
+    size : float
+        Font size
+
+    Returns
+    ----------
+    float
+        Width in PDF units
+    """
+    units = sum(CHAR_WIDTHS.get(char, DEFAULT_CHAR_WIDTH) for char in text)
+    return units * size / 1000.0
+
+
+def build_pdf(pages):
+    """Build a PDF drawing lines of text at given bounding boxes
+
+    Parameters
+    ----------
+    pages : list
+        (width, height, lines) of each page, where lines is a list of
+        (bbox, text). Each line is stretched to fill its bbox.
+
+    Returns
+    ----------
+    bytes
+        PDF file contents
+    """
+    codes = {}
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>"}
+    page_refs = []
+    number = 4  # 3 is the font, written last since it depends on codes
+    for width, height, lines in pages:
+        commands = [b"BT"]
+        for (x0, y0, x1, y1), text in lines:
+            size = max(y1 - y0, 1.0)
+            text_width = get_text_width(text, size)
+            scale = 100.0 * (x1 - x0) / text_width if text_width else 100.0
+            baseline = y0 - FONT_DESCENT * size / 1000.0
+            commands.append(
+                b"/F1 %.3f Tf %.3f Tz 1 0 0 1 %.3f %.3f Tm (%s) Tj"
+                % (size, scale, x0, baseline, encode_text(text, codes))
+            )
+        commands.append(b"ET")
+        stream = b"\n".join(commands)
+
+        page_refs.append(b"%d 0 R" % number)
+        objects[number] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (width, height, number + 1)
+        )
+        objects[number + 1] = b"<< /Length %d >>\nstream\n%s\nendstream" % (
+            len(stream),
+            stream,
+        )
+        number += 2
+
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(page_refs),
+        len(page_refs),
+    )
+    differences = b" ".join(
+        b"%d /%s" % (code, GLYPH_NAMES[char].encode())
+        for char, code in codes.items()
+    )
+    objects[3] = (
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding "
+        b"<< /Type /Encoding /BaseEncoding /WinAnsiEncoding "
+        b"/Differences [%s] >> >>" % (FONT.encode(), differences)
+    )
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i in range(1, number):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (i, objects[i])
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % number
+    for offset in offsets:
+        data += b"%010d 00000 n \n" % offset
+    data += (
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (
+            number,
+            xref,
+        )
+    )
+    return bytes(data)
+
+
+def get_decoy(rng):
+    """Get a PDF that is not an IMRT QA report
+
+    Parameters
+    ----------
+    rng : random.Random
+        Source of the text
+
+    Returns
+    ----------
+    bytes
+        PDF file contents
+    """
+    pages = []
+    for _ in range(rng.randint(1, 3)):
+        lines = []
+        for row in range(rng.randint(5, 40)):
+            text = " ".join(rng.choice(DECOY_WORDS) for _ in range(8))
+            y = 740 - 18 * row
+            lines.append(([72, y, 72 + 5 * len(text), y + 10], text))
+        pages.append((612, 792, lines))
+    return build_pdf(pages)
+
+
+def get_corrupt(rng, report):
+    """Get the contents of a corrupt file with a .pdf extension
+
+    Parameters
+    ----------
+    rng : random.Random
+        Source of the corruption
+    report : bytes
+        A valid PDF, which may be truncated
+
+    Returns
+    ----------
+    bytes
+        A truncated PDF, a PDF header followed by random bytes, random
+        bytes, or an empty file
+    """
+    kind = rng.randrange(4)
+    if kind == 0:
+        return report[: rng.randint(10, len(report) // 2)]
+    if kind == 1:
+        return b"%PDF-1.4\n" + bytes(rng.getrandbits(8) for _ in range(1000))
+    if kind == 2:
+        return bytes(rng.getrandbits(8) for _ in range(1000))
+    return b""
+
+
+def get_leaf_directories(output_dir, depth, branching):
+    """Get the directories of a tree, without creating them
+
+    Parameters
+    ----------
+    output_dir : str
+        Root of the tree
+    depth : int
+        Number of directory levels below output_dir
+    branching : int
+        Number of sub-directories of each directory
+
+    Returns
+    ----------
+    list
+        Paths of the directories at the deepest level
+    """
+    directories = [output_dir]
+    for level in range(depth):
+        directories = [
+            join(directory, "dir_%s_%s" % (level, i))
+            for directory in directories
+            for i in range(branching)
+        ]
+    return directories
+
+
+def load_samples(directory=None):
+    """Load a ReportSample of each example report
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory of IMRT QA reports, default is the bundled example reports
+
+    Returns
+    ----------
+    list
+        ReportSample of each report identified by ReportParser
+    """
+    if directory is None:
+        directory = DIRECTORIES["EXAMPLE_PDF"]
+    samples = []
+    for file_path in get_files(directory, True, ".pdf"):
+        try:
+            samples.append(ReportSample(file_path))
+        except Exception as e:
+            print("Skipping %s: %s" % (file_path, e))
+    return samples
+
+
+def generate_corpus(
+    output_dir,
+    count,
+    depth=2,
+    branching=4,
+    decoy_fraction=0.1,
+    corrupt_fraction=0.02,
+    seed=None,
+    samples=None,
+):
+    """Write synthetic reports, decoys and corrupt files in a directory tree
+
+    Parameters
+    ----------
+    output_dir : str
+        Root directory of the corpus, created if needed
+    count : int
+        Total number of files
+    depth : int, optional
+        Number of directory levels below output_dir
+    branching : int, optional
+        Number of sub-directories of each directory
+    decoy_fraction : float, optional
+        Fraction of files that are PDFs, but not IMRT QA reports
+    corrupt_fraction : float, optional
+        Fraction of files that cannot be parsed
+    seed : int, optional
+        Seed of the random values, for a reproducible corpus
+    samples : list, optional
+        ReportSample objects to copy, default is load_samples()
+
+    Returns
+    ----------
+    dict
+        Number of files written by report type, "Decoy" and "Corrupt"
+    """
+    rng = random.Random(seed)
+    if samples is None:
+        samples = load_samples()
+    directories = get_leaf_directories(output_dir, depth, branching)
+    for directory in directories:
+        makedirs(directory, exist_ok=True)
+
+    counts = {}
+    for i in range(count):
+        sample = samples[i % len(samples)]
+        value = rng.random()
+        if value < corrupt_fraction:
+            kind = "Corrupt"
+            data = get_corrupt(rng, sample.render(rng))
+        elif value < corrupt_fraction + decoy_fraction:
+            kind = "Decoy"
+            data = get_decoy(rng)
+        else:
+            kind = sample.report_type
+            data = sample.render(rng)
+        file_path = join(directories[i % len(directories)], "%07d.pdf" % i)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        counts[kind] = counts.get(kind, 0) + 1
+    return counts
+
+
+def main(args=None):
+    """Command line interface of generate_corpus
+
+    Parameters
+    ----------
+    args : list, optional
+        Command line arguments, default is sys.argv[1:]
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("output_dir", help="Root of the corpus")
+    arg_parser.add_argument(
+        "-n", "--count", type=int, default=1000, help="Number of files"
+    )
+    arg_parser.add_argument(
+        "-d", "--depth", type=int, default=2, help="Directory tree depth"
+    )
+    arg_parser.add_argument(
+        "-b",
+        "--branching",
+        type=int,
+        default=4,
+        help="Sub-directories per directory",
+    )
+    arg_parser.add_argument(
+        "-df",
+        "--decoy-fraction",
+        type=float,
+        default=0.1,
+        help="Fraction of non-report PDFs",
+    )
+    arg_parser.add_argument(
+        "-cf",
+        "--corrupt-fraction",
+        type=float,
+        default=0.02,
+        help="Fraction of corrupt files",
+    )
+    arg_parser.add_argument(
+        "-s", "--seed", type=int, default=None, help="Random seed"
+    )
+    args = arg_parser.parse_args(args)
+    counts = generate_corpus(
+        args.output_dir,
+        args.count,
+        depth=args.depth,
+        branching=args.branching,
+        decoy_fraction=args.decoy_fraction,
+        corrupt_fraction=args.corrupt_fraction,
+        seed=args.seed,
+    )
+    for kind, kind_count in sorted(counts.items()):
+        print("%s: %s" % (kind, kind_count))
+
+
+if __name__ == "__main__":
+    main()
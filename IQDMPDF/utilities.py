@@ -8,12 +8,29 @@
 # This file is part of IQDM-PDF, released under a MIT license.
 #    See the file LICENSE included with this distribution
 
-from os.path import join, splitext, normpath, getctime
-from os import walk, listdir, sep, stat
+from os.path import join, splitext, normpath, getctime, relpath
+from os import scandir, sep, stat
 import platform
 import argparse
-from multiprocessing import Pool
-from tqdm import tqdm
+import hashlib
+from collections import deque
+from queue import Queue
+from threading import Thread
+
+# concurrent.futures, multiprocessing, tqdm and IQDMPDF.supervisor are
+# imported by the functions using them, so the command line interface
+# starts without loading them
+
+# Marks the end of the items of a BackgroundIterator
+_END_OF_ITERATION = object()
+# PDF files start with this, though readers accept it within the first 1024
+# bytes (PDF 32000-1:2008, Annex H)
+PDF_HEADER = b"%PDF-"
+PDF_HEADER_SEARCH_SIZE = 1024
+# Number of threads used to read file headers in iter_pdf_files
+SNIFF_THREADS = 8
+# Appended to the columns and csv_data of each report by ReportParser
+FILE_INFO_COLUMNS = ["report_file_creation", "report_file_path"]
 
 
 def are_all_strings_in_text(text, list_of_strings):
@@ -37,6 +54,139 @@ def are_all_strings_in_text(text, list_of_strings):
     return True
 
 
+class MultiStringMatcher:
+    """Aho-Corasick automaton to find many strings in a single pass of text"""
+
+    def __init__(self, strings):
+        """Compile the automaton
+
+        Parameters
+        ----------
+        strings : list of str
+            The strings to search for. Duplicates and empty strings are
+            ignored.
+        """
+        self.strings = list(dict.fromkeys(s for s in strings if s))
+
+        # trie of all strings, output[state] holds indices of strings
+        # ending at that state
+        goto, output = [{}], [set()]
+        for index, string in enumerate(self.strings):
+            state = 0
+            for char in string:
+                if char not in goto[state]:
+                    goto.append({})
+                    output.append(set())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            output[state].add(index)
+
+        # breadth-first construction of failure links, resolved into a
+        # deterministic transition table so each char is one dict lookup
+        alphabet = set("".join(self.strings))
+        transitions = [dict(goto[0])]
+        transitions.extend({} for _ in range(len(goto) - 1))
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            output[state] |= output[fail[state]]
+            for char in alphabet:
+                if char in goto[state]:
+                    next_state = goto[state][char]
+                    fail[next_state] = transitions[fail[state]].get(char, 0)
+                    queue.append(next_state)
+                    transitions[state][char] = next_state
+                else:
+                    next_state = transitions[fail[state]].get(char, 0)
+                    if next_state:
+                        transitions[state][char] = next_state
+
+        self._transitions = transitions
+        self._output = [frozenset(out) for out in output]
+
+    def find(self, text):
+        """Find which strings occur in text
+
+        Parameters
+        ----------
+        text : str
+            Any text
+
+        Returns
+        ----------
+        set of str
+            All strings found in text. Scanning stops early once every
+            string has been found.
+        """
+        transitions, output = self._transitions, self._output
+        found = set()
+        total = len(self.strings)
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+                if len(found) == total:
+                    break
+        return {self.strings[i] for i in found}
+
+
+class IdentifierMatcher:
+    """Find which groups of identifiers are all present in a text"""
+
+    def __init__(self, groups):
+        """Compile a MultiStringMatcher over the union of all groups
+
+        Parameters
+        ----------
+        groups : dict
+            Lists of strings (e.g., ParserBase.identifiers) by any key
+        """
+        # empty strings are always found, like are_all_strings_in_text
+        self.groups = {
+            key: {string for string in strings if string}
+            for key, strings in groups.items()
+        }
+        self.matcher = MultiStringMatcher(
+            [string for strings in groups.values() for string in strings]
+        )
+
+    def match(self, text):
+        """Get the keys of groups with all identifiers found in text
+
+        Parameters
+        ----------
+        text : str
+            Any text, e.g., output from pdf_reader.convert_pdf_to_txt
+
+        Returns
+        ----------
+        list
+            Keys of groups fully contained in text, in the order of groups
+        """
+        found = self.matcher.find(text)
+        return [
+            key for key, strings in self.groups.items() if strings <= found
+        ]
+
+
+def remove_whitespace(text):
+    """Remove all whitespace characters from text
+
+    Parameters
+    ----------
+    text : str
+        Any string
+
+    Returns
+    ----------
+    str
+        text without spaces, tabs, line breaks, etc.
+    """
+    return "".join(text.split())
+
+
 def get_sorted_indices(some_list, reverse=False):
     """Get sorted indices of some_list
 
@@ -125,32 +275,238 @@ def get_files(init_dir, search_sub_dir=True, extension=None):
     list
         List of file paths
     """
-    files = []
-    if not search_sub_dir:
-        append_files(files, init_dir, listdir(init_dir), extension)
-    else:
-        for dir_name, _, file_list in walk(init_dir):
-            append_files(files, dir_name, file_list, extension)
-    return files
+    return list(iter_files(init_dir, search_sub_dir, extension))
+
 
+def iter_files(init_dir, search_sub_dir=True, extension=None):
+    """Generate paths of all files in a directory as they are found
 
-def append_files(files, dir_name, files_to_append, extension=None):
-    """Helper function for get_files
+    Files are found in the same order as os.walk, i.e., the files of a
+    directory are generated before any of its sub-directories are scanned.
 
     Parameters
     ----------
-    files : list
-        Accumulate file paths into this list
-    dir_name : str
-        The base path of the files in file_list
-    files_to_append : list
-        A list of file paths to loop accumulate
+    init_dir : str
+        Initial directory to begin scanning
+    search_sub_dir : bool
+        Recursively search through sub-directories if True. Symbolic links
+        to directories are not followed, and unreadable sub-directories are
+        skipped.
     extension : str, optional
         Collect file paths with only this extension (e.g., '.pdf')
+
+    Yields
+    ----------
+    str
+        File paths
+    """
+    sub_dirs = []
+    with scandir(init_dir) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if search_sub_dir and not entry.is_symlink():
+                    sub_dirs.append(entry.path)
+            elif extension is None or (
+                splitext(entry.name)[1].lower() == extension
+            ):
+                yield entry.path
+
+    for sub_dir in sub_dirs:
+        try:
+            yield from iter_files(sub_dir, search_sub_dir, extension)
+        except OSError:
+            pass
+
+
+def is_pdf_file(path):
+    """Check for a PDF header without reading the whole file
+
+    Parameters
+    ----------
+    path : str
+        Path to any file
+
+    Returns
+    ----------
+    bool
+        True if PDF_HEADER is found within the first PDF_HEADER_SEARCH_SIZE
+        bytes of the file
+    """
+    try:
+        with open(path, "rb") as f:
+            return PDF_HEADER in f.read(PDF_HEADER_SEARCH_SIZE)
+    except OSError:
+        return False
+
+
+def iter_pdf_files(files, threads=SNIFF_THREADS):
+    """Filter file paths to PDF files, reading headers in a thread pool
+
+    Parameters
+    ----------
+    files : iterable
+        File paths, e.g., the return of iter_files
+    threads : int, optional
+        Number of threads reading file headers at once
+
+    Yields
+    ----------
+    str
+        Paths of files passing is_pdf_file, in the order of files
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # files are submitted as they arrive rather than with executor.map, which
+    # would consume all of files before returning
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for file in files:
+            pending.append((file, executor.submit(is_pdf_file, file)))
+            if len(pending) > threads * 2:
+                file, is_pdf = pending.popleft()
+                if is_pdf.result():
+                    yield file
+        for file, is_pdf in pending:
+            if is_pdf.result():
+                yield file
+
+
+def get_shard_index(relative_path, shard_count):
+    """Assign a file to a shard, consistently across machines and runs
+
+    Parameters
+    ----------
+    relative_path : str
+        Path of a file relative to the scanned directory
+    shard_count : int
+        Total number of shards
+
+    Returns
+    ----------
+    int
+        Shard index from 0 to shard_count - 1, from a hash of relative_path
+        with '/' as the path separator
+    """
+    relative_path = "/".join(normpath(relative_path).split(sep))
+    digest = hashlib.sha256(relative_path.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def iter_shard_files(files, init_dir, shard_index, shard_count):
+    """Filter file paths to those assigned to a shard
+
+    Parameters
+    ----------
+    files : iterable
+        File paths, e.g., the return of iter_files
+    init_dir : str
+        The scanned directory, file paths are hashed relative to this
+    shard_index : int
+        Keep files assigned to this shard (0 to shard_count - 1)
+    shard_count : int
+        Total number of shards
+
+    Yields
+    ----------
+    str
+        Paths of files assigned to shard_index
     """
-    for file_name in files_to_append:
-        if extension is None or splitext(file_name)[1].lower() == extension:
-            files.append(join(dir_name, file_name))
+    for file in files:
+        if (
+            get_shard_index(relpath(file, init_dir), shard_count)
+            == shard_index
+        ):
+            yield file
+
+
+class BackgroundIterator:
+    """Consume an iterable in a background thread, e.g., a slow directory
+    scan, so items are available while the scan continues"""
+
+    def __init__(self, iterable):
+        """Start consuming iterable
+
+        Parameters
+        ----------
+        iterable : iterable
+            Any iterable, e.g., the return of iter_files
+        """
+        self.count = 0  # number of items found so far
+        self.done = False
+        self._error = None
+        self._queue = Queue()
+        self._thread = Thread(target=self._run, args=(iterable,), daemon=True)
+        self._thread.start()
+
+    def _run(self, iterable):
+        """Put each item of iterable into the queue"""
+        try:
+            for item in iterable:
+                self.count += 1
+                self._queue.put(item)
+        except Exception as e:
+            self._error = e
+        finally:
+            self.done = True
+            self._queue.put(_END_OF_ITERATION)
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.get()
+            except StopIteration:
+                return
+
+    def get(self, timeout=None):
+        """Get the next item, waiting at most timeout seconds
+
+        Parameters
+        ----------
+        timeout : int, float, optional
+            Maximum number of seconds to wait. Wait until an item is found
+            if None.
+
+        Returns
+        ----------
+        any
+            The next item of iterable. queue.Empty is raised if no item was
+            found within timeout, StopIteration once all items are consumed.
+        """
+        item = self._queue.get(timeout=timeout)
+        if item is _END_OF_ITERATION:
+            self._queue.put(item)  # for any other consumers
+            if self._error is not None:
+                raise self._error
+            raise StopIteration
+        return item
+
+
+def get_file_hash(path, algorithm="sha256", chunk_size=1048576):
+    """Hash the contents of a file, reading it in bounded chunks
+
+    Parameters
+    ----------
+    path : str
+        Path to any file
+    algorithm : str, optional
+        Any algorithm supported by hashlib.new
+    chunk_size : int, optional
+        Number of bytes read at a time
+
+    Returns
+    ----------
+    str
+        Hex digest of the file contents
+    """
+    file_hash = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
 
 
 def get_relative_path(path, relative_base):
@@ -244,10 +600,129 @@ def create_arg_parser():
         help="Enable multiprocessing, set number of parallel processes",
         default=1,
     )
+    cmd_parser.add_argument(
+        "-cd",
+        "--cache-dir",
+        dest="cache_dir",
+        help="Cache extracted PDF data in this directory, so re-runs over "
+        "the same files skip PDF parsing",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-cs",
+        "--cache-size",
+        dest="cache_size",
+        help="Maximum size of the cache directory in MB (default: 1024)",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-inc",
+        "--incremental",
+        dest="incremental",
+        help="Only parse new or changed files, re-using results from a "
+        "previous scan stored in a manifest file",
+        default=False,
+        action="store_true",
+    )
+    cmd_parser.add_argument(
+        "-mf",
+        "--manifest-file",
+        dest="manifest_file",
+        help="Manifest file for --incremental, stored as "
+        "iqdmpdf_manifest.json in the output directory by default",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-fi",
+        "--flush-interval",
+        dest="flush_interval",
+        help="Flush csv output at most every FLUSH_INTERVAL seconds "
+        "(default: 10), 0 flushes after every report",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-t",
+        "--timeout",
+        dest="timeout",
+        help="Maximum number of seconds per file with multiprocessing. "
+        "Files exceeding this are listed in TimedOut_<output-file>",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-mt",
+        "--max-tasks",
+        dest="max_tasks",
+        help="Replace each worker process after this many files with "
+        "multiprocessing, releasing memory",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-si",
+        "--shard-index",
+        dest="shard_index",
+        help="Only process files assigned to this shard, from 0 to "
+        "SHARD_COUNT - 1",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-sc",
+        "--shard-count",
+        dest="shard_count",
+        help="Split files into this many shards by a hash of their path "
+        "relative to init_directory, see --shard-index",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-ms",
+        "--merge-shards",
+        dest="merge_shards",
+        help="Merge shard csv files found in init_directory into "
+        "<report_type>_<output-file>, rather than processing PDFs",
+        default=False,
+        action="store_true",
+    )
+    cmd_parser.add_argument(
+        "-dup",
+        "--duplicates",
+        dest="duplicates",
+        help="Parse files with identical contents once. 'all' writes a row "
+        "for every copy, 'first' only for the first copy found and lists "
+        "the others in Duplicates_<output-file>",
+        choices=["all", "first"],
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-db",
+        "--database",
+        dest="database",
+        help="Write results to this SQLite database, with one table per "
+        "report type, instead of csv files. Rows of re-processed files are "
+        "replaced.",
+        default=None,
+    )
+    cmd_parser.add_argument(
+        "-me",
+        "--metrics",
+        dest="metrics",
+        help="Write the duration of each processing stage, page count and "
+        "size of each file to Metrics_<output-file>.jsonl",
+        default=False,
+        action="store_true",
+    )
+    cmd_parser.add_argument(
+        "-pd",
+        "--plugin-dir",
+        dest="plugin_dirs",
+        metavar="PLUGIN_DIR",
+        help="Directory of report class plugin JSON files, may be repeated",
+        action="append",
+    )
     return cmd_parser
 
 
-def run_multiprocessing(worker, queue, processes, callback=None):
+def run_multiprocessing(
+    worker, queue, processes, callback=None, initializer=None
+):
     """Parallel processing
 
     Parameters
@@ -261,6 +736,8 @@ def run_multiprocessing(worker, queue, processes, callback=None):
     callback : callable
         Optional call back function on progress update, accepts str rep of
         tqdm object. Final call sent with 'complete'
+    initializer : callable, optional
+        Called with no arguments when each worker process starts
 
     Returns
     -------
@@ -268,21 +745,120 @@ def run_multiprocessing(worker, queue, processes, callback=None):
         List of returns from worker
 
     """
+    return list(
+        iter_multiprocessing(worker, queue, processes, callback, initializer)
+    )
+
+
+def iter_multiprocessing(
+    worker,
+    queue,
+    processes,
+    callback=None,
+    initializer=None,
+    timeout=None,
+    max_tasks=None,
+    timeout_result=None,
+    total=None,
+):
+    """Parallel processing, yielding results as they are completed
+
+    Parameters
+    ----------
+    worker : callable
+        single parameter function to be called on each item in queue
+    queue : iterable
+        A list of arguments for worker, or an iterator (see total)
+    processes : int
+        Number of processes for multiprocessing.Pool
+    callback : callable
+        Optional call back function on progress update, accepts str rep of
+        tqdm object. Final call sent with 'complete'
+    initializer : callable, optional
+        Called with no arguments when each worker process starts
+    timeout : int, float, optional
+        Maximum number of seconds per item. If provided, a
+        supervisor.WorkerSupervisor is used instead of multiprocessing.Pool,
+        so stuck worker processes can be killed and replaced.
+    max_tasks : int, optional
+        Replace each worker process after it completes this many items
+    timeout_result : callable, optional
+        Called with an item that exceeded timeout, its return is yielded in
+        place of the worker's
+    total : int, callable, optional
+        Number of items in queue for the progress bar, or a function
+        returning the number of items found so far if queue is an iterator.
+        Default is len(queue)
+
+    Yields
+    -------
+    any
+        Returns from worker, in order of completion
+
+    """
+    from multiprocessing import Pool
+    from IQDMPDF.supervisor import WorkerSupervisor
+
+    if total is None:
+        total = len(queue)
+    if timeout is None:
+        pool = Pool(
+            processes=processes,
+            initializer=initializer,
+            maxtasksperchild=max_tasks,
+        )
+        with pool:
+            results = pool.imap_unordered(worker, queue)
+            yield from iter_progress(results, total, callback)
+    else:
+        supervisor = WorkerSupervisor(
+            worker,
+            processes,
+            timeout=timeout,
+            max_tasks=max_tasks,
+            initializer=initializer,
+            timeout_result=timeout_result,
+        )
+        results = supervisor.imap_unordered(queue)
+        yield from iter_progress(results, total, callback)
+    if callback is not None:
+        callback("complete")
+
+
+def iter_progress(results, total, callback=None):
+    """Show a tqdm progress bar while iterating through results
+
+    Parameters
+    ----------
+    results : iterable
+        Any iterable, e.g., returns from multiprocessing.Pool.imap_unordered
+    total : int, callable
+        Expected number of results, or a function returning the number of
+        results expected so far, checked on each update
+    callback : callable
+        Optional call back function on progress update, accepts str rep of
+        tqdm object
+
+    Yields
+    -------
+    any
+        Each item of results
+    """
+    from tqdm import tqdm
+
+    get_total = total if callable(total) else None
     progress_kwargs = {
-        "total": len(queue),
+        "total": total if get_total is None else get_total(),
         "bar_format": "{desc:<5.5}{percentage:3.0f}%|{bar:30}{r_bar}",
     }
-    data = []
-    with Pool(processes=processes) as pool:
-        with tqdm(**progress_kwargs) as pbar:
-            for item in pool.imap_unordered(worker, queue):
-                data.append(item)
-                pbar.update()
-                if callback is not None:
-                    callback(str(pbar))
-    if callback is not None:
-        callback("complete")
-    return data
+    with tqdm(**progress_kwargs) as pbar:
+        for item in results:
+            yield item
+            if get_total is not None:
+                pbar.total = get_total()
+            pbar.update()
+            if callback is not None:
+                callback(str(pbar))
 
 
 def is_numeric(val):
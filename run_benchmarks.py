@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# run_benchmarks.py
+"""Benchmark processing of the example reports against a stored baseline"""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from os import makedirs
+from os.path import abspath, dirname, getsize, isfile, join
+from tempfile import TemporaryDirectory
+from IQDMPDF._version import __version__
+from IQDMPDF.file_processor import ResultsWriter
+from IQDMPDF.metrics import FileMetrics, StageTimer
+from IQDMPDF.parsers.parser import ReportParser, get_registry
+from IQDMPDF.paths import DIRECTORIES
+from IQDMPDF.utilities import get_files
+
+# Example reports of each vendor, in tests/test_data/example_reports
+VENDORS = ["delta4", "sncpatient", "sncpatient2020", "verisoft"]
+# Stages of ReportParser (see metrics.FileMetrics) plus csv output
+STAGES = ["identify", "extract", "layout", "parse", "write"]
+# Baselines are machine specific, so the default is in an ignored directory
+DEFAULT_BASELINE = join(
+    dirname(abspath(__file__)), ".benchmarks", "baseline.json"
+)
+# Maximum allowed fractional increase over the baseline
+DEFAULT_TIME_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.25
+
+
+def get_vendor_files(vendor):
+    """Get the example reports of a vendor
+
+    Parameters
+    ----------
+    vendor : str
+        Directory name in tests/test_data/example_reports
+
+    Returns
+    ----------
+    list
+        File paths of the example reports
+    """
+    return get_files(DIRECTORIES["%s_EXAMPLES" % vendor.upper()], True, ".pdf")
+
+
+def process_vendor_files(files, timer, output_dir):
+    """Parse and write files, timing each stage
+
+    Parameters
+    ----------
+    files : list
+        File paths of example reports
+    timer : StageTimer
+        Stage durations are added to this timer
+    output_dir : str
+        Directory for csv output
+    """
+    with ResultsWriter("benchmark.csv", output_dir, mode="w") as writer:
+        for file_path in files:
+            metrics = FileMetrics(file_path)
+            parser = ReportParser(file_path, metrics=metrics)
+            result = {
+                "data": parser.csv_data,
+                "report_type": parser.report_type or None,
+                "columns": parser.columns,
+                "file_path": file_path,
+            }
+            for stage, duration in metrics.stages.items():
+                timer.add(stage, duration)
+            with timer.stage("write"):
+                writer.write(result)
+
+
+def benchmark_vendor(vendor, repeat=3):
+    """Measure stage throughput and peak memory for a vendor's reports
+
+    Parameters
+    ----------
+    vendor : str
+        Directory name in tests/test_data/example_reports
+    repeat : int, optional
+        Number of timed runs, the fastest time of each stage is kept
+
+    Returns
+    ----------
+    dict
+        files, bytes, seconds and files_per_second by stage, and
+        peak_memory_mb (peak Python allocations during an untimed run)
+    """
+    files = get_vendor_files(vendor)
+    stages = {}
+    with TemporaryDirectory() as tmp_dir:
+        for _ in range(repeat):
+            timer = StageTimer()
+            process_vendor_files(files, timer, tmp_dir)
+            for stage in STAGES:
+                duration = timer.stages.get(stage, 0.0)
+                stages[stage] = min(stages.get(stage, duration), duration)
+
+        # tracemalloc slows processing, so memory is measured separately
+        tracemalloc.start()
+        process_vendor_files(files, StageTimer(), tmp_dir)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "files": len(files),
+        "bytes": sum(getsize(f) for f in files),
+        "seconds": stages,
+        "files_per_second": {
+            stage: len(files) / duration if duration else None
+            for stage, duration in stages.items()
+        },
+        "peak_memory_mb": peak / 1e6,
+    }
+
+
+def run_benchmarks(vendors=None, repeat=3):
+    """Benchmark each vendor
+
+    Parameters
+    ----------
+    vendors : list, optional
+        Vendors to benchmark, default is VENDORS
+    repeat : int, optional
+        Number of timed runs per vendor
+
+    Returns
+    ----------
+    dict
+        Environment information and the return of benchmark_vendor for each
+        vendor
+    """
+    get_registry()  # report classes are initialized once per process
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "vendors": {
+            vendor: benchmark_vendor(vendor, repeat)
+            for vendor in (VENDORS if vendors is None else vendors)
+        },
+    }
+
+
+def compare_to_baseline(
+    results,
+    baseline,
+    time_threshold=DEFAULT_TIME_THRESHOLD,
+    memory_threshold=DEFAULT_MEMORY_THRESHOLD,
+):
+    """Find measurements exceeding the baseline by more than a threshold
+
+    Parameters
+    ----------
+    results : dict
+        Output from run_benchmarks
+    baseline : dict
+        A previous output from run_benchmarks
+    time_threshold : float, optional
+        Maximum allowed fractional increase in the time of any stage
+    memory_threshold : float, optional
+        Maximum allowed fractional increase in peak memory
+
+    Returns
+    ----------
+    list of str
+        A description of each regression
+    """
+    regressions = []
+    for vendor, result in results["vendors"].items():
+        base = baseline["vendors"].get(vendor)
+        if base is None:
+            continue
+        measurements = [
+            (
+                "%s time" % stage,
+                seconds,
+                base["seconds"].get(stage),
+                time_threshold,
+            )
+            for stage, seconds in result["seconds"].items()
+        ]
+        measurements.append(
+            (
+                "peak memory",
+                result["peak_memory_mb"],
+                base.get("peak_memory_mb"),
+                memory_threshold,
+            )
+        )
+        for name, value, base_value, threshold in measurements:
+            if base_value and value > base_value * (1 + threshold):
+                regressions.append(
+                    "%s %s: %.4g vs. baseline %.4g (+%.0f%%)"
+                    % (
+                        vendor,
+                        name,
+                        value,
+                        base_value,
+                        100 * (value / base_value - 1),
+                    )
+                )
+    return regressions
+
+
+def print_results(results):
+    """Print a table of throughput and memory by vendor
+
+    Parameters
+    ----------
+    results : dict
+        Output from run_benchmarks
+    """
+    print("Files per second by stage, peak memory in MB")
+    header = ["vendor", "files", "MB"] + STAGES + ["memory"]
+    print("".join(column.rjust(12) for column in header))
+    for vendor, result in results["vendors"].items():
+        row = [vendor, str(result["files"]), "%.2f" % (result["bytes"] / 1e6)]
+        for stage in STAGES:
+            rate = result["files_per_second"].get(stage)
+            row.append("-" if rate is None else "%.1f" % rate)
+        row.append("%.1f" % result["peak_memory_mb"])
+        print("".join(value.rjust(12) for value in row))
+
+
+def create_arg_parser():
+    """Create an argument parser for the benchmark runner
+
+    Returns
+    ----------
+    argparse.ArgumentParser
+        Parser of the command line arguments of main
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "-b",
+        "--baseline",
+        dest="baseline",
+        help="Baseline JSON file, default is %s" % DEFAULT_BASELINE,
+        default=DEFAULT_BASELINE,
+    )
+    arg_parser.add_argument(
+        "-s",
+        "--save-baseline",
+        dest="save_baseline",
+        help="Store these results as the baseline",
+        default=False,
+        action="store_true",
+    )
+    arg_parser.add_argument(
+        "-t",
+        "--time-threshold",
+        dest="time_threshold",
+        help="Maximum allowed fractional increase in stage time, default "
+        "is %s" % DEFAULT_TIME_THRESHOLD,
+        type=float,
+        default=DEFAULT_TIME_THRESHOLD,
+    )
+    arg_parser.add_argument(
+        "-m",
+        "--memory-threshold",
+        dest="memory_threshold",
+        help="Maximum allowed fractional increase in peak memory, default "
+        "is %s" % DEFAULT_MEMORY_THRESHOLD,
+        type=float,
+        default=DEFAULT_MEMORY_THRESHOLD,
+    )
+    arg_parser.add_argument(
+        "-n",
+        "--repeat",
+        dest="repeat",
+        help="Number of timed runs per vendor, the fastest is kept",
+        type=int,
+        default=3,
+    )
+    arg_parser.add_argument(
+        "-v",
+        "--vendor",
+        dest="vendors",
+        help="Only benchmark this vendor, may be repeated",
+        choices=VENDORS,
+        action="append",
+    )
+    return arg_parser
+
+
+def main(args=None):
+    """Run benchmarks, compare to or save the baseline
+
+    Parameters
+    ----------
+    args : list, optional
+        Command line arguments, default is sys.argv[1:]
+
+    Returns
+    ----------
+    int
+        1 if a regression was found, otherwise 0
+    """
+    args = create_arg_parser().parse_args(args)
+    results = run_benchmarks(args.vendors, args.repeat)
+    print_results(results)
+
+    if args.save_baseline or not isfile(args.baseline):
+        makedirs(dirname(abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Baseline saved to %s" % args.baseline)
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(
+        results, baseline, args.time_threshold, args.memory_threshold
+    )
+    for regression in regressions:
+        print("REGRESSION: %s" % regression)
+    if not regressions:
+        print("No regressions compared to %s" % args.baseline)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+
+    freeze_support()  # Needed for macOS python >=3.8 and Windows
+    sys.exit(main())
@@ -9,25 +9,43 @@
 #    See the file LICENSE included with this distribution, also
 
 import unittest
+from tests.test_benchmarks import TestBenchmarks
+from tests.test_cache import TestCache
+from tests.test_database import TestDatabase
 from tests.test_file_processor import TestFileProcessor
+from tests.test_main import TestMain
+from tests.test_manifest import TestManifest
+from tests.test_metrics import TestMetrics
 from tests.test_pdf_reader import TestPDFReader
 from tests.test_report_parsers import (
+    TestReportParser,
     TestSNCPatient,
     TestSNCPatient2020,
     TestDelta4,
     TestVerisoft,
 )
+from tests.test_supervisor import TestSupervisor
+from tests.test_synthetic import TestSynthetic
 from tests.test_utilities import TestUtilities
 
 
 test_classes = [
     TestUtilities,
+    TestBenchmarks,
+    TestCache,
+    TestDatabase,
     TestFileProcessor,
+    TestMain,
+    TestManifest,
+    TestMetrics,
     TestPDFReader,
+    TestReportParser,
     TestSNCPatient,
     TestSNCPatient2020,
     TestDelta4,
     TestVerisoft,
+    TestSupervisor,
+    TestSynthetic,
 ]
 
 
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# test_benchmarks.py
+"""unittest cases for run_benchmarks."""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+
+import unittest
+import run_benchmarks
+
+
+def get_results(seconds, peak_memory_mb, vendor="delta4"):
+    """Get results in the format of run_benchmarks for one vendor"""
+    return {
+        "vendors": {
+            vendor: {"seconds": seconds, "peak_memory_mb": peak_memory_mb}
+        }
+    }
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Unit tests for run_benchmarks."""
+
+    def test_compare_to_baseline(self):
+        """Check that only increases beyond the thresholds are reported"""
+        baseline = get_results({"extract": 1.0, "parse": 0.0}, 10.0)
+
+        # within thresholds, faster, or without a baseline value
+        results = get_results({"extract": 1.2, "parse": 5.0}, 12.0)
+        self.assertEqual(
+            run_benchmarks.compare_to_baseline(results, baseline), []
+        )
+        results = get_results({"extract": 0.5, "layout": 9.0}, 1.0)
+        self.assertEqual(
+            run_benchmarks.compare_to_baseline(results, baseline), []
+        )
+
+        results = get_results({"extract": 1.5, "parse": 0.1}, 20.0)
+        regressions = run_benchmarks.compare_to_baseline(results, baseline)
+        self.assertEqual(
+            regressions,
+            [
+                "delta4 extract time: 1.5 vs. baseline 1 (+50%)",
+                "delta4 peak memory: 20 vs. baseline 10 (+100%)",
+            ],
+        )
+
+        # custom thresholds
+        regressions = run_benchmarks.compare_to_baseline(
+            results, baseline, time_threshold=0.6, memory_threshold=1.5
+        )
+        self.assertEqual(regressions, [])
+
+        # vendors missing from the baseline are skipped
+        results = get_results({"extract": 100.0}, 100.0, vendor="verisoft")
+        self.assertEqual(
+            run_benchmarks.compare_to_baseline(results, baseline), []
+        )
+
+    def test_default_baseline(self):
+        """Check that the default baseline is not in the working directory"""
+        self.assertIn(".benchmarks", run_benchmarks.DEFAULT_BASELINE)
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(unittest.main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# test_cache.py
+"""unittest cases for cache."""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+
+import unittest
+from IQDMPDF import cache
+from IQDMPDF.pdf_reader import PDFExtraction, CustomPDFReader
+from IQDMPDF.paths import DIRECTORIES
+from os.path import join
+from tempfile import TemporaryDirectory
+
+EXAMPLE_DATA = join(DIRECTORIES["TEST_DATA"], "simple_test.pdf")
+
+
+class TestCache(unittest.TestCase):
+    """Unit tests for ExtractionCache."""
+
+    def setUp(self):
+        """Create a temporary cache directory"""
+        self.tmp_dir = TemporaryDirectory()
+        self.cache = cache.ExtractionCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        """Remove the temporary cache directory"""
+        self.tmp_dir.cleanup()
+
+    def test_get_key(self):
+        """Check that keys depend on every component"""
+        key = self.cache.get_key("abc", "pages", "{}")
+        self.assertEqual(key, self.cache.get_key("abc", "pages", "{}"))
+        self.assertNotEqual(key, self.cache.get_key("abd", "pages", "{}"))
+        self.assertNotEqual(key, self.cache.get_key("abc", "text", "{}"))
+        self.assertNotEqual(
+            key, self.cache.get_key("abc", "pages", '{"line_margin": 1}')
+        )
+
+    def test_save_and_load(self):
+        """Test round trip of cached data"""
+        key = self.cache.get_key("abc", "text")
+        self.assertIsNone(self.cache.load(key))
+        self.cache.save(key, {"text": "Hello World!"})
+        self.assertEqual(self.cache.load(key), {"text": "Hello World!"})
+        self.assertEqual(len(self.cache.get_entries()), 1)
+
+        self.cache.clear()
+        self.assertIsNone(self.cache.load(key))
+
+    def test_eviction(self):
+        """Check that least recently used entries are evicted"""
+        small_cache = cache.ExtractionCache(self.tmp_dir.name, max_size=0)
+        small_cache.save(small_cache.get_key("abc", "text"), "data")
+        self.assertEqual(small_cache.get_entries(), [])
+
+    def test_pdf_extraction_cache(self):
+        """Check that cached extractions skip pdfminer"""
+        extraction = PDFExtraction(EXAMPLE_DATA, cache=self.cache)
+        text = extraction.text
+        reader = CustomPDFReader(EXAMPLE_DATA, extraction=extraction)
+
+        cached = PDFExtraction(EXAMPLE_DATA, cache=self.cache)
+        self.assertEqual(cached.text, text)
+        cached_reader = CustomPDFReader(EXAMPLE_DATA, extraction=cached)
+        self.assertEqual(cached.interpreted_page_count, 0)  # no pdfminer
+        for p, page in enumerate(cached_reader.page):
+            self.assertEqual(page.data, reader.page[p].data)
+        self.assertEqual(
+            cached_reader.get_block_data(0, [108.0, 675.97]),
+            ["Hello World!!!"],
+        )
+
+        # different LAParams are not served from the cache
+        kwargs = {"line_margin": 1}
+        CustomPDFReader(EXAMPLE_DATA, kwargs, extraction=cached)
+        self.assertEqual(cached.interpreted_page_count, 2)
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(unittest.main())
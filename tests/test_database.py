@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# test_database.py
+"""unittest cases for database."""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+
+import unittest
+from IQDMPDF import database, file_processor
+from IQDMPDF.paths import DIRECTORIES
+from IQDMPDF.utilities import get_file_hash
+from os import makedirs
+from os.path import join
+from shutil import copyfile
+from tempfile import TemporaryDirectory
+import sqlite3
+
+
+class TestDatabase(unittest.TestCase):
+    """Unit tests for SQLiteWriter."""
+
+    def test_sqlite_writer(self):
+        """Check that rows are upserted on file path and content hash"""
+        columns = ["uid", "date", "report_file_path"]
+        results = [
+            {
+                "report_type": "A",
+                "columns": columns,
+                "data": ["1", "2021", "a.pdf"],
+                "file_path": "a.pdf",
+                "content_hash": "x",
+            },
+            {"report_type": None, "columns": None, "data": None},
+            {
+                "report_type": "A",
+                "columns": columns,
+                "data": ["2", "2021", "b.pdf"],
+                "file_path": "b.pdf",
+                "content_hash": "y",
+            },
+        ]
+        analysis_columns = {"A": {"uid": [0], "date": 1}}
+        with TemporaryDirectory() as tmp_dir:
+            db = join(tmp_dir, "results.db")
+            for uid in ["1", "3"]:
+                results[0]["data"][0] = uid
+                with database.SQLiteWriter(
+                    db, analysis_columns, batch_size=2
+                ) as writer:
+                    written = [writer.write(result) for result in results]
+                self.assertEqual(written, [True, False, True])
+
+            connection = sqlite3.connect(db)
+            rows = connection.execute(
+                'SELECT * FROM "A" ORDER BY report_file_path'
+            ).fetchall()
+            indices = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name = 'A' AND sql IS NOT NULL"
+            ).fetchall()
+            connection.close()
+            self.assertEqual(
+                rows,
+                [("3", "2021", "a.pdf", "x"), ("2", "2021", "b.pdf", "y")],
+            )
+            self.assertEqual(sorted(indices), [("A_date",), ("A_uid",)])
+
+    def test_process_files_database(self):
+        """Check that re-runs of process_files do not duplicate rows"""
+        directory = join(DIRECTORIES["SNCPATIENT_EXAMPLES"], "UChicago")
+        with TemporaryDirectory() as tmp_dir:
+            db = join(tmp_dir, "results.db")
+            for processes in [1, 2]:
+                file_processor.process_files(
+                    directory, processes=processes, database=db
+                )
+            connection = sqlite3.connect(db)
+            rows = connection.execute(
+                'SELECT report_file_path, content_hash FROM "SNCPatientCustom"'
+            ).fetchall()
+            connection.close()
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(len(rows[0][1]), 64)
+
+    def test_modified_file(self):
+        """Check that the row of a modified file is replaced"""
+        directory = DIRECTORIES["SNCPATIENT_EXAMPLES"]
+        examples = [
+            join(directory, "UChicago", "DCAM_example_1.pdf"),
+            join(directory, "Beaumont", "1.pdf"),
+        ]
+        with TemporaryDirectory() as tmp_dir:
+            pdf_dir = join(tmp_dir, "pdfs")
+            makedirs(pdf_dir)
+            pdf_path = join(pdf_dir, "qa.pdf")
+            db = join(tmp_dir, "results.db")
+            for example in examples:
+                copyfile(example, pdf_path)
+                file_processor.process_files(pdf_dir, database=db)
+            connection = sqlite3.connect(db)
+            rows = connection.execute(
+                'SELECT report_file_path, content_hash FROM "SNCPatientCustom"'
+            ).fetchall()
+            connection.close()
+            self.assertEqual(rows, [(pdf_path, get_file_hash(examples[1]))])
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(unittest.main())
@@ -12,8 +12,13 @@
 import unittest
 from IQDMPDF import file_processor
 from IQDMPDF.paths import DIRECTORIES
-from os import listdir, unlink
-from os.path import join, isdir
+from IQDMPDF.manifest import MANIFEST_FILE_NAME
+from IQDMPDF.utilities import get_file_hash
+from os import listdir, unlink, makedirs
+from os.path import join, isdir, isfile
+from shutil import copyfile
+from tempfile import TemporaryDirectory
+import json
 
 SIMPLE_PDF = join(DIRECTORIES["TEST_DATA"], "simple_test.pdf")
 
@@ -83,6 +88,258 @@ class TestFileProcessor(unittest.TestCase):
         for file in test_files:
             unlink_file(file)
 
+    def test_process_files_with_cache(self):
+        """Test process_files with a persistent extraction cache"""
+        directory = join(DIRECTORIES["SNCPATIENT_EXAMPLES"], "UChicago")
+        with TemporaryDirectory() as tmp_dir:
+            cache_dir = join(tmp_dir, "cache")
+            for _ in range(2):
+                file_processor.process_files(
+                    directory,
+                    output_file="cache_test.csv",
+                    output_dir=tmp_dir,
+                    cache_dir=cache_dir,
+                )
+            self.assertTrue(len(listdir(cache_dir)) > 0)
+            with open(join(tmp_dir, "SNCPatientCustom_cache_test.csv")) as f:
+                self.assertEqual(len(f.readlines()), 3)  # header + 2 runs
+
+    def test_process_files_incremental(self):
+        """Test that incremental scans re-use results of unchanged files"""
+        directory = join(DIRECTORIES["SNCPATIENT_EXAMPLES"], "UChicago")
+        output = "SNCPatientCustom_incremental_test.csv"
+        with TemporaryDirectory() as tmp_dir:
+            # output files are replaced, not appended to
+            for processes in [1, 1, 2, 1]:
+                file_processor.process_files(
+                    directory,
+                    output_file="incremental_test.csv",
+                    output_dir=tmp_dir,
+                    incremental=True,
+                    processes=processes,
+                )
+                with open(join(tmp_dir, output)) as f:
+                    self.assertEqual(len(f.readlines()), 2)
+            self.assertTrue(isfile(join(tmp_dir, MANIFEST_FILE_NAME)))
+
+    def test_process_files_incremental_failures(self):
+        """Check that files that fail to parse are recorded in both paths"""
+        with TemporaryDirectory() as tmp_dir:
+            pdf_dir = join(tmp_dir, "pdfs")
+            makedirs(pdf_dir)
+            with open(join(pdf_dir, "corrupt.pdf"), "wb") as f:
+                f.write(b"%PDF-1.4\nnot a valid PDF")
+            for processes in [1, 2]:
+                manifest_file = join(tmp_dir, "manifest_%s.json" % processes)
+                file_processor.process_files(
+                    pdf_dir,
+                    output_file="failure_test.csv",
+                    output_dir=tmp_dir,
+                    incremental=True,
+                    manifest_file=manifest_file,
+                    processes=processes,
+                )
+                with open(manifest_file) as f:
+                    entries = list(json.load(f)["files"].values())
+                self.assertEqual(len(entries), 1)
+                self.assertIsNone(entries[0]["result"]["report_type"])
+
+    def test_process_files_timeout(self):
+        """Check that files exceeding the timeout are listed separately"""
+        directory = join(DIRECTORIES["DELTA4_EXAMPLES"], "UChicago")
+        with TemporaryDirectory() as tmp_dir:
+            file_processor.process_files(
+                directory,
+                output_file="timeout_test.csv",
+                output_dir=tmp_dir,
+                processes=2,
+                timeout=1e-6,
+                max_tasks=1,
+            )
+            timed_out = "%s_timeout_test.csv" % (
+                file_processor.TIMED_OUT_REPORT_TYPE
+            )
+            self.assertEqual(listdir(tmp_dir), [timed_out])
+            with open(join(tmp_dir, timed_out)) as f:
+                lines = f.readlines()
+            self.assertEqual(len(lines), len(listdir(directory)) + 1)
+
+    def test_process_files_duplicates(self):
+        """Check that identical files are parsed once"""
+        directory = join(DIRECTORIES["SNCPATIENT_EXAMPLES"], "UChicago")
+        pdf_path = join(directory, listdir(directory)[0])
+        output = "SNCPatientCustom_duplicates_test.csv"
+        duplicates = "%s_duplicates_test.csv" % (
+            file_processor.DUPLICATE_REPORT_TYPE
+        )
+        with TemporaryDirectory() as tmp_dir:
+            init_directory = join(tmp_dir, "reports")
+            for sub_dir in ["a", "b", "c"]:
+                makedirs(join(init_directory, sub_dir))
+                copyfile(pdf_path, join(init_directory, sub_dir, "qa.pdf"))
+
+            expected = {"all": (3, 0), "first": (1, 2)}
+            for mode, (rows, duplicate_rows) in expected.items():
+                for processes in [1, 2]:
+                    output_dir = join(tmp_dir, "%s_%s" % (mode, processes))
+                    makedirs(output_dir)
+                    file_processor.process_files(
+                        init_directory,
+                        output_file="duplicates_test.csv",
+                        output_dir=output_dir,
+                        processes=processes,
+                        duplicates=mode,
+                    )
+                    with open(join(output_dir, output)) as f:
+                        lines = f.readlines()[1:]
+                    self.assertEqual(len(lines), rows)
+                    paths = [line.strip().split(",")[-1] for line in lines]
+                    self.assertEqual(len(set(paths)), rows)
+                    if duplicate_rows:
+                        with open(join(output_dir, duplicates)) as f:
+                            lines = f.readlines()[1:]
+                        self.assertEqual(len(lines), duplicate_rows)
+
+    def test_duplicate_files(self):
+        """Check that each file contents is only parsed once"""
+        with TemporaryDirectory() as tmp_dir:
+            paths = [join(tmp_dir, name) for name in ["a.pdf", "b.pdf"]]
+            for path in paths:
+                with open(path, "wb") as f:
+                    f.write(b"same contents")
+            content_hash = get_file_hash(paths[0])
+            result = {
+                "data": ["value", paths[0]],
+                "report_type": "Test",
+                "columns": ["column", "report_file_path"],
+                "file_path": paths[0],
+                "metrics": {"file_path": paths[0]},
+            }
+
+            # b is found before the result of a
+            unique_files = file_processor.DuplicateFiles(paths, "all")
+            self.assertEqual(list(unique_files), paths[:1])
+            self.assertEqual(unique_files.pop_hash(paths[0]), content_hash)
+            self.assertIsNone(unique_files.pop_hash(paths[0]))
+            unique_files.add_result(result)
+            duplicates = list(unique_files.pop_results())
+            self.assertEqual(duplicates[0]["file_path"], paths[1])
+            self.assertNotIn("metrics", duplicates[0])
+            self.assertEqual(list(unique_files.pop_results()), [])
+            self.assertEqual(unique_files.duplicate_count, 1)
+
+            # b is found after the result of a was written, e.g., by a slow
+            # directory scan, and is still not parsed
+            unique_files = file_processor.DuplicateFiles(paths, "all")
+            files = iter(unique_files)
+            self.assertEqual(next(files), paths[0])
+            unique_files.add_result(result)
+            self.assertEqual(list(unique_files.pop_results()), [])
+            self.assertEqual(list(files), [])
+            duplicates = list(unique_files.pop_results())
+            self.assertEqual(duplicates[0]["file_path"], paths[1])
+            self.assertEqual(unique_files.duplicate_count, 1)
+            self.assertEqual(unique_files.get_unresolved(), [])
+
+    def test_process_files_shards(self):
+        """Check that merged shards match a single run"""
+        output_file = "shard_test.csv"
+        with TemporaryDirectory() as tmp_dir:
+            single_dir = join(tmp_dir, "single")
+            shard_dir = join(tmp_dir, "shards")
+            merged_dir = join(tmp_dir, "merged")
+            for directory in [single_dir, shard_dir, merged_dir]:
+                makedirs(directory)
+
+            file_processor.process_files(
+                DIRECTORIES["TEST_DATA"],
+                output_file=output_file,
+                output_dir=single_dir,
+            )
+            for shard_index in range(3):
+                file_processor.process_files(
+                    DIRECTORIES["TEST_DATA"],
+                    output_file=output_file,
+                    output_dir=shard_dir,
+                    shard_index=shard_index,
+                    shard_count=3,
+                )
+            merged = file_processor.merge_shards(
+                shard_dir, output_file, merged_dir
+            )
+
+            self.assertEqual(
+                sorted(listdir(merged_dir)), sorted(listdir(single_dir))
+            )
+            for file_path in merged.values():
+                with open(file_path) as f:
+                    merged_lines = f.readlines()
+                with open(file_path.replace(merged_dir, single_dir)) as f:
+                    single_lines = f.readlines()
+                self.assertEqual(merged_lines[0], single_lines[0])
+                self.assertEqual(sorted(merged_lines), sorted(single_lines))
+
+        invalid = [
+            {"shard_count": 3},
+            {"shard_index": 0},
+            {"shard_index": 3, "shard_count": 3},
+            {"shard_index": -1, "shard_count": 3},
+        ]
+        for kwargs in invalid:
+            with self.assertRaises(ValueError):
+                file_processor.process_files(
+                    DIRECTORIES["TEST_DATA"], output_file=output_file, **kwargs
+                )
+
+    def test_process_files_metrics(self):
+        """Check that a metrics record is written for each parsed file"""
+        directory = join(DIRECTORIES["SNCPATIENT_EXAMPLES"], "UChicago")
+        with TemporaryDirectory() as tmp_dir:
+            for processes in [1, 2]:
+                file_processor.process_files(
+                    directory,
+                    output_file="metrics_test.csv",
+                    output_dir=tmp_dir,
+                    processes=processes,
+                    metrics=True,
+                )
+                metrics_file = file_processor.get_metrics_file_path(
+                    "metrics_test.csv", tmp_dir
+                )
+                with open(metrics_file) as f:
+                    records = [json.loads(line) for line in f]
+                self.assertEqual([r["type"] for r in records], ["file", "run"])
+                self.assertIn("write", records[0]["stages"])
+                self.assertIn("discovery", records[1]["stages"])
+
+    def test_results_writer(self):
+        """Check that columns are written once per report type"""
+        results = [
+            {"report_type": "A", "columns": ["x", "y"], "data": [1, 2]},
+            {"report_type": "B", "columns": ["z"], "data": [3]},
+            {"report_type": None, "columns": None, "data": None},
+            {"report_type": "A", "columns": ["x", "y"], "data": [4, 5]},
+        ]
+        with TemporaryDirectory() as tmp_dir:
+            for mode, expected in [("w", 3), ("a", 5), ("w", 3)]:
+                with file_processor.ResultsWriter(
+                    "writer_test.csv", tmp_dir, mode=mode
+                ) as writer:
+                    written = [writer.write(result) for result in results]
+                self.assertEqual(written, [True, True, False, True])
+                with open(writer.file_paths["A"]) as f:
+                    self.assertEqual(len(f.readlines()), expected)
+            with open(join(tmp_dir, "B_writer_test.csv")) as f:
+                self.assertEqual(f.read().split(), ["z", "3"])
+
+            # rows are available before close when flushed
+            with file_processor.ResultsWriter(
+                "flush_test.csv", tmp_dir, flush_interval=0
+            ) as writer:
+                writer.write(results[1])
+                with open(writer.file_paths["B"]) as f:
+                    self.assertEqual(f.read().split(), ["z", "3"])
+
     def mock_callback(self, msg):
         self.assertTrue("label" in msg.keys())
         self.assertTrue("gauge" in msg.keys())
@@ -134,6 +391,13 @@ class TestFileProcessor(unittest.TestCase):
         kwargs["init_directory"] = "."
         file_processor.validate_kwargs(kwargs)
 
+        kwargs.update({"shard_index": "3", "shard_count": "2"})
+        self.assertEqual(file_processor.validate_kwargs(kwargs), {})
+        kwargs.update({"shard_index": "1", "output_file": "results.csv"})
+        validated = file_processor.validate_kwargs(kwargs)
+        self.assertEqual(validated["shard_index"], 1)
+        self.assertEqual(validated["shard_count"], 2)
+
     def test_print_callback(self):
         """Test the simple print message callback"""
         with self.assertRaises(KeyError):
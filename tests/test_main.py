@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# test_main.py
+"""unittest cases for main."""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+
+import unittest
+from os.path import dirname
+import json
+import subprocess
+import sys
+
+# Maximum seconds to import IQDMPDF.main, the fastest of IMPORT_RUNS
+IMPORT_TIME_BUDGET = 0.25
+IMPORT_RUNS = 3
+# Modules that should only be loaded once files are processed
+DEFERRED_MODULES = ["pdfminer", "tqdm", "multiprocessing", "IQDMPDF.parsers"]
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from IQDMPDF.main import main
+duration = time.perf_counter() - start
+sys.argv = ["IQDMPDF"] + sys.argv[1:]
+main()
+print(json.dumps({"duration": duration, "modules": list(sys.modules)}))
+"""
+
+
+def run_startup(*args):
+    """Import IQDMPDF.main and call main in a new interpreter
+
+    Parameters
+    ----------
+    args : str
+        Command line arguments of main
+
+    Returns
+    ----------
+    dict
+        "duration" (seconds to import IQDMPDF.main) and "modules" (names
+        of the modules loaded after main returned)
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT] + list(args),
+        cwd=dirname(dirname(__file__)),
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+class TestMain(unittest.TestCase):
+    """Unit tests for the command line interface start up."""
+
+    def test_version_imports(self):
+        """Check that --version does not load parsers or pdfminer"""
+        modules = run_startup("--version")["modules"]
+        for deferred in DEFERRED_MODULES:
+            loaded = [
+                m
+                for m in modules
+                if m == deferred or m.startswith(deferred + ".")
+            ]
+            self.assertEqual(loaded, [], "%s loaded at start up" % deferred)
+
+    def test_import_time(self):
+        """Check that IQDMPDF.main imports within IMPORT_TIME_BUDGET"""
+        duration = min(
+            run_startup("--version")["duration"] for _ in range(IMPORT_RUNS)
+        )
+        self.assertLess(duration, IMPORT_TIME_BUDGET)
+
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# test_manifest.py
+"""unittest cases for manifest."""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+
+import unittest
+from IQDMPDF import manifest
+from os import utime
+from os.path import join
+from tempfile import TemporaryDirectory
+from threading import Thread
+import hashlib
+
+
+class TestManifest(unittest.TestCase):
+    """Unit tests for ScanManifest."""
+
+    def setUp(self):
+        """Create a temporary directory with a scanned file"""
+        self.tmp_dir = TemporaryDirectory()
+        self.file_path = join(self.tmp_dir.name, "report.pdf")
+        self.write_file(b"report")
+        self.manifest_path = join(self.tmp_dir.name, "manifest.json")
+        self.result = {
+            "data": ["value", 0.0, self.file_path],
+            "report_type": "Test",
+            "columns": ["column", "report_file_creation", "report_file_path"],
+            "file_path": self.file_path,
+            "content_hash": hashlib.sha256(b"report").hexdigest(),
+        }
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        self.tmp_dir.cleanup()
+
+    def write_file(self, data):
+        """Write data to the scanned file"""
+        with open(self.file_path, "wb") as f:
+            f.write(data)
+
+    def get_saved_manifest(self):
+        """Save a manifest with one result, return a newly loaded one"""
+        scan = manifest.ScanManifest(self.manifest_path)
+        self.assertIsNone(scan.get_result(self.file_path))
+        scan.add(self.file_path, self.result)
+        scan.save()
+        return manifest.ScanManifest(self.manifest_path)
+
+    def test_unchanged_file(self):
+        """Check that stored results are returned for unchanged files"""
+        scan = self.get_saved_manifest()
+        self.assertEqual(scan.get_result(self.file_path), self.result)
+
+        # touched, but content is the same
+        utime(self.file_path, (0, 0))
+        self.assertEqual(scan.get_result(self.file_path), self.result)
+
+    def test_changed_file(self):
+        """Check that changed files are not returned"""
+        scan = self.get_saved_manifest()
+        self.write_file(b"report2")
+        self.assertIsNone(scan.get_result(self.file_path))
+
+        scan = self.get_saved_manifest()
+        self.write_file(b"tropre")  # same size
+        utime(self.file_path, (0, 0))
+        self.assertIsNone(scan.get_result(self.file_path))
+
+    def test_save_while_adding(self):
+        """Check that the manifest can be saved while another thread adds"""
+        scan = manifest.ScanManifest(self.manifest_path)
+        file_paths = []
+        for i in range(2000):
+            file_paths.append(join(self.tmp_dir.name, "%s.pdf" % i))
+            with open(file_paths[-1], "wb") as f:
+                f.write(b"report")
+
+        def add_results():
+            for file_path in file_paths:
+                scan.add(file_path, self.result)
+
+        thread = Thread(target=add_results)
+        thread.start()
+        while thread.is_alive():
+            scan.save()
+        thread.join()
+        scan.save()
+        saved = manifest.ScanManifest(self.manifest_path).previous
+        self.assertEqual(len(saved), 2000)
+
+    def test_removed_files_are_dropped(self):
+        """Only files seen in the current scan are saved"""
+        scan = self.get_saved_manifest()
+        scan.save()
+        self.assertEqual(
+            manifest.ScanManifest(self.manifest_path).previous, {}
+        )
+
+    def test_version_mismatch(self):
+        """Manifests from other versions are ignored"""
+        scan = self.get_saved_manifest()
+        original_version = manifest.__version__
+        try:
+            manifest.__version__ = "0.0.0"
+            self.assertEqual(scan.load(), {})
+        finally:
+            manifest.__version__ = original_version
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(unittest.main())
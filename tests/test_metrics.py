@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# test_metrics.py
+"""unittest cases for metrics."""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+
+import unittest
+from IQDMPDF import metrics
+from IQDMPDF.parsers.parser import ReportParser
+from IQDMPDF.paths import DIRECTORIES
+from os.path import getsize, join
+from tempfile import TemporaryDirectory
+import json
+
+
+class TestMetrics(unittest.TestCase):
+    """Unit tests for metrics."""
+
+    def test_stage_timer(self):
+        """Check that durations of repeated stages are summed"""
+        timer = metrics.StageTimer()
+        for _ in range(2):
+            with timer.stage("a"):
+                pass
+        self.assertEqual(list(timer.stages), ["a"])
+        self.assertEqual(list(timer.iter_stage(range(3), "b")), [0, 1, 2])
+        self.assertEqual(sorted(timer.stages), ["a", "b"])
+
+        with metrics.timed(None, "c"):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.timed(timer, "c"):
+                raise ValueError
+        self.assertIn("c", timer.stages)
+
+    def test_report_parser_metrics(self):
+        """Check that each stage of ReportParser is recorded"""
+        path = join(
+            DIRECTORIES["DELTA4_EXAMPLES"], "UChicago", "DCAM_example_2.pdf"
+        )
+        file_metrics = metrics.FileMetrics(path)
+        report_parser = ReportParser(path, metrics=file_metrics)
+        report_parser.csv_data
+        record = file_metrics.to_dict()
+        self.assertEqual(record["report_type"], "Delta4")
+        self.assertEqual(record["bytes"], getsize(path))
+        # only the pages used by Delta4Report are interpreted
+        self.assertEqual(
+            record["page_count"],
+            report_parser.extraction.interpreted_page_count,
+        )
+        self.assertEqual(record["page_count"], 2)
+        expected = ["identify", "extract", "layout", "parse"]
+        self.assertEqual(list(record["stages"]), expected)
+
+        with TemporaryDirectory() as tmp_dir:
+            file_path = join(tmp_dir, "metrics.jsonl")
+            with metrics.MetricsWriter(file_path) as writer:
+                writer.write(record)
+                writer.write(record)
+            with open(file_path) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(lines, [record, record])
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(unittest.main())
@@ -11,11 +11,14 @@
 
 import unittest
 from IQDMPDF import pdf_reader
+from IQDMPDF.utilities import bbox_to_pos, is_in_tol
 from os.path import join, isfile
 from IQDMPDF.paths import DIRECTORIES
 
 
 EXAMPLE_DATA = join(DIRECTORIES["TEST_DATA"], "simple_test.pdf")
+# Output of pdfminer's TextConverter for EXAMPLE_DATA, with default LAParams
+EXPECTED_TEXT = join(DIRECTORIES["TEST_DATA"], "simple_test.txt")
 
 
 class TestPDFReader(unittest.TestCase):
@@ -80,6 +83,147 @@ class TestPDFReader(unittest.TestCase):
             tests[i]["pos"] = [v + 2 for v in tests[i]["pos"]]
         self.assess_custom_pdf_test_data(reader, tests, self.assertNotEqual)
 
+    def test_pdf_extraction(self):
+        """Test that a PDFExtraction is shared by text and layout consumers"""
+        extraction = pdf_reader.PDFExtraction(EXAMPLE_DATA)
+        self.assertEqual(extraction.page_count, 2)
+        raw_pages = extraction.raw_pages
+        with open(EXPECTED_TEXT, "r", newline="") as f:
+            self.assertEqual(extraction.text, f.read())
+
+        # layouts are cached by LAParams kwargs, regardless of key order
+        kwargs = {"line_margin": 1, "char_margin": 100}
+        layout = extraction.get_layout(kwargs)
+        self.assertEqual(
+            layout, extraction.get_layout(dict(reversed(kwargs.items())))
+        )
+        self.assertIsNot(layout[0], extraction.get_layout()[0])
+        analyzed = extraction._layouts[pdf_reader.get_laparams_key(None)]
+        self.assertEqual(sorted(analyzed), [0, 1])
+
+        reader = pdf_reader.CustomPDFReader(
+            EXAMPLE_DATA, extraction=extraction
+        )
+        self.assertIs(reader.extraction.raw_pages, raw_pages)
+        expected = pdf_reader.CustomPDFReader(EXAMPLE_DATA)
+        for p, page in enumerate(reader.page):
+            self.assertEqual(page.data["text"], expected.page[p].data["text"])
+
+    def test_page_selection(self):
+        """Check that only selected pages are interpreted and analyzed"""
+        extraction = pdf_reader.PDFExtraction(EXAMPLE_DATA)
+        reader = pdf_reader.CustomPDFReader(
+            EXAMPLE_DATA, extraction=extraction, pages=1
+        )
+        self.assertEqual(extraction.interpreted_page_count, 1)
+        self.assertEqual(len(reader.page), 1)
+        expected = pdf_reader.CustomPDFReader(EXAMPLE_DATA)
+        self.assertEqual(
+            reader.page[0].data["text"], expected.page[0].data["text"]
+        )
+        self.assertEqual(extraction.get_text(1), extraction.get_text([0]))
+        self.assertTrue(extraction.get_text(1).startswith("Hello World!!!"))
+        self.assertNotIn("2nd page data!", extraction.get_text(1))
+
+        # unselected pages before the last selected page have no data
+        reader = pdf_reader.CustomPDFReader(
+            EXAMPLE_DATA, extraction=extraction, pages=[1]
+        )
+        self.assertEqual(extraction.interpreted_page_count, 2)
+        self.assertEqual(reader.page[0].data["text"], [])
+        self.assertEqual(
+            reader.page[1].data["text"], expected.page[1].data["text"]
+        )
+        self.assertIn("2nd page data!", extraction.get_text([1]))
+
+        # each page is analyzed once per LAParams
+        layout = extraction.get_layout()
+        self.assertIs(layout[0], extraction.get_layout(pages=1)[0])
+        self.assertEqual(extraction.text, extraction.get_text())
+
+    def test_release(self):
+        """Check that pages are not interpreted again after a release"""
+        extraction = pdf_reader.PDFExtraction(EXAMPLE_DATA)
+        text = extraction.get_text(1)
+        page = extraction._raw_pages[0]
+        extraction.release()
+        self.assertIsNone(extraction._document)
+        self.assertIsNone(extraction._page_generator)
+
+        # remaining pages are interpreted after reading the PDF again
+        self.assertEqual(extraction.page_count, 2)
+        self.assertIs(extraction.raw_pages[0], page)
+        self.assertIsNone(extraction._document)
+        self.assertEqual(extraction.get_text(1), text)
+        with open(EXPECTED_TEXT, "r", newline="") as f:
+            self.assertEqual(extraction.text, f.read())
+
+    def test_info(self):
+        """Check that document information is read without interpretation"""
+        extraction = pdf_reader.PDFExtraction(EXAMPLE_DATA)
+        self.assertEqual(extraction.info["Title"], "IQDM-PDF Test")
+        self.assertEqual(extraction.info["Creator"], "Word")
+        self.assertEqual(extraction.interpreted_page_count, 0)
+        self.assertEqual(extraction.page_count, 2)
+        self.assertEqual(extraction.info["Title"], "IQDM-PDF Test")
+
+    def test_position_index(self):
+        """Compare PositionIndex range queries to a linear search"""
+        reader = pdf_reader.CustomPDFReader(EXAMPLE_DATA)
+        page = reader.page[0]
+        modes = ["bottom-left", "center", "top-right", "center-left"]
+        tolerances = [(10, 10), (1000, 5), (5, 1000), (0, 0), (50, 20)]
+        for mode in modes:
+            index = page.get_position_index(mode)
+            for bbox in page.data["bbox"]:
+                pos = bbox_to_pos(bbox, mode)
+                for tol in tolerances:
+                    expected = [
+                        i
+                        for i, b in enumerate(page.data["bbox"])
+                        if is_in_tol(bbox_to_pos(b, mode)[0], pos[0], tol[0])
+                        and is_in_tol(bbox_to_pos(b, mode)[1], pos[1], tol[1])
+                    ]
+                    self.assertEqual(index.query(pos, tol), expected)
+
+    def test_get_first_block_data(self):
+        """Test block data queries across pages"""
+        reader = pdf_reader.CustomPDFReader(EXAMPLE_DATA)
+        self.assertEqual(
+            reader.get_block_data(1, [72.0, 705.25]), ["2nd page data!"]
+        )
+        self.assertEqual(
+            reader.get_block_data(0, [108.0, 675.97], tol=[5, 5]),
+            ["Hello World!!!"],
+        )
+
+        page = reader.page[0]
+        self.assertEqual(
+            page.get_first_block_data([108.0, 675.97], (5, 5)),
+            "Hello World!!!",
+        )
+        self.assertEqual(
+            page.get_first_block_data(
+                [108.0, 675.97], (5, 5), ignored={"Hello World!!!"}
+            ),
+            "",
+        )
+
+    def test_get_bbox_of_data_batch(self):
+        """Check that batch anchor lookups match get_bbox_of_data"""
+        reader = pdf_reader.CustomPDFReader(EXAMPLE_DATA)
+        texts = ["Hello", "World", "page data", "Not in PDF", "!"]
+        for return_all in [False, True]:
+            expected = {
+                text: reader.get_bbox_of_data(text, return_all, True)
+                for text in texts
+            }
+            self.assertEqual(
+                reader.get_bbox_of_data_batch(texts, return_all, True),
+                expected,
+            )
+        self.assertIsNone(expected["Not in PDF"])
+
     def assess_custom_pdf_test_data(self, reader, tests, test_func):
         data = [reader.get_block_data(**test) for test in tests]
         for i, expected in enumerate(self.expected_data):
@@ -11,12 +11,40 @@
 
 import unittest
 from tests.test_data.expected_report_data import TestDataHelper
+from IQDMPDF import pdf_reader
 from IQDMPDF.pdf_reader import convert_pdf_to_txt
 from IQDMPDF.parsers import sncpatient
 from IQDMPDF.parsers import delta4
 from IQDMPDF.parsers import verisoft
+from IQDMPDF.parsers import parser
+from IQDMPDF.parsers import generic
+from IQDMPDF.parsers import registry as parser_registry
+from IQDMPDF.paths import DIRECTORIES
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+import json
+import sys
+import warnings
 
 TestDataHelper.__test__ = False
+SIMPLE_PDF = join(DIRECTORIES["TEST_DATA"], "simple_test.pdf")
+PLUGIN_MODULE = "iqdmpdf_test_plugin"
+PLUGIN_SOURCE = """
+from IQDMPDF.parsers.generic import ParserBase
+
+
+class SimpleReport(ParserBase):
+    def __init__(self):
+        ParserBase.__init__(self)
+        self.report_type = "Simple"
+        self.columns = ["Greeting"]
+        self.identifiers = ["Hello World", "simple PDF used to test"]
+
+    @property
+    def greeting(self):
+        return self.text[0].strip()
+"""
 
 PARSERS = {
     "sncpatient": sncpatient.SNCPatientCustom,
@@ -80,6 +108,285 @@ class TestReportParserBase:
                     self.assertEqual(data[key], value)
 
 
+class TestReportParser(unittest.TestCase):
+    """Unit tests for the unified ReportParser"""
+
+    def test_identification(self):
+        """Check report identification and page budget"""
+        path = join(
+            DIRECTORIES["DELTA4_EXAMPLES"], "UChicago", "DCAM_example_2.pdf"
+        )
+        report_parser = parser.ReportParser(path)
+        self.assertEqual(report_parser.report_type, "Delta4")
+
+        # identifiers of this example span the first two pages
+        report_parser = parser.ReportParser(path, identification_pages=1)
+        self.assertIsNone(report_parser.report)
+        self.assertEqual(report_parser.extraction.interpreted_page_count, 1)
+
+    def test_layout_pages(self):
+        """Check that only the pages used by a report class are interpreted"""
+        path = join(
+            DIRECTORIES["DELTA4_EXAMPLES"], "UChicago", "DCAM_example_2.pdf"
+        )
+        report_parser = parser.ReportParser(path)
+        self.assertEqual(report_parser.extraction.interpreted_page_count, 2)
+        self.assertEqual(report_parser.extraction.page_count, 4)
+
+        # the same data is found if all pages are analyzed
+        all_pages = delta4.Delta4Report()
+        all_pages.layout_pages = None
+        all_pages(path)
+        self.assertEqual(
+            report_parser.report.summary_data, all_pages.summary_data
+        )
+
+        # all pages are analyzed if an anchor is after layout_pages
+        first_page = delta4.Delta4Report()
+        first_page.layout_pages = 1
+        first_page(path)
+        self.assertEqual(first_page.extraction.interpreted_page_count, 4)
+        self.assertEqual(first_page.summary_data, all_pages.summary_data)
+
+        # required anchors of each parser are not on the selected pages,
+        # e.g., the report is on the second page after a cover page
+        paths = {
+            sncpatient.SNCPatientCustom: join(
+                DIRECTORIES["SNCPATIENT_EXAMPLES"],
+                "UChicago",
+                "DCAM_example_1.pdf",
+            ),
+            verisoft.VeriSoftReport: join(
+                DIRECTORIES["VERISOFT_EXAMPLES"],
+                "AMITA_Health",
+                "ANON0001.pdf",
+            ),
+        }
+        for report_class, path in paths.items():
+            expected = report_class()
+            expected(path)
+            report = report_class()
+            report.layout_pages = [1]
+            report(path)
+            self.assertEqual(len(report.data.page), 1)
+            self.assertEqual(report.summary_data, expected.summary_data)
+
+        sncpatient2020 = PARSERS["sncpatient2020"]()
+        self.assertEqual(sncpatient2020.layout_pages, [0])
+        index = parser.REPORT_CLASSES.index(verisoft.VeriSoftReport)
+        registry = parser.get_registry()
+        self.assertEqual(registry.get_layout_pages(index), 1)
+
+    def test_non_report(self):
+        """Non-report PDFs are rejected without layout analysis"""
+        report_parser = parser.ReportParser(SIMPLE_PDF)
+        self.assertIsNone(report_parser.report)
+        self.assertEqual(report_parser.extraction._layouts, {})
+        self.assertEqual(report_parser.columns, [])
+        self.assertEqual(report_parser.csv_data, [""])
+
+    def test_registry(self):
+        """Check that the registry is built once and returns new parsers"""
+        registry = parser.get_registry()
+        self.assertIs(registry, parser.get_registry())
+        self.assertEqual(registry.report_classes, parser.REPORT_CLASSES)
+
+        index = parser.REPORT_CLASSES.index(sncpatient.SNCPatientReport2020)
+        text = "\n".join(registry.identifiers[index])
+        self.assertIn(index, registry.match(text))
+        raw_text = text.replace(" ", "")
+        self.assertIn(index, registry.match(raw_text, ignore_whitespace=True))
+        self.assertEqual(registry.match(""), [])
+
+        new_parser = registry.get_parser(index)
+        self.assertIsNot(new_parser, registry.parsers[index])
+        self.assertIsNot(new_parser.LUT, registry.parsers[index].LUT)
+
+        path = join(
+            DIRECTORIES["DELTA4_EXAMPLES"], "UChicago", "DCAM_example_2.pdf"
+        )
+        report_parser = parser.ReportParser(path, registry=registry)
+        self.assertEqual(report_parser.report_type, "Delta4")
+
+    def test_summary_data_cache(self):
+        """Check that summary_data is calculated once per parsed file"""
+        directory = join(DIRECTORIES["DELTA4_EXAMPLES"], "UChicago")
+        report = delta4.Delta4Report()
+        report(join(directory, "DCAM_example_1.pdf"))
+        data = report.summary_data
+        self.assertIs(report.summary_data, data)
+        self.assertEqual(report.csv_data, report.csv_data)
+        self.assertIsNot(report.csv_data, report.csv_data)
+
+        report(join(directory, "DCAM_example_2.pdf"))
+        self.assertIsNot(report.summary_data, data)
+        self.assertNotEqual(report.summary_data, data)
+        self.assertEqual(report.get_summary_value("Daily Corr", float), 1.081)
+        self.assertIsNone(report.get_summary_value("Patient Name"))
+        self.assertEqual(report.get_summary_value("Energy", float, 0), 0)
+
+    def test_default_summary_data(self):
+        """Check that columns default to attributes of the same name"""
+        self.assertEqual(generic.get_attribute_name("Pass (%)"), "pass")
+        self.assertEqual(
+            generic.get_attribute_name("Gamma Dist."), "gamma_dist"
+        )
+        report = delta4.Delta4Report()
+        directory = join(DIRECTORIES["DELTA4_EXAMPLES"], "UChicago")
+        report(join(directory, "DCAM_example_2.pdf"))
+        data = generic.ParserBase.get_summary_data(report)
+        self.assertEqual(list(data), report.columns)
+        for column in ["Plan Name", "Energy", "Daily Corr", "Threshold"]:
+            self.assertEqual(data[column], report.summary_data[column])
+        self.assertEqual(data["Dev"], "")  # not an attribute
+
+    def test_preclassify(self):
+        """Check report classes suggested by the document information"""
+        index = parser.REPORT_CLASSES.index(verisoft.VeriSoftReport)
+        path = join(
+            DIRECTORIES["VERISOFT_EXAMPLES"], "AMITA_Health", "ANON0001.pdf"
+        )
+        report_parser = parser.ReportParser(path)
+        self.assertEqual(report_parser.report_type, "VeriSoft")
+        report_parser.extraction = pdf_reader.PDFExtraction(path)
+        self.assertEqual(report_parser.preclassify(), [index])
+        self.assertEqual(report_parser.extraction.interpreted_page_count, 1)
+        # preclassify is skipped once the text is available
+        report_parser.text
+        self.assertEqual(report_parser.preclassify(), [])
+
+        report_parser = parser.ReportParser(SIMPLE_PDF)
+        report_parser.extraction = pdf_reader.PDFExtraction(SIMPLE_PDF)
+        self.assertEqual(report_parser.preclassify(), [])
+
+        # document information is inconclusive without an identifier on the
+        # first page, so identification falls back to identify
+        registry = parser_registry.ParserRegistry(parser.REPORT_CLASSES)
+        registry.specs[index].info_identifiers = {"Creator": "PScript5"}
+        path = join(
+            DIRECTORIES["DELTA4_EXAMPLES"], "UChicago", "DCAM_example_1.pdf"
+        )
+        self.assertEqual(
+            registry.match_info(pdf_reader.PDFExtraction(path).info), [index]
+        )
+        report_parser = parser.ReportParser(path, registry=registry)
+        self.assertEqual(report_parser.report_type, "Delta4")
+        report_parser.extraction = pdf_reader.PDFExtraction(path)
+        self.assertEqual(report_parser.preclassify(), [])
+
+    def test_misleading_info(self):
+        """Check that a wrong document information hint is not used"""
+        index = parser.REPORT_CLASSES.index(sncpatient.SNCPatientCustom)
+        path = join(
+            DIRECTORIES["DELTA4_EXAMPLES"], "UChicago", "DCAM_example_2.pdf"
+        )
+        info = {"Producer": "wPDF 3.0 by WPCubed GmbH"}
+        report_parser = parser.ReportParser(path)
+        report_parser.extraction = pdf_reader.PDFExtraction(path)
+        report_parser.extraction._info = info
+        self.assertEqual(report_parser.preclassify(), [])
+        self.assertEqual(report_parser.get_report().report_type, "Delta4")
+
+        # a suggested class that is rejected by validate falls back to
+        # identify, e.g., if its identifiers were also on the first page
+        registry = parser_registry.ParserRegistry(parser.REPORT_CLASSES)
+        registry.identifiers[index] = ["ScandiDos AB"]
+        report_parser = parser.ReportParser(path, registry=registry)
+        report_parser.extraction = pdf_reader.PDFExtraction(path)
+        report_parser.extraction._info = info
+        self.assertEqual(report_parser.preclassify(), [index])
+        self.assertEqual(report_parser.get_report().report_type, "Delta4")
+
+    def test_entry_points(self):
+        """Check that installed entry points are found on all versions"""
+        group = parser_registry.ENTRY_POINT_GROUP
+        module = "iqdmpdf_test_entry_point"
+        metadata = {
+            "report_type": "Simple",
+            "identifiers": ["Hello World", "simple PDF used to test"],
+            "class": "%s:SimpleReport" % PLUGIN_MODULE,
+        }
+        with TemporaryDirectory() as site_dir:
+            dist_info = join(site_dir, "iqdmpdf_test-1.0.dist-info")
+            makedirs(dist_info)
+            with open(join(dist_info, "METADATA"), "w") as f:
+                f.write("Metadata-Version: 2.1\n")
+                f.write("Name: iqdmpdf-test\nVersion: 1.0\n")
+            with open(join(dist_info, "entry_points.txt"), "w") as f:
+                f.write("[%s]\nSimple = %s:METADATA\n" % (group, module))
+            with open(join(site_dir, module + ".py"), "w") as f:
+                f.write("METADATA = %r\n" % metadata)
+
+            sys.path.append(site_dir)
+            try:
+                specs = parser_registry.get_entry_point_specs([site_dir])
+                self.assertEqual([s.report_type for s in specs], ["Simple"])
+
+                # used on python < 3.8
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    found = parser_registry.get_pkg_resources_entry_points(
+                        group, [site_dir]
+                    )
+                self.assertEqual([e.name for e in found], ["Simple"])
+                self.assertEqual(found[0].load(), metadata)
+            finally:
+                sys.modules.pop(module, None)
+                sys.path.remove(site_dir)
+
+    def test_plugins(self):
+        """Check that plugins are only imported when identifiers match"""
+        metadata = {
+            "report_type": "Simple",
+            "identifiers": ["Hello World", "simple PDF used to test"],
+            "class": "%s:SimpleReport" % PLUGIN_MODULE,
+            "analysis_columns": {"uid": [0], "date": 0, "y": []},
+        }
+        with TemporaryDirectory() as plugin_dir:
+            with open(join(plugin_dir, "simple.json"), "w") as f:
+                json.dump(metadata, f)
+            with open(join(plugin_dir, PLUGIN_MODULE + ".py"), "w") as f:
+                f.write(PLUGIN_SOURCE)
+
+            try:
+                specs = parser_registry.get_plugin_specs([plugin_dir])
+                self.assertEqual([s.report_type for s in specs], ["Simple"])
+                registry = parser_registry.ParserRegistry(
+                    parser.REPORT_CLASSES + specs
+                )
+                columns = registry.get_analysis_columns()
+                self.assertEqual(
+                    columns["Simple"], metadata["analysis_columns"]
+                )
+
+                path = join(
+                    DIRECTORIES["DELTA4_EXAMPLES"],
+                    "UChicago",
+                    "DCAM_example_2.pdf",
+                )
+                report_parser = parser.ReportParser(path, registry=registry)
+                self.assertEqual(report_parser.report_type, "Delta4")
+                self.assertNotIn(PLUGIN_MODULE, sys.modules)
+
+                report_parser = parser.ReportParser(
+                    SIMPLE_PDF, registry=registry
+                )
+                self.assertEqual(report_parser.report_type, "Simple")
+                self.assertEqual(report_parser.csv_data[0], "Hello World!!!")
+                self.assertIn(PLUGIN_MODULE, sys.modules)
+            finally:
+                sys.modules.pop(PLUGIN_MODULE, None)
+                if plugin_dir in sys.path:
+                    sys.path.remove(plugin_dir)
+
+        for key in ["identifiers", "class"]:
+            with self.assertRaises(ValueError):
+                invalid = {k: v for k, v in metadata.items() if k != key}
+                parser_registry.ReportClassSpec.from_dict(invalid)
+        with self.assertRaises(ValueError):
+            parser_registry.get_plugin_specs([join(plugin_dir, "missing")])
+
+
 class TestSNCPatient(TestReportParserBase, unittest.TestCase):
     def setUp(self):
         self.do_setup_for_vendor("sncpatient")
@@ -97,6 +404,40 @@ class TestSNCPatient2020(TestReportParserBase, unittest.TestCase):
         parser._assign_ignored(column, parser.LUT[column])
         self.assertEqual(parser.LUT[column]["ignored"], [column])
 
+    def test_query_plan(self):
+        """Check that the template is compiled once into grouped queries"""
+        parser = PARSERS["sncpatient2020"]()
+        self.assertIs(parser.plan, PARSERS["sncpatient2020"]().plan)
+        indices = [
+            query[0]
+            for queries in parser.plan.groups.values()
+            for query in queries
+        ]
+        self.assertEqual(sorted(indices), list(range(len(parser.columns))))
+        alternates = parser.json_data["alternates"]
+        self.assertEqual(len(parser.plan.alternates), len(alternates))
+        for alternate, compiled in zip(alternates, parser.plan.alternates):
+            self.assertEqual(compiled[0], alternate["column"])
+            self.assertIn(alternate["column"], compiled[-1])
+
+    def test_edited_lut(self):
+        """Check that edits of LUT are used to parse the report"""
+        path = list(self.test_data.file_paths.values())[0]
+        expected = PARSERS["sncpatient2020"]()
+        expected(path)
+        expected = expected.summary_data
+
+        parser = PARSERS["sncpatient2020"]()
+        plan = parser.plan
+        columns = ["QA Date", "Plan Date"]
+        parser.LUT[columns[0]]["pos"] = parser.LUT[columns[1]]["pos"]
+        parser(path)
+        self.assertIsNot(parser.plan, plan)
+        self.assertEqual(
+            parser.summary_data[columns[0]], expected[columns[1]]
+        )
+        self.assertEqual(parser.summary_data[columns[1]], expected[columns[1]])
+
 
 class TestDelta4(TestReportParserBase, unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# test_supervisor.py
+"""unittest cases for supervisor."""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+
+import unittest
+from IQDMPDF import supervisor
+from os import getpid, _exit
+import time
+
+
+def mock_worker(item):
+    """Sleep for item seconds, crash if item is negative"""
+    if item < 0:
+        _exit(1)
+    time.sleep(item)
+    return item
+
+
+def pid_worker(item):
+    """Return the process id of the worker"""
+    return getpid()
+
+
+def error_worker(item):
+    """Raise an error"""
+    raise ValueError(item)
+
+
+def slow_queue(items, delay):
+    """Yield the first item, then the others after a delay"""
+    yield items[0]
+    time.sleep(delay)
+    yield from items[1:]
+
+
+def timeout_result(item):
+    """Mark an item that timed out"""
+    return "timeout: %s" % item
+
+
+class TestSupervisor(unittest.TestCase):
+    """Unit tests for WorkerSupervisor."""
+
+    def test_imap_unordered(self):
+        """Check that every item returns a result"""
+        pool = supervisor.WorkerSupervisor(mock_worker, 2, timeout=10)
+        results = list(pool.imap_unordered([0, 0.01, 0, 0.02, 0]))
+        self.assertEqual(sorted(results), [0, 0, 0, 0.01, 0.02])
+
+    def test_timeout(self):
+        """Check that stuck and crashed workers are replaced"""
+        pool = supervisor.WorkerSupervisor(
+            mock_worker, 2, timeout=0.5, timeout_result=timeout_result
+        )
+        start = time.monotonic()
+        results = list(pool.imap_unordered([0, 60, -1, 0, 0]))
+        self.assertLess(time.monotonic() - start, 30)
+        expected = [0, 0, 0, "timeout: -1", "timeout: 60"]
+        self.assertEqual(sorted(results, key=str), expected)
+
+    def test_timeout_slow_queue(self):
+        """Check that timeouts are enforced while the queue is slow"""
+        pool = supervisor.WorkerSupervisor(
+            mock_worker, 2, timeout=0.5, timeout_result=timeout_result
+        )
+        start = time.monotonic()
+        results = pool.imap_unordered(slow_queue([60, 0], 5))
+        self.assertEqual(next(results), "timeout: 60")
+        self.assertLess(time.monotonic() - start, 4)
+        self.assertEqual(list(results), [0])
+
+    def test_max_tasks(self):
+        """Check that workers are replaced after max_tasks"""
+        pool = supervisor.WorkerSupervisor(pid_worker, 1, max_tasks=2)
+        pids = list(pool.imap_unordered(range(6)))
+        self.assertEqual(len(pids), 6)
+        self.assertEqual(len(set(pids)), 3)
+
+    def test_error(self):
+        """Check that worker errors are raised"""
+        pool = supervisor.WorkerSupervisor(error_worker, 1)
+        with self.assertRaises(ValueError):
+            list(pool.imap_unordered(["error"]))
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(unittest.main())
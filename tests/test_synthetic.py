@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# test_synthetic.py
+"""unittest cases for synthetic."""
+#
+# Copyright (c) 2021 Dan Cutright
+# This file is part of IQDM-PDF, released under a MIT license.
+#    See the file LICENSE included with this distribution, also
+
+
+import unittest
+from IQDMPDF import synthetic
+from IQDMPDF.parsers.parser import ReportParser
+from IQDMPDF.paths import DIRECTORIES
+from IQDMPDF.utilities import get_files
+from os.path import join, relpath, sep
+from tempfile import TemporaryDirectory
+import random
+
+VENDORS = ["DELTA4", "SNCPATIENT", "SNCPATIENT2020", "VERISOFT"]
+
+
+class TestSynthetic(unittest.TestCase):
+    """Unit tests for synthetic."""
+
+    def setUp(self):
+        self.samples = [
+            synthetic.ReportSample(
+                get_files(DIRECTORIES["%s_EXAMPLES" % vendor], True, ".pdf")[0]
+            )
+            for vendor in VENDORS
+        ]
+
+    def test_render(self):
+        """Check that synthetic reports parse with varied values"""
+        with TemporaryDirectory() as tmp_dir:
+            for sample in self.samples:
+                original = ReportParser(sample.file_path)
+                file_path = join(tmp_dir, "report.pdf")
+                with open(file_path, "wb") as f:
+                    f.write(sample.render(random.Random(3)))
+                report_parser = ReportParser(file_path)
+                self.assertEqual(report_parser.report_type, sample.report_type)
+
+                columns = report_parser.report.analysis_columns
+                index = columns["y"][0]["index"]
+                self.assertNotEqual(
+                    report_parser.csv_data[index], original.csv_data[index]
+                )
+                date = original.csv_data[columns["date"]]
+                if date:
+                    self.assertNotEqual(
+                        report_parser.csv_data[columns["date"]], date
+                    )
+
+    def test_shift_dates(self):
+        """Check that dates are shifted in their original format"""
+        text = "9/25/2020, 02/09/2007, 2021-01-11 11:47, 04 Mar 2014"
+        self.assertEqual(
+            synthetic.shift_dates(text, 101),
+            "1/4/2021, 05/21/2007, 2021-04-22 11:47, 13 Jun 2014",
+        )
+        self.assertEqual(synthetic.shift_dates("13/45/2020", 1), "13/45/2020")
+
+    def test_generate_corpus(self):
+        """Check file counts, placement and reproducibility"""
+        kwargs = {
+            "depth": 2,
+            "branching": 2,
+            "decoy_fraction": 0.25,
+            "corrupt_fraction": 0.25,
+            "seed": 1,
+            "samples": self.samples,
+        }
+        with TemporaryDirectory() as tmp_dir:
+            dir_1, dir_2 = join(tmp_dir, "1"), join(tmp_dir, "2")
+            counts = synthetic.generate_corpus(dir_1, 12, **kwargs)
+            self.assertEqual(
+                counts, synthetic.generate_corpus(dir_2, 12, **kwargs)
+            )
+            self.assertEqual(sum(counts.values()), 12)
+
+            files = get_files(dir_1, True, ".pdf")
+            self.assertEqual(len(files), 12)
+            for file_path in files:
+                self.assertEqual(relpath(file_path, dir_1).count(sep), 2)
+
+            report_types = {}
+            for file_path in files:
+                try:
+                    report_type = ReportParser(file_path).report_type
+                except Exception:
+                    report_type = "Corrupt"
+                report_type = report_type or "Decoy"
+                report_types[report_type] = (
+                    report_types.get(report_type, 0) + 1
+                )
+            self.assertEqual(report_types, counts)
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(unittest.main())
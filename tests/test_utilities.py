@@ -11,7 +11,11 @@
 
 import unittest
 from IQDMPDF import utilities
+from IQDMPDF.paths import DIRECTORIES
+from os import walk
 from os.path import join
+from tempfile import TemporaryDirectory
+import hashlib
 
 
 class TestUtilities(unittest.TestCase):
@@ -29,6 +33,36 @@ class TestUtilities(unittest.TestCase):
         strings.append("FAIL")
         self.assertFalse(utilities.are_all_strings_in_text(text, strings))
 
+    def test_remove_whitespace(self):
+        """Test remove_whitespace"""
+        text = " Hello\tWorld!\n This is\fa test "
+        expected = "HelloWorld!Thisisatest"
+        self.assertEqual(utilities.remove_whitespace(text), expected)
+
+    def test_multi_string_matcher(self):
+        """Test MultiStringMatcher against the in operator"""
+        strings = ["he", "she", "his", "hers", "ers", "s", "xyz", ""]
+        matcher = utilities.MultiStringMatcher(strings)
+        for text in ["ushers", "ahishers", "", "xy", "sxyz he"]:
+            expected = {s for s in strings if s and s in text}
+            self.assertEqual(matcher.find(text), expected)
+
+    def test_identifier_matcher(self):
+        """Test IdentifierMatcher against are_all_strings_in_text"""
+        groups = {
+            "a": ["Delta4", "Treatment Summary"],
+            "b": ["Delta4", "Composite"],
+            "c": [],
+        }
+        matcher = utilities.IdentifierMatcher(groups)
+        for text in ["Delta4 Treatment Summary", "Composite Delta4", "Delt"]:
+            expected = [
+                key
+                for key, strings in groups.items()
+                if utilities.are_all_strings_in_text(text, strings)
+            ]
+            self.assertEqual(matcher.match(text), expected)
+
     def test_get_sorted_indices(self):
         """Test get_sorted_indices"""
         some_list = [1, 4, 2, 5]
@@ -63,6 +97,84 @@ class TestUtilities(unittest.TestCase):
             self.assertEqual(pos[0], exp_pos[0])
             self.assertEqual(pos[1], exp_pos[1])
 
+    def test_get_file_hash(self):
+        """Test file content hashing"""
+        with TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, "test.txt")
+            with open(path, "wb") as f:
+                f.write(b"Hello World!")
+            expected = hashlib.sha256(b"Hello World!").hexdigest()
+            self.assertEqual(utilities.get_file_hash(path), expected)
+            self.assertEqual(
+                utilities.get_file_hash(path, chunk_size=5), expected
+            )
+
+    def test_iter_files(self):
+        """Check that files are found in the same order as os.walk"""
+        init_dir = DIRECTORIES["TEST_DATA"]
+        for extension in [None, ".pdf"]:
+            expected = [
+                join(dir_name, file_name)
+                for dir_name, _, file_names in walk(init_dir)
+                for file_name in file_names
+                if extension is None or file_name.lower().endswith(extension)
+            ]
+            files = utilities.get_files(init_dir, extension=extension)
+            self.assertEqual(files, expected)
+
+        files = utilities.get_files(init_dir, search_sub_dir=False)
+        expected = [join(init_dir, f) for f in next(walk(init_dir))[2]]
+        self.assertEqual(files, expected)
+
+    def test_iter_pdf_files(self):
+        """Check that only files with a PDF header are kept, in order"""
+        contents = {
+            "report": b"%PDF-1.4\n",
+            "offset_header": b"\x00" * 100 + b"%PDF-1.7",
+            "image.dcm": b"\x00" * 128 + b"DICM",
+            "empty.pdf": b"",
+            "notes.txt": b"PDF report",
+        }
+        with TemporaryDirectory() as tmp_dir:
+            files = []
+            for file_name, content in contents.items():
+                files.append(join(tmp_dir, file_name))
+                with open(files[-1], "wb") as f:
+                    f.write(content)
+            files.append(join(tmp_dir, "missing.pdf"))
+
+            pdf_files = list(utilities.iter_pdf_files(files * 3, threads=2))
+            self.assertEqual(pdf_files, files[:2] * 3)
+
+        pdf_files = utilities.get_files(DIRECTORIES["TEST_DATA"], True, ".pdf")
+        self.assertEqual(list(utilities.iter_pdf_files(pdf_files)), pdf_files)
+
+    def test_shard_files(self):
+        """Check that each file is assigned to exactly one stable shard"""
+        self.assertEqual(utilities.get_shard_index(join("a", "b.pdf"), 4), 0)
+        self.assertEqual(utilities.get_shard_index("a/c.pdf", 4), 3)
+
+        init_dir = DIRECTORIES["TEST_DATA"]
+        files = utilities.get_files(init_dir)
+        shards = [
+            list(utilities.iter_shard_files(files, init_dir, i, 3))
+            for i in range(3)
+        ]
+        self.assertEqual(sorted(sum(shards, [])), sorted(files))
+
+    def test_background_iterator(self):
+        """Check that all items are found, and errors are raised"""
+        files = utilities.BackgroundIterator(range(100))
+        self.assertEqual(list(files), list(range(100)))
+        self.assertTrue(files.done)
+        self.assertEqual(files.count, 100)
+
+        files = utilities.BackgroundIterator(
+            utilities.iter_files("thisDoesntExist")
+        )
+        with self.assertRaises(FileNotFoundError):
+            list(files)
+
     def test_get_relative_path(self):
         """Test tool to extract relative path"""
         test_path = ["this", "is", "a", "test", "path"]